@@ -24,6 +24,7 @@ gunicorn_access_log_format="${SKIPPER_GUNICORN_ACCESS_LOG_FORMAT}"
 gunicorn_worker_tmp_dir="${SKIPPER_GUNICORN_WORKER_TMP_DIR}"
 
 skipper_singlebeat_enabled="${SKIPPER_SINGLE_BEAT_ENABLED}"
+metrics_enabled="${SKIPPER_METRICS_ENABLED}"
 
 
 if [ -z "$statsd_prefix" ]; then
@@ -84,6 +85,14 @@ if [ -z "$skipper_singlebeat_enabled" ]; then
     skipper_singlebeat_enabled="no"
 fi
 
+if [ "${metrics_enabled}" == "true" ]; then
+    # every gunicorn/celery process writes its prometheus metrics to files in this directory,
+    # values of a previous run must not be picked up again
+    export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/skipper_metrics}"
+    mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+    rm -f "${PROMETHEUS_MULTIPROC_DIR}"/*.db
+fi
+
 if [ "${skipper_singlebeat_enabled}" == "yes" ]; then
     single_beat_cmd_prefix="single-beat"
 else
@@ -107,6 +116,9 @@ elif [ "${SKIPPER_CONTAINER_TYPE}" == "CELERY_BEAT" ]; then
     beat \
     --pidfile=/neuroforge/skipper/celery.pid \
     --loglevel=INFO
+elif [ "${SKIPPER_CONTAINER_TYPE}" == "EVENT_DISPATCHER" ]; then
+  cd /neuroforge/skipper || (echo "/neuroforge/skipper does not exist" && exit 1)
+  exec python3 manage.py run_consumer_event_dispatcher
 elif [ "${SKIPPER_CONTAINER_TYPE}" == "TASK_DASHBOARD" ]; then
   cd /neuroforge/skipper || (echo "/neuroforge/skipper does not exist" && exit 1)
   exec $single_beat_cmd_prefix celery \
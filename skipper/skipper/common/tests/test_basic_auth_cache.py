@@ -0,0 +1,92 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+
+import base64
+from typing import cast
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from skipper.core.credential_cache import clear_credential_cache, credential_cache_key, remember_credential, \
+    remember_tenant_for_user, cached_tenant_for_user
+from skipper.core.models.tenant import Tenant, Tenant_User
+from skipper.core.tests.base import BASE_URL
+
+
+def basic_auth(username: str, password: str) -> str:
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+
+class BasicAuthCacheTest(TestCase):
+
+    def setUp(self) -> None:
+        clear_credential_cache()
+        self.user = User.objects.create_superuser(username='nf', password='nf', email='test@neuroforge.de')
+
+    def check(self, password: str) -> int:
+        return cast(int, APIClient().get(
+            path=BASE_URL + "common/auth/check/",
+            HTTP_AUTHORIZATION=basic_auth('nf', password)
+        ).status_code)
+
+    def test_password_is_only_hashed_once(self) -> None:
+        with mock.patch('django.contrib.auth.base_user.check_password', wraps=check_password) as hashed:
+            self.assertEqual(status.HTTP_200_OK, self.check('nf'))
+            self.assertEqual(status.HTTP_200_OK, self.check('nf'))
+            self.assertEqual(1, hashed.call_count)
+
+    def test_wrong_password_is_not_cached(self) -> None:
+        self.assertEqual(status.HTTP_200_OK, self.check('nf'))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.check('wrong'))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.check('wrong'))
+
+    def test_password_change_invalidates(self) -> None:
+        self.assertEqual(status.HTTP_200_OK, self.check('nf'))
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.check('nf'))
+        self.assertEqual(status.HTTP_200_OK, self.check('changed'))
+
+    def test_deactivation_invalidates(self) -> None:
+        self.assertEqual(status.HTTP_200_OK, self.check('nf'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.check('nf'))
+
+
+class CredentialCacheTenantTest(TestCase):
+
+    def setUp(self) -> None:
+        clear_credential_cache()
+        self.user = User.objects.create_user(username='nf', password='nf')
+        self.tenant = Tenant.objects.create(name='tenant')
+        self.tenant_user = Tenant_User.objects.create(tenant=self.tenant, user=self.user)
+
+    def remember(self) -> None:
+        remember_credential(credential_cache_key('basic', 'nf', 'nf'), self.user)
+        remember_tenant_for_user(self.user, self.tenant.id)
+
+    def test_only_the_tenant_id_is_cached(self) -> None:
+        self.remember()
+        entry = cached_tenant_for_user(self.user)
+        assert entry is not None
+        self.assertEqual(self.tenant.id, entry.tenant_id)
+
+    def test_tenant_change_invalidates(self) -> None:
+        self.remember()
+        self.tenant.delete()
+        self.assertIsNone(cached_tenant_for_user(self.user))
+
+    def test_tenant_user_change_invalidates(self) -> None:
+        self.remember()
+        self.tenant_user.tenant = Tenant.objects.create(name='other_tenant')
+        self.tenant_user.save()
+        self.assertIsNone(cached_tenant_for_user(self.user))
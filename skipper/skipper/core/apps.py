@@ -10,3 +10,7 @@ class CoreConfig(AppConfig):
     name = 'skipper.core'
     default_auto_field = 'django.db.models.BigAutoField'
 
+    def ready(self) -> None:
+        from skipper.core import credential_cache
+        credential_cache.connect_invalidation_signals()
+
@@ -4,10 +4,14 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication, BaseAuthentication, get_authorization_header
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication, BaseAuthentication, \
+    get_authorization_header, BasicAuthentication
 from django.utils.translation import gettext_lazy as _
-from typing import Any
+from typing import Any, Optional, Tuple
 
+from skipper.core.credential_cache import credential_cache_key, get_cached_credential, remember_credential, \
+    forget_credential, is_still_valid, CREDENTIAL_CACHE_KEY_ATTRIBUTE
 from skipper.core.models.preshared_token import PreSharedToken
 
 
@@ -35,6 +39,40 @@ class PossiblyJWTTokenAuthentication(BaseAuthentication):
         return jwtAuth.authenticate_header(request)
 
 
+class CachingBasicAuthentication(BasicAuthentication):
+    """
+    BasicAuthentication that remembers successfully verified credentials for a short time
+    so that machine clients do not pay for a full password hash on every request.
+    """
+
+    def authenticate_credentials(self, userid: str, password: str, request: Optional[Any] = None) -> Tuple[Any, None]:
+        key = credential_cache_key('basic', userid, password)
+        entry = get_cached_credential(key)
+        if entry is not None:
+            user = get_user_model().objects.filter(pk=entry.user_id).first()
+            if is_still_valid(entry, user):
+                setattr(user, CREDENTIAL_CACHE_KEY_ATTRIBUTE, key)
+                return user, None
+            forget_credential(key)
+
+        user, _auth = super().authenticate_credentials(userid, password, request)
+        remember_credential(key, user)
+        return user, None
+
+
 class PreSharedTokenAuthentication(TokenAuthentication):
     keyword = 'PreSharedToken'
-    model = PreSharedToken
\ No newline at end of file
+    model = PreSharedToken
+
+    def authenticate_credentials(self, key: str) -> Any:
+        # the token itself is cheap to verify, it is looked up every time so that
+        # revoking it has immediate effect. We only register the credential so that
+        # the tenant of the user is memoized together with it.
+        user, token = super().authenticate_credentials(key)
+        cache_key = credential_cache_key('preshared', key)
+        entry = get_cached_credential(cache_key)
+        if entry is not None and is_still_valid(entry, user):
+            setattr(user, CREDENTIAL_CACHE_KEY_ATTRIBUTE, cache_key)
+        else:
+            remember_credential(cache_key, user)
+        return user, token
\ No newline at end of file
@@ -0,0 +1,143 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+Short lived, process local cache of successfully verified credentials.
+
+Entries are keyed by a salted digest of the credential, the plain credential is never stored.
+Every entry remembers the password hash of the user at the time of verification, so a hit is only
+valid as long as the user is still active and the password was not changed in the meantime.
+Failed verifications are never cached.
+
+Along with a credential only the id of the tenant of the user is remembered, the tenant itself is
+loaded on every request. Tenant and Tenant_User changes drop all remembered tenant ids.
+"""
+
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Any
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from skipper import settings
+
+# attribute set on users that were authenticated via a cached credential
+CREDENTIAL_CACHE_KEY_ATTRIBUTE = '_skipper_credential_cache_key'
+
+# regenerated per process, the digests are only ever compared inside this process
+_salt = secrets.token_bytes(32)
+
+
+class CachedCredential(NamedTuple):
+    user_id: Any
+    password: str
+    expires_at: float
+    tenant_resolved: bool = False
+    tenant_id: Any = None
+
+
+_cache: 'OrderedDict[str, CachedCredential]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def credential_cache_key(kind: str, *parts: str) -> str:
+    return hmac.new(_salt, json.dumps([kind, *parts]).encode(), hashlib.sha256).hexdigest()
+
+
+def get_cached_credential(key: str) -> Optional[CachedCredential]:
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry
+
+
+def _put(key: str, entry: CachedCredential) -> None:
+    if settings.SKIPPER_AUTH_CREDENTIAL_CACHE_TIMEOUT <= 0 or settings.SKIPPER_AUTH_CREDENTIAL_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > settings.SKIPPER_AUTH_CREDENTIAL_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def remember_credential(key: str, user: Any) -> None:
+    _put(key, CachedCredential(
+        user_id=user.pk,
+        password=user.password,
+        expires_at=time.monotonic() + settings.SKIPPER_AUTH_CREDENTIAL_CACHE_TIMEOUT
+    ))
+    setattr(user, CREDENTIAL_CACHE_KEY_ATTRIBUTE, key)
+
+
+def forget_credential(key: str) -> None:
+    with _cache_lock:
+        _cache.pop(key, None)
+
+
+def is_still_valid(entry: CachedCredential, user: Any) -> bool:
+    return user is not None and user.is_active and user.pk == entry.user_id and user.password == entry.password
+
+
+def cached_tenant_for_user(user: Any) -> Optional[CachedCredential]:
+    """
+    :return: the cache entry of the credential the user was authenticated with, if the tenant
+    of the user was already resolved for it
+    """
+    key = getattr(user, CREDENTIAL_CACHE_KEY_ATTRIBUTE, None)
+    if key is None:
+        return None
+    entry = get_cached_credential(key)
+    if entry is None or not entry.tenant_resolved or not is_still_valid(entry, user):
+        return None
+    return entry
+
+
+def remember_tenant_for_user(user: Any, tenant_id: Any) -> None:
+    key = getattr(user, CREDENTIAL_CACHE_KEY_ATTRIBUTE, None)
+    if key is None:
+        return
+    entry = get_cached_credential(key)
+    if entry is None or not is_still_valid(entry, user):
+        return
+    _put(key, entry._replace(tenant_resolved=True, tenant_id=tenant_id))
+
+
+def clear_credential_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def forget_resolved_tenants() -> None:
+    with _cache_lock:
+        for key, entry in _cache.items():
+            if entry.tenant_resolved:
+                _cache[key] = entry._replace(tenant_resolved=False, tenant_id=None)
+
+
+def _on_tenant_change(**kwargs: Any) -> None:
+    forget_resolved_tenants()
+    # entries resolved from data seen before the commit must be dropped once the change is visible
+    transaction.on_commit(forget_resolved_tenants)
+
+
+def connect_invalidation_signals() -> None:
+    from skipper.core.models.tenant import Tenant, Tenant_User
+
+    for model in [Tenant, Tenant_User]:
+        post_save.connect(_on_tenant_change, sender=model, dispatch_uid=f'credential_cache_{model.__name__}_save')
+        post_delete.connect(_on_tenant_change, sender=model, dispatch_uid=f'credential_cache_{model.__name__}_delete')
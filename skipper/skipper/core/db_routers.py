@@ -4,15 +4,122 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
+import datetime
+import logging
+import threading
+import time
 from typing import Any, Optional
 
 import re
 
 from skipper import settings
+from skipper.core.lint import sql_cursor
 from skipper.core.middleware import get_current_request
 
+logger = logging.getLogger(__name__)
+
 bulk_endpoint_regex = r'^\/api\/dataseries\/(?:by-external-id\/)?dataseries\/[^\/]*\/bulk\/datapoint\/.*$'
 
+# requests with these methods never write, anything else might have
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# returned on writes and passed back by clients that need to read their own writes
+WRITE_TOKEN_HEADER = 'X-Skipper-Write-Token'
+
+_READ_DB_ATTRIBUTE = '_skipper_data_point_read_db'
+
+_replica_lag_lock = threading.Lock()
+_replica_lag_checked_at: Optional[float] = None
+_replica_lag_acceptable = False
+
+
+def _replica_lag_is_acceptable(replica: str) -> bool:
+    """
+    whether the replica is at most SKIPPER_DB_READ_REPLICA_MAX_LAG_SECONDS behind,
+    the result is shared per process for SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL seconds
+    """
+    global _replica_lag_checked_at, _replica_lag_acceptable
+
+    now = time.monotonic()
+    with _replica_lag_lock:
+        if _replica_lag_checked_at is not None and \
+                now - _replica_lag_checked_at < settings.SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL:
+            return _replica_lag_acceptable
+
+    acceptable = False
+    try:
+        with sql_cursor(replica) as cursor:
+            cursor.execute('SELECT pg_is_in_recovery(), clock_timestamp() - pg_last_xact_replay_timestamp()')
+            in_recovery, lag = cursor.fetchone()
+        # having replayed everything it received says nothing if the replica stopped receiving,
+        # so always go by the age of the last replayed transaction. On an idle primary this falls
+        # back to the primary until the next transaction is replayed, which is safe
+        acceptable = not in_recovery or (
+            lag is not None and lag <= datetime.timedelta(seconds=settings.SKIPPER_DB_READ_REPLICA_MAX_LAG_SECONDS)
+        )
+    except Exception:
+        logger.warning('failed to determine the lag of the read replica, reading from the primary', exc_info=True)
+
+    with _replica_lag_lock:
+        _replica_lag_checked_at = now
+        _replica_lag_acceptable = acceptable
+    return acceptable
+
+
+def _write_token_is_replayed(replica: str, write_token: str) -> bool:
+    try:
+        with sql_cursor(replica) as cursor:
+            cursor.execute(
+                'SELECT NOT pg_is_in_recovery() OR pg_last_wal_replay_lsn() >= %(write_token)s::pg_lsn',
+                {'write_token': write_token}
+            )
+            return bool(cursor.fetchone()[0])
+    except Exception:
+        # also covers malformed tokens
+        logger.warning('failed to check the write token against the read replica, reading from the primary', exc_info=True)
+        return False
+
+
+def current_write_token() -> str:
+    """
+    :return: the current WAL position of the primary. Once the replica replayed up to it,
+    it has seen every transaction that was committed before this call.
+    """
+    with sql_cursor(settings.DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        cursor.execute('SELECT pg_current_wal_lsn()::text')
+        return str(cursor.fetchone()[0])
+
+
+def data_point_read_db(read_only: bool = False) -> str:
+    """
+    :param read_only: the caller knows that the current request does not write, regardless of the method
+    :return: the database to run read only data point queries of the current request on.
+    This is the read replica if one is configured and the request can not have written anything itself,
+    the replica does not lag behind too far and it already replayed the write token the client sent along.
+    Everything else (including everything outside of requests) goes to DATA_SERIES_DYNAMIC_SQL_DB.
+    """
+    primary: str = settings.DATA_SERIES_DYNAMIC_SQL_DB
+    # DATA_SERIES_DYNAMIC_SQL_DB_READ is the read replica, if one is configured
+    replica: str = settings.DATA_SERIES_DYNAMIC_SQL_DB_READ
+    request = get_current_request()
+    if replica == primary or request is None:
+        return primary
+    if not read_only and request.method not in READ_ONLY_METHODS:
+        return primary
+
+    # decide once per request so that e.g. the count and the page of a list are read from the same database
+    read_db: Optional[str] = getattr(request, _READ_DB_ATTRIBUTE, None)
+    if read_db is None:
+        write_token = request.headers.get(WRITE_TOKEN_HEADER)
+        if not _replica_lag_is_acceptable(replica):
+            read_db = primary
+        elif write_token is not None and not _write_token_is_replayed(replica, write_token):
+            read_db = primary
+        else:
+            read_db = replica
+        setattr(request, _READ_DB_ATTRIBUTE, read_db)
+    return read_db
+
 
 class DynamicSQLRouter:
 
@@ -36,9 +36,17 @@ NAME_WHITELIST = {
     'jsonb_build_object',
     'jsonb_agg',
     'jsonb_strip_nulls',
+    'jsonb_object_agg',
+    'jsonb_each',
+    'COALESCE',
+    'unnest',
     'to_char',
     'clock_timestamp',
     'count',
+    'tstzrange',
+    'pg_notify',
+    'concat',
+    'lead',
 
     # identifiers in queries and inserts
     'dp',
@@ -46,6 +54,7 @@ NAME_WHITELIST = {
     'ds_dp2',
     'id',
     'payload',
+    'payload_text',
     'point_in_time',
     'external_id',
     'deleted_at',
@@ -63,6 +72,8 @@ NAME_WHITELIST = {
     'user_id',
     'record_source',
     'versions',
+    'valid_to',
+    'payload_hash',
 
     # required at least in inserts
     'target_tbl',
@@ -80,6 +91,7 @@ NAME_WHITELIST = {
     'pg_catalog',
     'pg_default',
     'btree',
+    'gist',
     'nextval',
     'EXCLUDED',
     'INFORMATION_SCHEMA',
@@ -88,6 +100,22 @@ NAME_WHITELIST = {
     'current_database',
     'table_schema',
     'ANY',
+    'SKIP',
+    'LOCKED',
+    'to_regclass',
+
+    # replication state, see db_routers
+    'pg_is_in_recovery',
+    'pg_current_wal_lsn',
+    'pg_last_wal_receive_lsn',
+    'pg_last_wal_replay_lsn',
+    'pg_last_xact_replay_timestamp',
+
+    # build locks of user defined indexes, see user_defined_index
+    'pg_advisory_xact_lock',
+    'pg_try_advisory_lock',
+    'pg_advisory_unlock',
+    'hashtextextended',
 
     # SQL types
     'varchar',
@@ -4,6 +4,8 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
+from contextlib import ExitStack
+
 from django.contrib.auth.models import User
 from django.http import HttpRequest
 from typing import Any, cast, Optional
@@ -11,6 +13,8 @@ from typing import Any, cast, Optional
 from django.contrib.auth import get_user
 from django_multitenant.utils import set_current_tenant  # type: ignore
 
+from skipper.core.credential_cache import cached_tenant_for_user, remember_tenant_for_user
+
 try:
     from threading import local
 except ImportError:
@@ -21,8 +25,8 @@ _thread_locals = local()
 
 
 def check_basic_auth_for_user(request: Any) -> Any:
-    from rest_framework.authentication import BasicAuthentication
-    authenticator = BasicAuthentication()
+    from skipper.core.authentication import CachingBasicAuthentication
+    authenticator = CachingBasicAuthentication()
     try:
         _user, _ = authenticator.authenticate(request)  # type: ignore
         return _user
@@ -90,11 +94,19 @@ class TenantFromUserMiddleware(object):
             set_current_tenant(None)
         else:
             _user_name = cast(User, user).username
-            tenant_mapping = Tenant_User.objects.filter(
-                user=cast(User, user)
-            ).all()
-            if len(tenant_mapping) > 0:
-                _tenant = tenant_mapping[0].tenant
+            _tenant: Optional[Tenant]
+            cached = cached_tenant_for_user(user)
+            if cached is not None:
+                # only the id is cached, the tenant is loaded fresh so that deleting it has immediate effect
+                _tenant = Tenant.all_objects.filter(id=cached.tenant_id).first() \
+                    if cached.tenant_id is not None else None
+            else:
+                tenant_mapping = Tenant_User.objects.filter(
+                    user=cast(User, user)
+                ).all()
+                _tenant = tenant_mapping[0].tenant if len(tenant_mapping) > 0 else None
+                remember_tenant_for_user(user, _tenant.id if _tenant is not None else None)
+            if _tenant is not None:
                 _tenant_name = _tenant.name
                 if _tenant.deleted_at is None:
                     set_current_tenant(_tenant)
@@ -122,6 +134,61 @@ class TrackCurrentRequestMiddleware(object):
         return response
 
 
+class ReadReplicaWriteTokenMiddleware(object):
+    """
+    hands out a write token on every successful request that might have written something.
+    Clients that pass it back along with their next reads will not be served by a read replica
+    that has not caught up with their writes yet (see db_routers.data_point_read_db).
+    """
+    def __init__(self, get_response: Any) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: Any) -> Any:
+        from skipper import settings
+        from skipper.core.db_routers import READ_ONLY_METHODS, WRITE_TOKEN_HEADER, current_write_token
+
+        # with ATOMIC_REQUESTS the transaction of the view is already committed at this point
+        response = self.get_response(request)
+
+        if settings.DATA_SERIES_DYNAMIC_SQL_DB_READ != settings.DATA_SERIES_DYNAMIC_SQL_DB and \
+                request.method not in READ_ONLY_METHODS and \
+                response.status_code < 400:
+            response[WRITE_TOKEN_HEADER] = current_write_token()
+
+        return response
+
+
+class QueryCountMetricsMiddleware(object):
+    """
+    records the number of database queries (over all connections) per view in skipper.metrics
+    """
+    def __init__(self, get_response: Any) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: Any) -> Any:
+        from django.db import connections
+        from skipper import metrics
+
+        query_count = 0
+
+        def count_query(execute: Any, sql: Any, params: Any, many: Any, context: Any) -> Any:
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        # the route name and not the path, so that the number of label values stays bounded
+        view_name = resolver_match.view_name if resolver_match is not None else 'unresolved'
+        metrics.REQUEST_DB_QUERIES.labels(view=view_name, method=request.method).observe(query_count)
+
+        return response
+
+
 def set_current_request(request: Optional[HttpRequest]) -> None:
     setattr(_thread_locals, '__current_request', request)
 
@@ -5,9 +5,11 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 
+import uuid
+
 from django.http import Http404
 from rest_framework.exceptions import NotFound, APIException, ValidationError
-from rest_framework.renderers import BrowsableAPIRenderer, HTMLFormRenderer
+from rest_framework.renderers import BrowsableAPIRenderer, HTMLFormRenderer, JSONRenderer
 from typing import Any, Mapping, Dict, Optional
 from django.template import engines, loader
 from rest_framework import serializers
@@ -92,5 +94,36 @@ class CustomizableBrowsableAPIRendererObjectMixin(object):
             return None
 
 
-
-
+class RawJSON(str):
+    """
+    already encoded json that PassThroughJSONRenderer writes into the response as is
+    """
+    pass
+
+
+class PassThroughJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that splices top level lists of RawJSON elements into the
+    response body instead of decoding and encoding them again
+    """
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[Mapping[str, Any]] = None) -> bytes:
+        if not isinstance(data, dict):
+            return super().render(data, accepted_media_type, renderer_context)  # type: ignore
+
+        raw_lists: Dict[str, Any] = {}
+        _data = dict(data)
+        for key, value in data.items():
+            if isinstance(value, list) and len(value) > 0 and all(isinstance(elem, RawJSON) for elem in value):
+                placeholder = uuid.uuid4().hex
+                raw_lists[placeholder] = value
+                _data[key] = placeholder
+
+        rendered: bytes = super().render(_data, accepted_media_type, renderer_context)  # type: ignore
+        for placeholder, value in raw_lists.items():
+            rendered = rendered.replace(
+                f'"{placeholder}"'.encode(),
+                b'[' + ','.join(value).encode() + b']',
+                1
+            )
+        return rendered
@@ -7,21 +7,61 @@
 
 from urllib import parse
 
+from boto3.s3.transfer import TransferConfig  # type: ignore
 from django.utils.deconstruct import deconstructible
 from storages.backends.s3boto3 import S3Boto3Storage  # type: ignore
-from storages.utils import setting  # type: ignore
-from typing import Optional, Any, Mapping
+from storages.utils import setting, clean_name  # type: ignore
+from typing import Optional, Any, Mapping, List, Iterable, Dict
 
+from skipper import settings
 from skipper.core.middleware import get_current_request
+from skipper.core.storage.url_cache import get_cached_url, remember_url
+
+
+# S3 accepts at most 1000 keys per multi object delete
+S3_MAX_KEYS_PER_DELETE = 1000
+
+# urls are handed out as generated by the client
+URL_VARIANT_PRIVATE = 'private'
+# urls for requests coming in via the nginx proxy point to the external endpoint
+URL_VARIANT_EXTERNAL = 'external'
 
 
 @deconstructible
 class PrivatePublicS3Boto3Storage(S3Boto3Storage):  # type: ignore
 
-    def url(self, name: str, parameters: Optional[Any] = None, expire: Optional[Any] = None) -> Any:
-        private_url = super().url(name, parameters, expire)
+    def __init__(self, **settings_overrides: Any) -> None:
+        # upload_fileobj switches to a multipart upload (with parallel parts) at the threshold
+        settings_overrides.setdefault('transfer_config', TransferConfig(
+            multipart_threshold=settings.SKIPPER_S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.SKIPPER_S3_MULTIPART_CHUNKSIZE
+        ))
+        super().__init__(**settings_overrides)
+
+    def delete_many(self, names: List[str]) -> None:
+        """
+        deletes all given files with as few multi object delete requests as possible
+        """
+        for i in range(0, len(names), S3_MAX_KEYS_PER_DELETE):
+            response = self.bucket.delete_objects(
+                Delete={
+                    'Objects': [{'Key': self._normalize_name(clean_name(name))} for name in names[i:i + S3_MAX_KEYS_PER_DELETE]],
+                    'Quiet': True
+                }
+            )
+            errors = response.get('Errors', [])
+            if len(errors) > 0:
+                raise IOError(f'failed to delete {len(errors)} files, first error: {errors[0]}')
+
+    def url_variant(self) -> str:
+        """
+        :return: which kind of url the current request gets, see URL_VARIANT_PRIVATE and URL_VARIANT_EXTERNAL
+        """
         if self.custom_domain:
-            return private_url
+            return URL_VARIANT_PRIVATE
+
+        if self.external_endpoint_url is None or self.external_endpoint_url == '':
+            return URL_VARIANT_PRIVATE
 
         current_request = get_current_request()
 
@@ -34,15 +74,46 @@ class PrivatePublicS3Boto3Storage(S3Boto3Storage):  # type: ignore
         behind_proxy = 'X-Nginx-Proxy' in headers and bool(headers['X-Nginx-Proxy'])
 
         if not behind_proxy:
-            return private_url
+            return URL_VARIANT_PRIVATE
+        return URL_VARIANT_EXTERNAL
 
-        if self.external_endpoint_url is not None and self.external_endpoint_url != '':
-            scheme = parse.urlsplit(self.external_endpoint_url).scheme
-            host = parse.urlsplit(self.external_endpoint_url).netloc
+    def _generate_url(self, name: str, variant: str, parameters: Optional[Any] = None, expire: Optional[Any] = None) -> Any:
+        private_url = super().url(name, parameters, expire)
+        if variant == URL_VARIANT_EXTERNAL:
+            external_endpoint_url = parse.urlsplit(self.external_endpoint_url)
             split_url = parse.urlsplit(private_url)
-            return replace_in_split_url(split_url=split_url, scheme=scheme, host=host)
+            return replace_in_split_url(split_url=split_url, scheme=external_endpoint_url.scheme, host=external_endpoint_url.netloc)
         return private_url
 
+    def url_cache_timeout(self) -> float:
+        # a cached url must stay valid for a while after it was handed out
+        return float(min(settings.SKIPPER_S3_PRESIGNED_URL_CACHE_TIMEOUT, self.querystring_expire / 2))
+
+    def urls(self, names: Iterable[str]) -> Dict[str, str]:
+        """
+        urls for all given names (e.g. all files on a page). The url variant is determined only once
+        and only names that are not in the presigned url cache are signed.
+        """
+        variant = self.url_variant()
+        timeout = self.url_cache_timeout()
+        ret: Dict[str, str] = {}
+        for name in names:
+            if name in ret:
+                continue
+            key = (f'{self.bucket_name}/{self.location}', variant, name)
+            url = get_cached_url(key)
+            if url is None:
+                url = self._generate_url(name, variant)
+                remember_url(key, url, timeout)
+            ret[name] = url
+        return ret
+
+    def url(self, name: str, parameters: Optional[Any] = None, expire: Optional[Any] = None) -> Any:
+        if parameters is not None or expire is not None:
+            # not the urls we usually hand out, do not cache these
+            return self._generate_url(name, self.url_variant(), parameters, expire)
+        return self.urls([name])[name]
+
 
 def replace_in_split_url(split_url: parse.SplitResult, scheme: Optional[str], host: Optional[str]) -> str:
     _ret = split_url
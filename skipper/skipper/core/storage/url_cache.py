@@ -0,0 +1,53 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+Process local cache of presigned media urls.
+
+Entries are keyed by the storage, the url variant (see PrivatePublicS3Boto3Storage.url_variant)
+and the object name. The signature of a cached url must still be valid for a while when the url
+is handed out, so callers pass a timeout that is well below the expiry of the signature.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from skipper import settings
+
+UrlCacheKey = Tuple[str, str, str]
+
+_cache: 'OrderedDict[UrlCacheKey, Tuple[str, float]]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_cached_url(key: UrlCacheKey) -> Optional[str]:
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        url, expires_at = entry
+        if expires_at <= time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return url
+
+
+def remember_url(key: UrlCacheKey, url: str, timeout: float) -> None:
+    if timeout <= 0 or settings.SKIPPER_S3_PRESIGNED_URL_CACHE_SIZE <= 0:
+        return
+    with _cache_lock:
+        _cache[key] = (url, time.monotonic() + timeout)
+        _cache.move_to_end(key)
+        while len(_cache) > settings.SKIPPER_S3_PRESIGNED_URL_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_url_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
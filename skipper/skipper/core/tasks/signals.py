@@ -5,9 +5,10 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 
+import os
 from typing import Any
 
-from celery.signals import task_prerun, worker_process_init  # type: ignore
+from celery.signals import task_prerun, worker_init, worker_process_init, worker_process_shutdown  # type: ignore
 from django_multitenant.utils import set_current_tenant  # type: ignore
 
 
@@ -21,3 +22,16 @@ def clear_tenant(*args: Any, **kwargs: Any) -> None:
 def init_celery_telemetry(*args: Any, **kwargs: Any) -> None:
     from skipper import telemetry
     telemetry.setup_telemetry_celery()
+
+
+@worker_init.connect(weak=False)  # type: ignore
+def init_celery_metrics(*args: Any, **kwargs: Any) -> None:
+    from skipper import metrics
+    # the main process serves the metrics of all pool processes
+    metrics.start_celery_exporter()
+
+
+@worker_process_shutdown.connect(weak=False)  # type: ignore
+def cleanup_celery_metrics(*args: Any, **kwargs: Any) -> None:
+    from skipper import metrics
+    metrics.mark_process_dead(os.getpid())
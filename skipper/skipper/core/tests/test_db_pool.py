@@ -0,0 +1,52 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from typing import Any, cast
+
+from django.db import connections
+from django.test.testcases import TransactionTestCase
+from psycopg_pool import ConnectionPool
+
+from skipper.db_pool import reset_pooled_connection
+from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
+
+
+class TestResetPooledConnection(TransactionTestCase):
+    def test_reset_restores_session_state(self) -> None:
+        connection = connections[DATA_SERIES_DYNAMIC_SQL_DB]
+        with connection.get_new_connection(connection.get_connection_params()) as conn:
+            conn.autocommit = True
+            search_path = conn.execute('SHOW search_path').fetchone()[0]
+
+            conn.execute('SET search_path TO "pg_catalog"')
+            conn.execute('SET statement_timeout TO 1234')
+
+            reset_pooled_connection(conn)
+
+            self.assertTrue(conn.autocommit)
+            self.assertEqual(search_path, conn.execute('SHOW search_path').fetchone()[0])
+            self.assertEqual('0', conn.execute('SHOW statement_timeout').fetchone()[0])
+
+    def test_time_zone_after_checkout(self) -> None:
+        connection = connections[DATA_SERIES_DYNAMIC_SQL_DB]
+        connect_kwargs = connection.get_connection_params()
+        # so that RESET ALL alone would not end up in UTC
+        connect_kwargs['options'] = f"{connect_kwargs.get('options', '')} -c TimeZone=Europe/Berlin"
+        connect_kwargs['autocommit'] = True
+        pool: Any = ConnectionPool(
+            kwargs=connect_kwargs,
+            min_size=1,
+            max_size=1,
+            configure=cast(Any, connection)._configure_connection,
+            reset=reset_pooled_connection
+        )
+        with pool:
+            with pool.connection() as conn:
+                self.assertEqual('UTC', conn.execute("SELECT current_setting('TimeZone')").fetchone()[0])
+                conn.execute("SET TIME ZONE 'America/New_York'")
+
+            with pool.connection() as conn:
+                self.assertEqual('UTC', conn.execute("SELECT current_setting('TimeZone')").fetchone()[0])
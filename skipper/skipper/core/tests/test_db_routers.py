@@ -0,0 +1,83 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+import datetime
+from typing import Any, Dict, Optional
+from unittest import mock
+
+from django.test import RequestFactory
+from django.test.testcases import TransactionTestCase
+
+from skipper import settings
+from skipper.core import db_routers
+from skipper.core.db_routers import data_point_read_db, current_write_token, WRITE_TOKEN_HEADER
+from skipper.core.middleware import set_current_request
+
+REPLICA = 'read_replica'
+
+
+class TestDataPointReadDB(TransactionTestCase):
+
+    def tearDown(self) -> None:
+        set_current_request(None)
+        super().tearDown()
+
+    def read_db(self, method: str, headers: Optional[Dict[str, str]] = None, read_only: bool = False, lag_ok: bool = True,
+                token_replayed: bool = True) -> str:
+        set_current_request(RequestFactory().generic(method, '/api/dataseries/', headers=headers or {}))
+        with mock.patch.object(settings, 'DATA_SERIES_DYNAMIC_SQL_DB_READ', REPLICA), \
+                mock.patch.object(db_routers, '_replica_lag_is_acceptable', return_value=lag_ok), \
+                mock.patch.object(db_routers, '_write_token_is_replayed', return_value=token_replayed):
+            return data_point_read_db(read_only=read_only)
+
+    def test_no_replica_configured(self) -> None:
+        set_current_request(RequestFactory().get('/api/dataseries/'))
+        with mock.patch.object(settings, 'DATA_SERIES_DYNAMIC_SQL_DB_READ', settings.DATA_SERIES_DYNAMIC_SQL_DB):
+            self.assertEqual(settings.DATA_SERIES_DYNAMIC_SQL_DB, data_point_read_db())
+
+    def test_outside_of_requests(self) -> None:
+        with mock.patch.object(settings, 'DATA_SERIES_DYNAMIC_SQL_DB_READ', REPLICA):
+            self.assertEqual(settings.DATA_SERIES_DYNAMIC_SQL_DB, data_point_read_db())
+
+    def test_reads_use_replica(self) -> None:
+        self.assertEqual(REPLICA, self.read_db('GET'))
+
+    def test_writes_use_primary(self) -> None:
+        self.assertEqual(settings.DATA_SERIES_DYNAMIC_SQL_DB, self.read_db('POST'))
+        self.assertEqual(REPLICA, self.read_db('POST', read_only=True))
+
+    def test_lagging_replica_uses_primary(self) -> None:
+        self.assertEqual(settings.DATA_SERIES_DYNAMIC_SQL_DB, self.read_db('GET', lag_ok=False))
+
+    def test_write_token(self) -> None:
+        headers = {WRITE_TOKEN_HEADER: '0/16B3748'}
+        self.assertEqual(settings.DATA_SERIES_DYNAMIC_SQL_DB, self.read_db('GET', headers=headers, token_replayed=False))
+        self.assertEqual(REPLICA, self.read_db('GET', headers=headers, token_replayed=True))
+
+    def test_write_token_against_primary(self) -> None:
+        # the primary itself has always seen every write
+        self.assertTrue(db_routers._write_token_is_replayed(settings.DATA_SERIES_DYNAMIC_SQL_DB, current_write_token()))
+
+
+class TestReplicaLag(TransactionTestCase):
+
+    def lag_is_acceptable(self, row: Any) -> bool:
+        with mock.patch.object(settings, 'SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL', 0), \
+                mock.patch.object(settings, 'SKIPPER_DB_READ_REPLICA_MAX_LAG_SECONDS', 5), \
+                mock.patch.object(db_routers, 'sql_cursor') as sql_cursor:
+            sql_cursor.return_value.__enter__.return_value.fetchone.return_value = row
+            return db_routers._replica_lag_is_acceptable(REPLICA)
+
+    def test_primary(self) -> None:
+        with mock.patch.object(settings, 'SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL', 0):
+            self.assertTrue(db_routers._replica_lag_is_acceptable(settings.DATA_SERIES_DYNAMIC_SQL_DB))
+
+    def test_lag(self) -> None:
+        self.assertTrue(self.lag_is_acceptable((True, datetime.timedelta(seconds=1))))
+        # also if the replica replayed everything it received, it might just not receive anything anymore
+        self.assertFalse(self.lag_is_acceptable((True, datetime.timedelta(hours=1))))
+        # nothing replayed yet
+        self.assertFalse(self.lag_is_acceptable((True, None)))
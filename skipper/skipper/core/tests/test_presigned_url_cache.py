@@ -0,0 +1,101 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from typing import Any, Optional
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+from storages.backends.s3boto3 import S3Boto3Storage  # type: ignore
+
+from skipper import settings
+from skipper.core.storage import private_public
+from skipper.core.storage.media import S3Boto3MediaStorage
+from skipper.core.storage.url_cache import clear_url_cache
+
+
+class _Request:
+    def __init__(self, proxied: bool) -> None:
+        self.headers = {'X-Nginx-Proxy': 'true'} if proxied else {}
+
+
+class PresignedUrlCacheTest(SimpleTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        clear_url_cache()
+        self.calls = 0
+
+        def fake_url(storage: Any, name: str, parameters: Optional[Any] = None, expire: Optional[Any] = None) -> str:
+            self.calls += 1
+            return f'http://minio.local:9000/bucket/{name}?X-Amz-Signature={self.calls}'
+
+        patcher = mock.patch.object(S3Boto3Storage, 'url', fake_url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(clear_url_cache)
+
+        self.storage = S3Boto3MediaStorage()
+        self.storage.external_endpoint_url = 'https://compose.example.com'
+
+    def request(self, proxied: bool) -> Any:
+        return mock.patch.object(private_public, 'get_current_request', lambda: _Request(proxied))
+
+    def test_urls_are_reused(self) -> None:
+        with self.request(proxied=False):
+            first = self.storage.url('a.png')
+            self.assertEqual(first, self.storage.url('a.png'))
+        self.assertEqual(1, self.calls)
+
+    def test_variants_are_cached_separately(self) -> None:
+        with self.request(proxied=False):
+            private_url = self.storage.url('a.png')
+        with self.request(proxied=True):
+            external_url = self.storage.url('a.png')
+            self.assertEqual(external_url, self.storage.url('a.png'))
+        self.assertEqual(2, self.calls)
+        self.assertTrue(private_url.startswith('http://minio.local:9000/'))
+        self.assertTrue(external_url.startswith('https://compose.example.com/'))
+
+    def test_urls_signs_each_name_once(self) -> None:
+        with self.request(proxied=False):
+            self.storage.url('a.png')
+            urls = self.storage.urls(['a.png', 'b.png', 'b.png', 'c.png'])
+        self.assertEqual({'a.png', 'b.png', 'c.png'}, set(urls.keys()))
+        self.assertEqual(3, self.calls)
+
+    def test_disabled(self) -> None:
+        with self.request(proxied=False), mock.patch.object(settings, 'SKIPPER_S3_PRESIGNED_URL_CACHE_TIMEOUT', 0):
+            self.storage.url('a.png')
+            self.storage.url('a.png')
+        self.assertEqual(2, self.calls)
+
+    def test_timeout_is_below_signature_expiry(self) -> None:
+        self.storage.querystring_expire = 600
+        with mock.patch.object(settings, 'SKIPPER_S3_PRESIGNED_URL_CACHE_TIMEOUT', 3600):
+            self.assertEqual(300, self.storage.url_cache_timeout())
+
+    def test_explicit_expiry_is_not_cached(self) -> None:
+        with self.request(proxied=False):
+            self.storage.url('a.png', expire=10)
+            self.storage.url('a.png', expire=10)
+        self.assertEqual(2, self.calls)
+
+
+class PrivatePublicS3Boto3StorageTest(SimpleTestCase):
+
+    def test_save_uses_transfer_config(self) -> None:
+        storage = S3Boto3MediaStorage()
+        self.assertEqual(settings.SKIPPER_S3_MULTIPART_THRESHOLD, storage.transfer_config.multipart_threshold)
+        self.assertEqual(settings.SKIPPER_S3_MULTIPART_CHUNKSIZE, storage.transfer_config.multipart_chunksize)
+
+        bucket = mock.MagicMock()
+        with mock.patch.object(S3Boto3Storage, 'bucket', new_callable=mock.PropertyMock, return_value=bucket):
+            self.assertEqual('a.txt', storage._save('a.txt', ContentFile(b'content', name='a.txt')))
+        upload_fileobj = bucket.Object.return_value.upload_fileobj
+        self.assertEqual(1, upload_fileobj.call_count)
+        self.assertIs(storage.transfer_config, upload_fileobj.call_args.kwargs['Config'])
+
@@ -0,0 +1,90 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+Event driven wake up of consumers.
+
+data_point_event publishes a NOTIFY on CONSUMER_EVENT_CHANNEL for every consumer that received new events.
+Postgres only delivers these on commit and collapses duplicates inside a transaction, so a bulk insert
+results in a single notification per consumer. The dispatcher LISTENs on the channel and enqueues the heartbeat
+task for exactly the consumers that were notified. The wake_up_heartbeat_consumers beat task stays around as
+a slow safety net for notifications that were sent while no dispatcher was listening.
+"""
+
+import logging
+import time
+from typing import Optional, Tuple, Set, Callable, Any
+
+from django.db import connections
+from psycopg import sql
+
+from skipper import environment_common
+from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_EVENT_CHANNEL = 'skipper_consumer_events'
+
+# seconds to wait before reconnecting after the listening connection broke
+RECONNECT_DELAY = 5
+
+
+def parse_notify_payload(payload: str) -> Optional[Tuple[str, str]]:
+    """
+    :return: (tenant_id, consumer_id) for a payload in the form '<tenant_id>:<consumer_id>'
+    """
+    tenant_id, sep, consumer_id = payload.partition(':')
+    if sep != ':' or len(tenant_id) == 0 or len(consumer_id) == 0:
+        return None
+    return tenant_id, consumer_id
+
+
+def dispatch(wake_ups: Set[Tuple[str, str]]) -> None:
+    from skipper.dataseries.tasks.event import actual_run_heartbeat_consumers
+    for tenant_id, consumer_id in wake_ups:
+        actual_run_heartbeat_consumers.apply_async(
+            args=[
+                tenant_id,
+                consumer_id,
+            ],
+            expires=360
+        )
+
+
+def _listening_connection() -> Any:
+    # a dedicated connection, LISTEN only works outside of transactions and
+    # must not be handed out to anyone else
+    connection = connections[DATA_SERIES_DYNAMIC_SQL_DB]
+    conn = connection.get_new_connection(connection.get_connection_params())
+    conn.autocommit = True
+    conn.execute(sql.SQL('LISTEN {}').format(sql.Identifier(CONSUMER_EVENT_CHANNEL)))
+    return conn
+
+
+def run_dispatcher(should_stop: Callable[[], bool] = lambda: False) -> None:
+    from skipper.dataseries.tasks.event import wake_up_heartbeat_consumers
+
+    while not should_stop():
+        try:
+            with _listening_connection() as conn:
+                logger.info(f'listening for consumer events on {CONSUMER_EVENT_CHANNEL}')
+                # notifications are not persisted, catch up on everything that
+                # was sent while we were not listening
+                wake_up_heartbeat_consumers.apply_async()
+
+                while not should_stop():
+                    wake_ups: Set[Tuple[str, str]] = set()
+                    # collect for a short while so that bursts of events only wake up a consumer once
+                    for notify in conn.notifies(timeout=environment_common.SKIPPER_CONSUMER_EVENT_DISPATCHER_COLLECT_SECONDS):
+                        parsed = parse_notify_payload(notify.payload)
+                        if parsed is None:
+                            logger.warning(f'ignoring malformed consumer event notification {notify.payload!r}')
+                            continue
+                        wake_ups.add(parsed)
+                    dispatch(wake_ups)
+        except Exception:
+            logger.exception(f'consumer event dispatcher failed, reconnecting in {RECONNECT_DELAY} seconds...')
+            time.sleep(RECONNECT_DELAY)
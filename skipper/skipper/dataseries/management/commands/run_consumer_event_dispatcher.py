@@ -0,0 +1,18 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from skipper.dataseries.event_dispatcher import run_dispatcher
+
+
+class Command(BaseCommand):
+    help = 'wakes up consumers as soon as new events for them are committed (runs until killed)'
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        run_dispatcher()
@@ -0,0 +1,20 @@
+# Generated by Django 5.1 on 2026-10-17 10:12
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataseries', '0098_alter_consumer_health'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataseries',
+            name='structure_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
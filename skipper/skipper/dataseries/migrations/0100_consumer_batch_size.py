@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-17 11:02
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataseries', '0099_dataseries_structure_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumer',
+            name='batch_size',
+            field=models.IntegerField(blank=True, default=None, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(1000)]),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataseries', '0100_consumer_batch_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkinserttaskdata',
+            name='compressed_data',
+            field=models.BinaryField(default=None, null=True),
+        ),
+        # the data is already compressed, no need for postgres to try again
+        migrations.RunSQL(
+            sql='ALTER TABLE "_3_bulk_insert_task_data" ALTER COLUMN "compressed_data" SET STORAGE EXTERNAL',
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dataseries', '0102_alter_dataseries_extra_config'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataseries',
+            name='backend_migration_in_progress',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -4,14 +4,19 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
+import http.cookiejar
 import logging
+import threading
+import time
 import traceback
 from uuid import UUID
 from opentelemetry import trace  # type: ignore
 
 import datetime
 import requests
-from django.db import transaction
+import requests.adapters
+from psycopg.types.json import Jsonb
+from django.db import router, transaction
 from django.db.models import IntegerField, CharField, Model, DateTimeField, CASCADE, Q, ForeignKey, DO_NOTHING, \
     TextField, BigAutoField, BigIntegerField
 from django.utils import timezone
@@ -19,12 +24,16 @@ from django_multitenant.fields import TenantForeignKey  # type: ignore
 from django_multitenant.mixins import TenantModelMixin  # type: ignore
 from django_multitenant.models import TenantManager  # type: ignore
 from enum import Enum
-from typing import Iterable, Tuple, Dict, Any, Union, Optional, cast, Pattern, Callable
+from typing import Iterable, Tuple, Dict, Any, Union, Optional, cast, Pattern, Callable, List, Sequence, Generator
 
+from skipper import environment_common, metrics
 from skipper.core.models import fields
 from skipper.core.models.tenant import get_tenant_model, Tenant
 from skipper.core.validators import json_dict_str_str, json_dict
-from skipper.dataseries.models.metamodel.consumer import Consumer, ConsumerMode, ConsumerHealthState
+from skipper.core.lint import sql_cursor
+from skipper.dataseries.models.metamodel.consumer import Consumer, ConsumerMode, ConsumerHealthState, DataSeries_Consumer
+from skipper.dataseries.event_dispatcher import CONSUMER_EVENT_CHANNEL
+from skipper.dataseries.raw_sql import escape
 
 logger = logging.getLogger(__name__)
 
@@ -121,27 +130,99 @@ def truncate_events(
         ).delete()
 
 
+def consumer_ids_for_data_series(
+        tenant: Tenant,
+        data_series_id: Union[str, UUID]
+) -> List[str]:
+    return [str(consumer_id) for consumer_id in Consumer.objects.filter(
+        tenant=tenant,
+        dataseries_consumer__data_series__id=data_series_id
+    ).values_list('id', flat=True)]
+
+
 def data_point_event(
         tenant: Tenant,
         data_series_id: Union[str, UUID],
         point_in_time: datetime.datetime,
         sub_clock: int,
         payload: Dict[str, Any],
-        event_type: ConsumerEventType
+        event_type: ConsumerEventType,
+        consumer_ids: Optional[Sequence[Union[str, UUID]]] = None
 ) -> None:
-    for consumer in Consumer.objects.filter(
-        tenant=tenant,
-        dataseries_consumer__data_series__id=data_series_id
-    ).all():
-        ConsumerEvent.objects.create(
-            point_in_time=point_in_time,
-            sub_clock=sub_clock,
-            tenant=tenant,
-            consumer=consumer,
-            payload=payload,
-            retries=0,
-            state=ConsumerEventState.NEW.value,
-            event_type=event_type.value
+    """
+    creates the event for all consumers of the data series in a single statement.
+
+    :param consumer_ids: the (possibly cached) consumers of the data series, if known already.
+    If not passed, the consumers are resolved as part of the statement.
+    """
+    if consumer_ids is not None and len(consumer_ids) == 0:
+        return
+
+    columns = ['tenant_id', 'consumer_id', 'point_in_time', 'last_updated_at', 'backoff_cycles', 'retries_in_cycle',
+               'retries', 'payload', 'state', 'event_type']
+    values = ['%(tenant_id)s', '"c"."id"', '%(point_in_time)s', '%(now)s', '0', '0',
+              '0', '%(payload)s', '%(state)s', '%(event_type)s']
+    if sub_clock is not None:
+        # an untyped NULL would be inserted as text
+        columns.append('sub_clock')
+        values.append('%(sub_clock)s')
+
+    query_params: Dict[str, Any] = {
+        'tenant_id': tenant.id,
+        'point_in_time': point_in_time,
+        'now': timezone.now(),
+        'payload': Jsonb(payload),
+        'state': ConsumerEventState.NEW.value,
+        'event_type': event_type.value,
+        'sub_clock': sub_clock
+    }
+
+    if consumer_ids is None:
+        consumer_filter = f"""
+        JOIN {escape.escape(DataSeries_Consumer._meta.db_table)} AS "ds_c" ON "ds_c"."consumer_id" = "c"."id"
+        WHERE "ds_c"."data_series_id" = %(data_series_id)s
+        AND "c"."tenant_id" = %(tenant_id)s
+        AND "c"."deleted_at" IS NULL
+        """
+        query_params['data_series_id'] = UUID(str(data_series_id))
+    else:
+        # the cached ids might include consumers that were deleted in the meantime
+        consumer_filter = """
+        WHERE "c"."id" = ANY(%(consumer_ids)s)
+        AND "c"."tenant_id" = %(tenant_id)s
+        AND "c"."deleted_at" IS NULL
+        """
+        query_params['consumer_ids'] = [UUID(str(consumer_id)) for consumer_id in consumer_ids]
+
+    insert_query = f"""
+            INSERT INTO {escape.escape(ConsumerEvent._meta.db_table)} ({', '.join(f'"{column}"' for column in columns)})
+            SELECT {', '.join(values)}
+            FROM {escape.escape(Consumer._meta.db_table)} AS "c"
+            {consumer_filter}
+            """
+
+    if environment_common.SKIPPER_CONSUMER_EVENT_NOTIFY_ENABLED:
+        # wake up the consumers that got new events once we commit, see event_dispatcher
+        query = f"""
+            WITH "inserted" AS (
+                {insert_query}
+                RETURNING "tenant_id", "consumer_id"
+            )
+            SELECT pg_notify(%(notify_channel)s, "n"."payload")
+            FROM (
+                SELECT DISTINCT concat("inserted"."tenant_id", ':', "inserted"."consumer_id") AS "payload"
+                FROM "inserted"
+            ) AS "n"
+            """
+        query_params['notify_channel'] = CONSUMER_EVENT_CHANNEL
+    else:
+        query = insert_query
+
+    # same connection (and therefore transaction) the ORM would write the events with
+    with sql_cursor(router.db_for_write(ConsumerEvent)) as cursor:
+        cursor.execute(
+            query,
+            query_params
         )
 
 
@@ -180,6 +261,135 @@ def identity(x: Any) -> Any:
     return x
 
 
+CONSUMER_SESSION_POOL_MAXSIZE = 10
+
+_consumer_sessions: Dict[str, requests.Session] = {}
+_consumer_sessions_lock = threading.Lock()
+
+
+def pooled_consumer_session(url: str) -> requests.Session:
+    """
+    persistent session per target (scheme and host), so that consumers
+    reuse connections instead of paying for a new TCP/TLS handshake on every request.
+    Cookies are never stored, so nothing leaks between consumers sharing the same target.
+    """
+    _split_url = urlsplit(url)
+    key = f'{_split_url.scheme}://{_split_url.netloc}'
+    with _consumer_sessions_lock:
+        session = _consumer_sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=CONSUMER_SESSION_POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _consumer_sessions[key] = session
+        return session
+
+
+def _event_body(event: ConsumerEvent, tenant_name: str) -> Dict[str, Any]:
+    body: Dict[str, Any] = {
+        'point_in_time': event.point_in_time.isoformat(),
+        'event_type': event.event_type,
+        'tenant': tenant_name,
+        'payload': event.payload
+    }
+    if event.sub_clock:
+        body['sub_clock'] = event.sub_clock
+    return body
+
+
+def _consumer_headers(consumer: Consumer) -> Dict[str, str]:
+    headers = consumer.headers
+    if headers is None:
+        headers = {}  # type: ignore
+    if 'User-Agent' not in headers:
+        headers['User-Agent'] = fake_agent()
+    return cast(Dict[str, str], headers)
+
+
+def _start_handling(event: ConsumerEvent, consumer: Consumer) -> None:
+    if event.handle_at is not None and event.retries_in_cycle >= consumer.retry_backoff_every:
+        # we are starting a new cycle, so reset the counter
+        # and continue normal handling
+        event.backoff_cycles = event.backoff_cycles + 1
+        event.retries_in_cycle = 0
+
+
+def _record_failure(event: ConsumerEvent, consumer: Consumer, _resp: Optional[requests.Response]) -> str:
+    """
+    updates the event after a failed delivery and returns the new health of the consumer
+    """
+    if _resp is None:
+        event.response = None
+        event.status_code = None
+        event.response_headers = None
+    event.exception = traceback.format_exc()
+    event.retries = event.retries + 1
+    event.retries_in_cycle = event.retries_in_cycle + 1
+
+    new_health = ConsumerHealthState.UNHEALTHY.value
+
+    if _resp is not None and _resp.status_code == 429:
+        # too many requests
+        new_health = ConsumerHealthState.RATE_LIMIT.value
+        # if we dont get the retry value from the response
+        # we just use our own backoff
+        event.handle_at = retry_at_from_response(_resp) or timezone.now() + consumer.retry_backoff_delay
+    elif event.retries_in_cycle >= consumer.retry_backoff_every:
+        event.handle_at = timezone.now() + consumer.retry_backoff_delay
+
+    # noinspection PyChainedComparisons
+    if consumer.retry_max > 0 and event.retries > consumer.retry_max:
+        event.state = ConsumerEventState.FAILED.value
+    else:
+        event.state = ConsumerEventState.RETRY.value
+    return new_health
+
+
+def _post(
+    post: Callable[..., requests.Response],
+    consumer: Consumer,
+    proxy_url: Optional[str],
+    body: Dict[str, Any]
+) -> requests.Response:
+    url = consumer.target
+    headers = _consumer_headers(consumer)
+    if proxy_url is not None and proxy_url != '':
+        return post(
+            proxy_url,
+            headers={
+                **headers,
+                'x-skipper-proxied-host': urlsplit(url).hostname,
+                'x-skipper-proxied-url': url,
+            },
+            json=body,
+            timeout=consumer.timeout,
+            allow_redirects=False
+        )
+    return post(
+        url,
+        headers=headers,
+        json=body,
+        timeout=consumer.timeout,
+        allow_redirects=False
+    )
+
+
+def _observe_delivery(consumer: Consumer, events: Sequence[ConsumerEvent], started: float, success: bool) -> None:
+    consumer_label = str(consumer.id)
+    metrics.CONSUMER_DELIVERY_SECONDS.labels(
+        consumer=consumer_label,
+        outcome='success' if success else 'failure'
+    ).observe(time.monotonic() - started)
+    if success and len(events) > 0:
+        now = timezone.now()
+        for event in events:
+            lag = (now - event.point_in_time).total_seconds()
+            metrics.CONSUMER_EVENT_LAG_SECONDS.labels(consumer=consumer_label).observe(lag)
+        metrics.CONSUMER_EVENT_LAST_LAG_SECONDS.labels(consumer=consumer_label).set(lag)
+
+
 def try_send_events(
     consumer: Consumer,
     proxy_url: Optional[str],
@@ -219,13 +429,29 @@ def try_send_events(
                 consumer=consumer
             ).select_for_update().order_by('retries', 'point_in_time', 'id', 'sub_clock').all()
         _iterable: Iterable[ConsumerEvent]
+        _cursor_iterable: Optional[Generator[ConsumerEvent, None, None]] = None
 
         if max_events is None:
-            _iterable = _qs.iterator()
+            _cursor_iterable = cast(Generator[ConsumerEvent, None, None], _qs.iterator())
+            _iterable = _cursor_iterable
         else:
             # one more so we can check if there are any left at the end
             _iterable = _qs[:(max_events + 1)]
-        
+
+        if consumer.batch_size is not None:
+            more_events, cnt, health = _try_send_event_batches(
+                consumer=consumer,
+                events=_iterable,
+                proxy_url=proxy_url,
+                log_errors=log_errors,
+                max_events=max_events,
+                tenant_name=tenant_name,
+                sanitize_response=sanitize_response,
+                sanitize_headers=sanitize_headers
+            )
+            _iterable = []
+
+        session = pooled_consumer_session(proxy_url if proxy_url is not None and proxy_url != '' else consumer.target)
         for event in _iterable:
             if max_events is not None and cnt >= max_events:
                 # don't handle this one, but return True as there are more events to process
@@ -234,51 +460,15 @@ def try_send_events(
             cnt += 1
             failed = False
             with transaction.atomic():
-                if event.handle_at is not None:
-                    if event.handle_at > timezone.now():
-                        # we are not allowed to handle this event just yet
-                        break
-                    elif event.retries_in_cycle >= consumer.retry_backoff_every:
-                        # we are starting a new cycle, so reset the counter
-                        # and continue normal handling
-                        event.backoff_cycles = event.backoff_cycles + 1
-                        event.retries_in_cycle = 0
-                url = consumer.target
-                body: Dict[str, Any] = {
-                    'point_in_time': event.point_in_time.isoformat(),
-                    'event_type': event.event_type,
-                    'tenant': tenant_name,
-                    'payload': event.payload
-                }
-                if event.sub_clock:
-                    body['sub_clock'] = event.sub_clock
-                headers = consumer.headers
-                if headers is None:
-                    headers = {}  # type: ignore
-                if 'User-Agent' not in headers:
-                    headers['User-Agent'] = fake_agent()
+                if event.handle_at is not None and event.handle_at > timezone.now():
+                    # we are not allowed to handle this event just yet
+                    break
+                _start_handling(event, consumer)
+                body = _event_body(event, tenant_name)
+                started = time.monotonic()
                 try:
                     _resp: Optional[requests.Response] = None
-                    if proxy_url is not None and proxy_url != '':
-                        _resp = requests.post(
-                            proxy_url,
-                            headers={
-                                **headers,
-                                'x-skipper-proxied-host': _split_target_url.hostname,
-                                'x-skipper-proxied-url': url,
-                            },
-                            json=body,
-                            timeout=consumer.timeout,
-                            allow_redirects=False
-                        )
-                    else:
-                        _resp = requests.post(
-                            url,
-                            headers=headers,
-                            json=body,
-                            timeout=consumer.timeout,
-                            allow_redirects=False
-                        )
+                    _resp = _post(session.post, consumer, proxy_url, body)
                     event.response = sanitize_response(_resp.text)
                     event.status_code = _resp.status_code
                     event.response_headers = sanitize_headers(dict(_resp.headers))
@@ -289,47 +479,123 @@ def try_send_events(
                     logger.info(f'successfully sent message for event with id {event.id} ({event.event_type}) to'
                                 f' consumer at {consumer.target}, setting to SUCCESS...')
                 except:
-                    if _resp is None:
-                        event.response = None
-                        event.status_code = None
-                        event.response_headers = None
-                    event.exception = traceback.format_exc()
                     failed = True
-                    event.retries = event.retries + 1
-                    event.retries_in_cycle = event.retries_in_cycle + 1
-
-                    new_health = ConsumerHealthState.UNHEALTHY.value
-
-                    if _resp is not None and _resp.status_code == 429:
-                        # too many requests
-                        new_health = ConsumerHealthState.RATE_LIMIT.value
-                        # if we dont get the retry value from the response
-                        # we just use our own backoff
-                        event.handle_at = retry_at_from_response(_resp) or timezone.now() + consumer.retry_backoff_delay
-                    elif event.retries_in_cycle >= consumer.retry_backoff_every:
-                        event.handle_at = timezone.now() + consumer.retry_backoff_delay
-
-                    # noinspection PyChainedComparisons
-                    if consumer.retry_max > 0 and event.retries > consumer.retry_max:
-                        health = new_health
-                        if log_errors:
-                            logger.exception(f'failed to send message to consumer at {consumer.target}, setting to FAILED...')
-                        event.state = ConsumerEventState.FAILED.value
-                    else:
-                        health = new_health
-                        if log_errors:
-                            logger.exception(f'failed to send message to consumer at {consumer.target}, setting to RETRY...')
-                        event.state = ConsumerEventState.RETRY.value
+                    health = _record_failure(event, consumer, _resp)
+                    if log_errors:
+                        logger.exception(f'failed to send message to consumer at {consumer.target}, setting to {event.state}...')
+                _observe_delivery(consumer, [event], started, not failed)
                 event.save()
             if failed:
                 break
 
+        if _cursor_iterable is not None:
+            # close the server side cursor while its transaction is still open. Otherwise it is closed
+            # whenever the generator is collected, and if the transaction is gone by then, that aborts the current one
+            _cursor_iterable.close()
+
         if consumer.health != health:
             consumer.health = health
             consumer.save(update_fields=['health'])
 
         return more_events, cnt
 
+
+def _try_send_event_batches(
+    consumer: Consumer,
+    events: Iterable[ConsumerEvent],
+    proxy_url: Optional[str],
+    log_errors: bool,
+    max_events: Optional[int],
+    tenant_name: str,
+    sanitize_response: Callable[[str], str],
+    sanitize_headers: Callable[[Dict[str, str]], Dict[str, str]]
+) -> Tuple[bool, int, str]:
+    """
+    batched delivery: up to consumer.batch_size events are sent in a single request
+    as {"events": [...]} over a pooled connection, the state of all events of a batch is
+    updated in bulk afterwards. A failed request fails all events of the batch.
+    """
+    health = consumer.health
+    session = pooled_consumer_session(proxy_url if proxy_url is not None and proxy_url != '' else consumer.target)
+    batch_size = cast(int, consumer.batch_size)
+
+    def send_batch(batch: List[ConsumerEvent]) -> bool:
+        nonlocal health
+        with transaction.atomic():
+            for event in batch:
+                _start_handling(event, consumer)
+            body = {
+                'events': [_event_body(event, tenant_name) for event in batch]
+            }
+            success = True
+            started = time.monotonic()
+            try:
+                _resp: Optional[requests.Response] = None
+                _resp = _post(session.post, consumer, proxy_url, body)
+                response = sanitize_response(_resp.text)
+                response_headers = sanitize_headers(dict(_resp.headers))
+                for event in batch:
+                    event.response = response
+                    event.status_code = _resp.status_code
+                    event.response_headers = response_headers
+                _resp.raise_for_status()
+                for event in batch:
+                    event.exception = None
+                    event.state = ConsumerEventState.SUCCESS.value
+                health = ConsumerHealthState.HEALTHY.value
+                logger.info(f'successfully sent batch of {len(batch)} events to consumer at {consumer.target}, '
+                            f'setting to SUCCESS...')
+            except:
+                success = False
+                for event in batch:
+                    health = _record_failure(event, consumer, _resp)
+                if log_errors:
+                    logger.exception(f'failed to send batch of {len(batch)} events to consumer at {consumer.target}')
+            _observe_delivery(consumer, batch, started, success)
+            now = timezone.now()
+            for event in batch:
+                # bulk_update does not handle auto_now
+                event.last_updated_at = now
+            ConsumerEvent.objects.bulk_update(batch, fields=[
+                'last_updated_at',
+                'backoff_cycles',
+                'retries_in_cycle',
+                'handle_at',
+                'retries',
+                'state',
+                'response',
+                'response_headers',
+                'status_code',
+                'exception'
+            ])
+            return success
+
+    cnt = 0
+    more_events = False
+    failed = False
+    pending: List[ConsumerEvent] = []
+    for event in events:
+        if max_events is not None and cnt >= max_events:
+            # don't handle this one, but return True as there are more events to process
+            more_events = True
+            break
+        if event.handle_at is not None and event.handle_at > timezone.now():
+            # we are not allowed to handle this event (and thus any later one) just yet
+            break
+        cnt += 1
+        pending.append(event)
+        if len(pending) >= batch_size:
+            failed = not send_batch(pending)
+            pending = []
+            if failed:
+                break
+
+    if len(pending) > 0:
+        send_batch(pending)
+
+    return more_events, cnt, health
+
+
 def retry_at_from_response(_response: requests.Response) -> Optional[datetime.datetime]:
     try:
         if 'Retry-After' in _response.headers:
@@ -5,7 +5,7 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 from datetime import timedelta
-from django.core.validators import MinValueValidator, URLValidator
+from django.core.validators import MinValueValidator, MaxValueValidator, URLValidator
 from django.db.models import URLField, FloatField, IntegerField, DurationField, CharField
 from enum import Enum
 from typing import Tuple, cast, Dict
@@ -53,6 +53,10 @@ class Consumer(DataSeriesMetaModel):  # type: ignore
 
     mode = CharField(max_length=100, null=False, default=ConsumerMode.IN_ORDER.value, choices=ConsumerMode.choices(), db_index=False)
 
+    # opt-in: if set, events are sent in batches of up to batch_size events per request
+    # (as {"events": [...]}) over a persistent connection instead of one request per event
+    batch_size = IntegerField(null=True, blank=True, default=None, validators=[MinValueValidator(1), MaxValueValidator(1000)])
+
     # by default backoff every 1
     retry_backoff_every = IntegerField(null=False, default=1)
     # if we have to back off, add 30 seconds delay by default
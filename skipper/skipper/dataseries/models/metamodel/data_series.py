@@ -4,11 +4,13 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
+import uuid
+
 from django.core.exceptions import ValidationError
 from django.core.validators import BaseValidator
-from django.db.models import BooleanField, Q, UniqueConstraint, QuerySet, CharField
+from django.db.models import BooleanField, Q, UniqueConstraint, QuerySet, CharField, UUIDField
 from enum import Enum
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Union
 from typing import TYPE_CHECKING
 
 from skipper.core.models import fields, softdelete
@@ -52,6 +54,11 @@ class ExtraConfigParameters(Enum):
         'default': -1,
         'type': 'integer'
     }
+    skip_unchanged_data_points = {
+        'key': 'skip_unchanged_data_points',
+        'default': False,
+        'type': 'boolean'
+    }
 
 
 def default_extra_config() -> Dict[str, Any]:
@@ -79,6 +86,11 @@ extra_config_validators: List[BaseValidator] = [
                         "$id": f"#/properties/{ExtraConfigParameters.auto_clean_meta_model_after_days.value['key']}",
                         "type": ExtraConfigParameters.auto_clean_meta_model_after_days.value['type'],
                         "default": ExtraConfigParameters.auto_clean_meta_model_after_days.value['default']
+                    },
+                    f"{ExtraConfigParameters.skip_unchanged_data_points.value['key']}": {
+                        "$id": f"#/properties/{ExtraConfigParameters.skip_unchanged_data_points.value['key']}",
+                        "type": ExtraConfigParameters.skip_unchanged_data_points.value['type'],
+                        "default": ExtraConfigParameters.skip_unchanged_data_points.value['default']
                     }
                 },
                 "additionalProperties": False
@@ -97,6 +109,16 @@ class DataSeries(SoftDeleteTenantValidateExternalIdMixin, DataSeriesMetaModel):
                         default=default_backend.value)
     extra_config = fields.json_field(validators=extra_config_validators)
     locked = BooleanField(null=False, default=False)
+    backend_migration_in_progress = BooleanField(null=False, default=False)
+    """
+    set while an online backend migration moves the data of this data series and writes
+    have to take part in it, see no_history_to_flat_history.copy_on_write
+    """
+    structure_version = UUIDField(null=False, default=uuid.uuid4, editable=False)
+    """
+    random token that is rotated whenever the structure (facts, dimensions, indexes, consumers) of this
+    data series changes, used as part of the cache key for cached structure information
+    """
 
     dataseries_floatfact_set: 'SoftDeletionQuerySet[DataSeries_FloatFact]'
     dataseries_stringfact_set: 'SoftDeletionQuerySet[DataSeries_StringFact]'
@@ -115,6 +137,20 @@ class DataSeries(SoftDeleteTenantValidateExternalIdMixin, DataSeriesMetaModel):
     objects: 'softdelete.SoftDeletionManager[DataSeries]'  # type: ignore
     all_objects: 'softdelete.SoftDeletionManager[DataSeries]'  # type: ignore
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        adding = self._state.adding
+        # never write back a structure version we read earlier,
+        # any change of the data series itself (e.g. backend, locked) changes its structure information
+        self.structure_version = uuid.uuid4()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = [*kwargs['update_fields'], 'structure_version']
+        super().save(*args, **kwargs)
+        if not adding:
+            # data series referencing us via a dimension contain our backend/locked information as well
+            DataSeries.all_objects.filter(
+                dataseries_dimension__dimension__reference_id=self.id
+            ).exclude(id=self.id).update(structure_version=uuid.uuid4())
+
     def get_backend_type(self) -> StorageBackendType:
         return StorageBackendType.from_string(self.backend)
 
@@ -166,3 +202,9 @@ class DataSeries(SoftDeleteTenantValidateExternalIdMixin, DataSeriesMetaModel):
         return f'DataSeries "{self.name}" ({str(self.external_id)},{str(self.id)})'
 
 
+def rotate_structure_version(data_series_id: Union[str, uuid.UUID]) -> None:
+    """
+    marks the structure (facts, dimensions, indexes, consumers) of the given data series as changed.
+    Must be called in the same transaction as the change of the structure itself.
+    """
+    DataSeries.all_objects.filter(id=data_series_id).update(structure_version=uuid.uuid4())
@@ -5,7 +5,8 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 from django.contrib.auth.models import User
-from django.db.models import ForeignKey, DO_NOTHING, BigAutoField, DateTimeField, CASCADE, TextField, BigIntegerField
+from django.db.models import ForeignKey, DO_NOTHING, BigAutoField, DateTimeField, CASCADE, TextField, BigIntegerField, \
+    BinaryField
 from django.db.models.base import Model
 from django.db.models.fields.json import JSONField  # type: ignore
 from django_multitenant.fields import TenantForeignKey  # type: ignore
@@ -41,6 +42,10 @@ class BulkInsertTaskData(TenantModelMixin, Model):  # type: ignore
     # but for now this is just fine and flexible enough
     data = JSONField(null=False, encoder=JSONEncoder)
 
+    # the validated data points in the format of storage.dynamic_sql.bulk_task_data. If this is set,
+    # data only contains the serialization keys. Older task data has the validated data points in data instead
+    compressed_data = BinaryField(null=True, default=None)
+
     last_error = JSONField(null=True, default=None)
 
     user = ForeignKey(User, on_delete=DO_NOTHING, db_constraint=False, db_index=False)
@@ -8,7 +8,7 @@ from django.conf.urls import include
 from django.contrib import admin
 from django.urls import path, re_path
 from rest_framework import routers
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional
 
 from skipper import modules
 from skipper.core.feature_flags import get_feature_flag
@@ -22,7 +22,7 @@ from skipper.dataseries.models import ConsumerEvent, BulkInsertTaskData, MetaMod
 from skipper.dataseries.models.analytics import PostgresAnalyticsUser
 from skipper.dataseries.models.metamodel.consumer import Consumer
 from skipper.dataseries.models.metamodel.data_series import DataSeries
-from skipper.dataseries.views.datapoint.bulk import DataSeriesBulkCreateView
+from skipper.dataseries.views.datapoint.bulk import DataSeriesBulkCreateView, DataSeriesBulkDeleteView
 from skipper.dataseries.views.datapoint.check_external_id import DataSeriesCheckExternalIdsView
 from skipper.dataseries.views.datapoint.crud import DataSeries_DataPointViewSet, history_DataSeries_DataPointViewSet
 from skipper.dataseries.views.event import DataSeries_ConsumerEventViewSet
@@ -185,16 +185,18 @@ def get_urls(module_settings: Dict[str, Any]) -> List[Any]:
         ),
     ]
 
-    def add_view(pattern: str, view: Any, name: str) -> None:
+    def add_view(pattern: str, view: Any, name: str, actions: Optional[Dict[str, str]] = None) -> None:
+        # viewsets need the mapping of http methods to actions
+        as_view = (lambda: view.as_view(actions)) if actions is not None else view.as_view
         urls.extend([
             re_path(
                 '^' + pattern,
-                view.as_view(),
+                as_view(),
                 name=name
             ),
             re_path(
                 '^by-external-id/' + pattern,
-                view.as_view(),
+                as_view(),
                 name=name + 'by-external-id',
                 kwargs={
                     # does not matter what we set here, we only need it to be present
@@ -209,6 +211,26 @@ def get_urls(module_settings: Dict[str, Any]) -> List[Any]:
         name=constants.data_series_data_point_base_name + '-create-bulk'
     )
 
+    add_view(
+        r'dataseries/(?P<data_series>[^/.]+)/bulk/delete/',
+        DataSeriesBulkDeleteView,
+        name=constants.data_series_data_point_base_name + '-delete-bulk'
+    )
+
+    add_view(
+        r'dataseries/(?P<data_series>[^/.]+)/export/datapoint/',
+        DataSeries_DataPointViewSet,
+        name=constants.data_series_data_point_base_name + '-export',
+        actions={'get': 'export'}
+    )
+
+    add_view(
+        r'dataseries/(?P<data_series>[^/.]+)/export/history/datapoint/',
+        history_DataSeries_DataPointViewSet,
+        name=constants.data_series_history_data_point_base_name + '-export',
+        actions={'get': 'export'}
+    )
+
     add_view(
         r'dataseries/(?P<data_series>[^/.]+)/bulk/check-external-ids/',
         DataSeriesCheckExternalIdsView,
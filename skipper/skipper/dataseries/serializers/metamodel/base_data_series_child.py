@@ -12,7 +12,7 @@ from typing import Type, Any, Dict, cast
 from rest_framework import serializers
 
 from skipper.core.exceptions import http as http_exceptions
-from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.models.metamodel.data_series import DataSeries, rotate_structure_version
 from skipper.dataseries.models.metamodel.django_base import DataSeriesMetaModel, DataSeriesChildRelationModel
 from skipper.core.models.validation import validate_external_id_sql_safe
 from skipper.dataseries.serializers.metamodel.base import DataSeriesBaseSerializer
@@ -113,5 +113,12 @@ class BaseDefaultDataSeriesChildSerializer(DataSeriesBaseSerializer):
             self.relation_model.objects.create(
                 **args
             ).save()
+            rotate_structure_version(data_series.id)
 
-            return child
\ No newline at end of file
+            return child
+
+    def update(self, instance: DataSeriesMetaModel, validated_data: Dict[str, Any]) -> DataSeriesMetaModel:
+        with transaction.atomic():
+            updated = cast(DataSeriesMetaModel, super().update(instance, validated_data))
+            rotate_structure_version(self._get_data_series().id)
+            return updated
\ No newline at end of file
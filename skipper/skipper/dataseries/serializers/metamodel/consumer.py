@@ -94,6 +94,7 @@ class ConsumerSerializer(BaseDefaultDataSeriesChildSerializer):
         fields = _named_serializer_fields((
             'target',
             'mode',
+            'batch_size',
             'headers',
             'timeout',
             'retry_backoff_every',
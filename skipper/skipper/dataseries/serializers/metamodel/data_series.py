@@ -89,6 +89,18 @@ def get_sub_views() -> List[Dict[str, str]]:
             'sub_path': 'data_points_bulk',
             'view_name': constants.data_series_data_point_base_name + '-create-bulk'
         },
+        {
+            'sub_path': 'data_points_bulk_delete',
+            'view_name': constants.data_series_data_point_base_name + '-delete-bulk'
+        },
+        {
+            'sub_path': 'data_points_export',
+            'view_name': constants.data_series_data_point_base_name + '-export'
+        },
+        {
+            'sub_path': 'history_data_points_export',
+            'view_name': constants.data_series_history_data_point_base_name + '-export'
+        },
         {
             'sub_path': 'data_point_validate_external_ids',
             'view_name': constants.data_series_data_point_base_name + '-check-external-ids'
@@ -266,6 +278,8 @@ class DataSeriesSerializer(DataSeriesBaseSerializer):
                     # so it is advised to use some kind of maintenance mode for nfcompose
                     # this is just a best effort to lock out writes to the dataseries
                     # (writes are not lost, but not in the materialized table)
+                    # online migrations (SKIPPER_DATA_SERIES_ONLINE_BACKEND_MIGRATION) unlock the data series
+                    # again as soon as the structure for the new backend exists and move the data afterwards
                     with transaction.atomic():
                         returned = super(DataSeriesSerializer, self).update(data_series, validated_data)
                         self.did_lock_data_series = True
@@ -4,13 +4,13 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
-from typing import Dict, Any, List, cast
+from typing import Dict, Any, List, Optional, cast
 from uuid import UUID
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
 from rest_framework.generics import get_object_or_404
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, models, transaction
 from django.db.models import Model, QuerySet
 from django_multitenant.utils import get_current_tenant  # type: ignore
 
@@ -171,6 +171,29 @@ class IndexHyperlinkedIdentityField(MultipleParameterHyperlinkedIdentityField):
         return {'data_series': index.dataseries_userdefinedindex.data_series.id}
 
 
+def _build_states(data_series: DataSeries, indexes: List[UserDefinedIndex]) -> Dict[UUID, Dict[str, Any]]:
+    return storage_actions.user_defined_index_build_states(
+        backends_by_index_id={index.id: data_series.backend for index in indexes},
+        tenant_name=data_series.tenant.name
+    )
+
+
+class IndexListSerializer(serializers.ListSerializer):  # type: ignore
+    """
+    fetches the build states of all indexes of a page at once instead of index by index
+    """
+
+    def to_representation(self, data: Any) -> Any:
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items: List[UserDefinedIndex] = list(iterable)
+        child = cast(IndexSerializer, self.child)
+        child.build_states = _build_states(child._get_data_series(), items) if len(items) > 0 else None
+        try:
+            return super().to_representation(items)
+        finally:
+            child.build_states = None
+
+
 class IndexSerializer(BaseDefaultDataSeriesChildSerializer):
     url = IndexHyperlinkedIdentityField(view_name=constants.data_series_index_base_name + '-detail')
     targets = WriteIndexTargetSerializer(many=True, write_only=True)
@@ -180,6 +203,9 @@ class IndexSerializer(BaseDefaultDataSeriesChildSerializer):
     child_model = UserDefinedIndex
     relation_model = DataSeries_UserDefinedIndex
 
+    # set by IndexListSerializer
+    build_states: Optional[Dict[UUID, Dict[str, Any]]] = None
+
     def to_representation(self, obj: UserDefinedIndex) -> Any:
         representation = super().to_representation(obj)
 
@@ -188,6 +214,11 @@ class IndexSerializer(BaseDefaultDataSeriesChildSerializer):
         representation['targets'] = targets_serializer.to_representation(
             obj.userdefinedindex_target_set.order_by('target_position_in_index_order').all())  # type: ignore
 
+        build_states = self.build_states
+        if build_states is None or obj.id not in build_states:
+            build_states = _build_states(self._get_data_series(), [obj])
+        representation['build'] = build_states[obj.id]
+
         return representation
 
     def _access_existing_data_series(self: Any, pk: str) -> DataSeries:
@@ -298,3 +329,4 @@ class IndexSerializer(BaseDefaultDataSeriesChildSerializer):
     class Meta:
         model = UserDefinedIndex
         fields = _named_serializer_fields(('targets',))
+        list_serializer_class = IndexListSerializer
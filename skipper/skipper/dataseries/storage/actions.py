@@ -12,7 +12,7 @@ to the correct storage backend
 import uuid
 
 from rest_framework.exceptions import APIException
-from typing import List, Union, Dict, Any
+from typing import List, Union, Dict, Any, Mapping
 
 from skipper.core.models.tenant import Tenant
 from skipper.dataseries.models.metamodel.data_series import DataSeries
@@ -78,6 +78,16 @@ def handle_create_user_defined_index(data_series_id: uuid.UUID, data_series_exte
                                                          index_id=index_id)
 
 
+def user_defined_index_build_states(
+    backends_by_index_id: Mapping[uuid.UUID, str], tenant_name: str
+) -> Dict[uuid.UUID, Dict[str, Any]]:
+    from skipper.dataseries.storage.dynamic_sql import actions as dynamic_sql_actions
+    return dynamic_sql_actions.user_defined_index_build_states(
+        backends_by_index_id=backends_by_index_id,
+        tenant_name=tenant_name
+    )
+
+
 def nuke_data_series(
     tenant_id: str,
     backend_type: str,
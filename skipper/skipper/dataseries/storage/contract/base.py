@@ -16,7 +16,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.request import Request
 from rest_framework.serializers import SerializerMetaclass
-from typing import Dict, Any, Optional, Union, Tuple, List
+from typing import Dict, Any, Optional, Union, Tuple, List, Iterable
 from uuid import UUID
 
 from skipper.core.serializers.base import BaseSerializer
@@ -25,12 +25,14 @@ from skipper.dataseries import constants
 from skipper.dataseries.models.metamodel.data_series import DataSeries
 from skipper.dataseries.raw_sql import dbtime
 from skipper.dataseries.storage import repositories
+from skipper.dataseries.storage.contract import StorageBackendType
 from skipper.dataseries.storage.contract.fields import DataPointHyperlinkedIdentityField
 from skipper.dataseries.storage.contract.repository import ReadOnlyDataPoint
-from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo, compute_data_series_query_info, \
-    DataPointSerializationKeys, compute_basic_data_series_query_info
+from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo, \
+    DataPointSerializationKeys, compute_basic_data_series_query_info, BasicDataSeriesQueryInfo
+from skipper.dataseries.storage.static_ds_information_cache import cached_data_series_query_info
 from skipper.dataseries.storage.uuid import gen_uuid
-from skipper.dataseries.storage.validate import validate, ValidationRequest
+from skipper.dataseries.storage.validate import validate, ValidationRequest, collect_dimension_references
 from skipper.dataseries.storage.validate.contract import DataPointAccessor
 from skipper.dataseries.views.contract import get_data_series_id
 from skipper.dataseries.views.datapoint.external_id import use_external_id_as_dimension_identifier
@@ -50,6 +52,55 @@ class ABCSerializerMeta(ABCMeta, SerializerMetaclass):
     pass
 
 
+class _PrefetchingDataPointAccessor:
+    """
+    DataPointAccessor that remembers every data point it has looked up
+    for the lifetime of the serializer and that can be primed in bulk.
+    """
+
+    def __init__(self) -> None:
+        self.__basic_query_info = Memoize(self.__compute_basic_query_info)
+        self.__data_points: Dict[Tuple[str, str], Optional[ReadOnlyDataPoint]] = {}
+
+    @staticmethod
+    def __compute_basic_query_info(data_series_id: str) -> BasicDataSeriesQueryInfo:
+        return compute_basic_data_series_query_info(DataSeries.objects.get(id=data_series_id))
+
+    def prefetch(self, data_series_id: Union[str, UUID], identifiers: Iterable[str]) -> None:
+        _missing = [
+            identifier for identifier in identifiers
+            if (str(data_series_id), identifier) not in self.__data_points
+        ]
+        if len(_missing) == 0:
+            return
+
+        _basic_query_info = self.__basic_query_info(str(data_series_id))
+        _found = repositories.repository(
+            StorageBackendType.from_string(_basic_query_info.backend)
+        ).get_data_points(_missing, _basic_query_info)
+
+        for identifier in _missing:
+            self.__data_points[(str(data_series_id), identifier)] = _found.get(identifier, None)
+
+    def __call__(self, identifier: str, data_series_id: Union[str, UUID]) -> Optional[ReadOnlyDataPoint]:
+        if (str(data_series_id), identifier) not in self.__data_points:
+            self.prefetch(data_series_id=data_series_id, identifiers=[identifier])
+        return self.__data_points[(str(data_series_id), identifier)]
+
+
+class BaseDataPointModificationListSerializer(serializers.ListSerializer):  # type: ignore
+    """
+    validates all data points of a bulk request while resolving
+    the data points referenced in dimensions in bulk instead of row by row
+    """
+
+    def to_internal_value(self, data: Any) -> Any:
+        if isinstance(data, list):
+            # anything else is rejected with the proper error message by DRF
+            self.child.prefetch_dimension_references(data)  # type: ignore
+        return super().to_internal_value(data)
+
+
 class BaseDataPointModificationSerializer(BaseDataPointSerializer, metaclass=ABCSerializerMeta):
     """
     Base serializer class for C_U_ (as in CRUD) operations
@@ -93,9 +144,10 @@ class BaseDataPointModificationSerializer(BaseDataPointSerializer, metaclass=ABC
             return data_series
 
         self.__get_data_series = Memoize(_get_data_series)
+        self.__data_point_accessor = _PrefetchingDataPointAccessor()
 
         if self.data_series_children_query_info is None:
-            self.data_series_children_query_info = compute_data_series_query_info(self.__get_data_series(self))
+            self.data_series_children_query_info = cached_data_series_query_info(self.__get_data_series(self))
 
         if 'bulk_insert' in kwargs:
             self.bulk_insert = kwargs['bulk_insert']
@@ -141,24 +193,6 @@ class BaseDataPointModificationSerializer(BaseDataPointSerializer, metaclass=ABC
                     external_id=data_point_id
                 )
 
-        # TODO: cache this for the lifetime of the serializer
-        def ___data_point_accessor(
-            x: Tuple[str, Union[str, UUID]],
-        ) -> Optional[ReadOnlyDataPoint]:
-            identifier, data_series_id = x
-            _ds = DataSeries.objects.get(id=data_series_id)
-
-            _basic_query_info = compute_basic_data_series_query_info(
-                _ds
-            )
-
-            return repositories.repository(_ds.get_backend_type()).get_data_point(identifier, _basic_query_info)
-
-        __data_point_accessor = Memoize(___data_point_accessor)
-
-        def _data_point_accessor(identifier: str, data_series_id: Union[str, UUID]) -> Optional[ReadOnlyDataPoint]:
-            return __data_point_accessor((identifier, data_series_id))
-
         return validate(
             data=attrs,
             request=ValidationRequest(
@@ -167,10 +201,44 @@ class BaseDataPointModificationSerializer(BaseDataPointSerializer, metaclass=ABC
                 data_point_id=data_point_id,
                 bulk_insert=bulk_insert,
                 external_id_as_dimension_identifier=use_external_id_as_dimension_identifier(get_dict, attrs),
-                data_point_accessor=_data_point_accessor
+                data_point_accessor=self.__data_point_accessor
             )
         )
 
+    def prefetch_dimension_references(self, datas: List[Any]) -> None:
+        """
+        checks the existence of all data points referenced by dimensions in datas with
+        a single query per referenced data series, so that validating the
+        rows one by one afterwards does not have to query for them individually
+        """
+        view: Any = self.context.get('view')
+        get_dict = view.request.GET
+
+        def _external_id_as_dimension_identifier(data: Any) -> bool:
+            request_body_data = None
+            if isinstance(data, dict) and 'identify_dimensions_by_external_id' in data:
+                try:
+                    request_body_data = {
+                        'identify_dimensions_by_external_id': self.fields['identify_dimensions_by_external_id'].run_validation(
+                            data['identify_dimensions_by_external_id']
+                        )
+                    }
+                except ValidationError:
+                    # this is reported in the actual validation
+                    pass
+            return use_external_id_as_dimension_identifier(get_dict, request_body_data)
+
+        references = collect_dimension_references(
+            datas=datas,
+            data_point_relation_info=self.data_series_children_query_info,
+            external_id_as_dimension_identifier=_external_id_as_dimension_identifier
+        )
+        for data_series_id, identifiers in references.items():
+            self.__data_point_accessor.prefetch(
+                data_series_id=data_series_id,
+                identifiers=identifiers
+            )
+
     def to_representation(self, data_point: Any) -> Any:
         # just delegate to the same serializer we use for lists here
         data_series = get_object_or_404(
@@ -20,7 +20,8 @@ from skipper.dataseries.models.metamodel.data_series import DataSeries
 from skipper.dataseries.storage.contract.base import BaseDataPointModificationSerializer
 from skipper.dataseries.storage.contract.file_storage import file_based_fact_dir
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo, \
-    compute_data_series_query_info, ReadOnlyDataSeries, data_point_serialization_keys
+    ReadOnlyDataSeries, data_point_serialization_keys
+from skipper.dataseries.storage.static_ds_information_cache import cached_data_series_query_info
 from skipper.dataseries.storage.uuid import gen_uuid
 
 
@@ -133,7 +134,7 @@ def get_data_point_serializer_for_data_series(
     payload_serializers: Dict[str, Any] = {}
 
     if data_series_query_info is None:
-        _data_series_children_query_info = compute_data_series_query_info(data_series)
+        _data_series_children_query_info = cached_data_series_query_info(data_series)
     else:
         _data_series_children_query_info = data_series_query_info
 
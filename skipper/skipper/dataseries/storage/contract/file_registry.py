@@ -14,14 +14,16 @@ from opentelemetry import trace  # type: ignore
 import logging
 
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.db import transaction, connections
 from django_multitenant.fields import TenantForeignKey  # type: ignore
 from django_multitenant.mixins import TenantModelMixin  # type: ignore
 from django_multitenant.models import TenantManager  # type: ignore
-from typing import List, Optional, Union, Protocol, Any, Dict
+from typing import List, Optional, Union, Protocol, Any, Dict, Tuple, Sequence
 
+from skipper import settings
 from skipper.dataseries.models import FileLookup
 from skipper.dataseries.raw_sql import dbtime
 from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
@@ -93,6 +95,58 @@ def save(
             )
 
 
+@dataclass
+class FileToSave:
+    fact_id: Union[str, uuid.UUID]
+    history_data_point_identifier: HistoryDataPointIdentifier
+    file: InMemoryUploadedFile
+
+
+def save_bulk(
+    storage: SaveStorage,
+    tenant_id: Union[str, uuid.UUID],
+    data_series_id: Union[str, uuid.UUID],
+    files: List[FileToSave],
+    concurrency: Optional[int] = None
+) -> None:
+    """
+    Like save, but registers all files with a single insert and uploads them concurrently.
+
+    :param concurrency: maximum number of parallel uploads, defaults to SKIPPER_DATA_SERIES_BULK_FILE_UPLOAD_CONCURRENCY
+    """
+    if len(files) == 0:
+        return
+    if concurrency is None:
+        concurrency = settings.SKIPPER_DATA_SERIES_BULK_FILE_UPLOAD_CONCURRENCY
+
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span('skipper.dataseries.storage.contract.save_bulk', attributes={
+        "skipper.func.param.tenant_id": str(tenant_id),
+        "skipper.func.param.data_series_id": str(data_series_id),
+        "skipper.func.param.files": len(files)
+    }):
+        register_bulk(
+            tenant_id=tenant_id,
+            data_series_id=data_series_id,
+            bulk=[HistoryDataPointIdentifierBulkElem(
+                fact_id=elem.fact_id,
+                history_data_point_identifier=elem.history_data_point_identifier,
+                file_name=elem.file.name
+            ) for elem in files]
+        )
+        # as in save, the files are stored immediately and not on commit
+        if concurrency <= 1 or len(files) == 1:
+            for elem in files:
+                storage.save(elem.file.name, elem.file)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(files))) as executor:
+            futures = [executor.submit(storage.save, elem.file.name, elem.file) for elem in files]
+            for future in futures:
+                # raises if an upload failed, the registration is then rolled back with the request
+                future.result()
+
+
 def register(
         tenant_id: Union[str, uuid.UUID],
         data_series_id: Union[str, uuid.UUID],
@@ -329,42 +383,187 @@ def delete_all_matching(
         )
 
 
-# this might get out of hand if too much data is expected to be garbage collected
-# if this happens, we have to do this in chunks
-def garbage_collect(
-    storage: DeleteStorage,
-    older_than: datetime.datetime
+def delete_all_for_datapoints(
+        tenant_id: Union[str, uuid.UUID],
+        data_series_id: Union[str, uuid.UUID],
+        fact_ids: Sequence[Union[str, uuid.UUID]],
+        data_point_ids: Sequence[str]
 ) -> None:
-    logger.info(f"Garbage collecting files older than {older_than}")
-    
+    """
+    set based variant of delete_all_for_datapoint for multiple facts and data points
+    """
+    if len(fact_ids) == 0 or len(data_point_ids) == 0:
+        return
+
     query_str = f"""
-        DELETE 
-        FROM "_3_file_lookup"
+        UPDATE "_3_file_lookup"
+        SET "deleted_at" = %(deleted_at)s
         WHERE
-            "deleted_at" < %(older_than)s
-        RETURNING "file_name"
+            "tenant_id" = %(tenant_id)s AND
+            "data_series_id" = %(data_series_id)s AND
+            "fact_id" = ANY(%(fact_ids)s) AND
+            "data_point_id" = ANY(%(data_point_ids)s) AND
+            "deleted_at" IS NULL
     """
 
-    garbage_files = set()
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        cursor.execute(
+            query_str,
+            {
+                'tenant_id': tenant_id,
+                'data_series_id': data_series_id,
+                'fact_ids': [uuid.UUID(str(fact_id)) for fact_id in fact_ids],
+                'data_point_ids': list(data_point_ids),
+                'deleted_at': dbtime.now()
+            }
+        )
+
+
+def delete_all_matching_bulk(
+        tenant_id: Union[str, uuid.UUID],
+        data_series_id: Union[str, uuid.UUID],
+        fact_ids: List[Union[str, uuid.UUID]],
+        history_data_point_identifiers: List[HistoryDataPointIdentifier],
+) -> None:
+    """
+    set based variant of delete_all_matching for multiple facts
+    """
+    if len(fact_ids) == 0 or len(history_data_point_identifiers) == 0:
+        return
+
+    query_str = f"""
+        UPDATE "_3_file_lookup" AS "lookup"
+        SET "deleted_at" = %(deleted_at)s
+        FROM unnest(
+            %(data_point_ids)s::varchar[],
+            %(point_in_times)s::timestamptz[],
+            %(sub_clocks)s::bigint[]
+        ) AS "to_delete"("data_point_id", "point_in_time", "sub_clock")
+        WHERE
+            "lookup"."tenant_id" = %(tenant_id)s AND
+            "lookup"."data_series_id" = %(data_series_id)s AND
+            "lookup"."fact_id" = ANY(%(fact_ids)s) AND
+            "lookup"."data_point_id" = "to_delete"."data_point_id" AND
+            "lookup"."point_in_time" = "to_delete"."point_in_time" AND
+            "lookup"."sub_clock" = "to_delete"."sub_clock" AND
+            "lookup"."deleted_at" IS NULL
+    """
+
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        cursor.execute(
+            query_str,
+            {
+                'tenant_id': tenant_id,
+                'data_series_id': data_series_id,
+                'fact_ids': [uuid.UUID(str(fact_id)) for fact_id in fact_ids],
+                'data_point_ids': [elem.data_point_id for elem in history_data_point_identifiers],
+                'point_in_times': [elem.point_in_time for elem in history_data_point_identifiers],
+                'sub_clocks': [elem.sub_clock for elem in history_data_point_identifiers],
+                'deleted_at': dbtime.now()
+            }
+        )
+
+
+# S3 accepts at most 1000 keys per multi object delete
+MAX_FILES_PER_DELETE_BATCH = 1000
+
+
+def _delete_files(storage: DeleteStorage, file_names: List[str]) -> None:
+    # storages that support it (see PrivatePublicS3Boto3Storage.delete_many)
+    # delete the whole batch with a single request
+    delete_many = getattr(storage, 'delete_many', None)
+    if delete_many is not None:
+        delete_many(file_names)
+    else:
+        for file_name in file_names:
+            storage.delete(file_name)
+
+
+def _collect_chunk(older_than: datetime.datetime, chunk_size: int) -> Tuple[int, List[str]]:
+    """
+    removes up to chunk_size expired entries from the registry
+
+    :return: the number of removed entries and the files that are not referenced by any
+    other entry anymore (alive or soft deleted but not yet expired)
+    """
+    query_str = f"""
+        WITH "chunk" AS (
+            SELECT "id"
+            FROM "_3_file_lookup"
+            WHERE "deleted_at" < %(older_than)s
+            LIMIT %(chunk_size)s
+            FOR UPDATE SKIP LOCKED
+        ),
+        "deleted" AS (
+            DELETE
+            FROM "_3_file_lookup"
+            WHERE "id" IN (SELECT "id" FROM "chunk")
+            RETURNING "file_name"
+        )
+        SELECT
+            "deleted"."file_name",
+            NOT EXISTS (
+                SELECT 1
+                FROM "_3_file_lookup" AS "alive"
+                WHERE "alive"."file_name" = "deleted"."file_name"
+                -- the DELETE above is not visible to this statement yet
+                AND "alive"."id" NOT IN (SELECT "id" FROM "chunk")
+            ) AS "garbage"
+        FROM "deleted"
+    """
 
     with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
         cursor.execute(
             query_str,
             {
-                'older_than': older_than
+                'older_than': older_than,
+                'chunk_size': chunk_size
             }
         )
+        rows = cursor.fetchall()
 
-        for deleted_file in cursor:
-            # TODO: do this in chunks this might be slow otherwise
-            # the file is not used by anyone else, we can delete it
-            if not file_exists(tenant_id=None, file_name=deleted_file[0]):
-                logger.debug(f"Deleting file {deleted_file[0]}")
-                garbage_files.add(deleted_file[0])
+    garbage_files = sorted({file_name for file_name, garbage in rows if garbage})
+    return len(rows), garbage_files
 
-    logger.info(f"Garbage collecting {len(garbage_files)} files.")
 
-    # we always delete, not only on transaction commit
-    # there is no risk of dataloss, only risk of orphaned data
-    for __file in garbage_files:
-        storage.delete(__file)
+def garbage_collect(
+    storage: DeleteStorage,
+    older_than: datetime.datetime,
+    chunk_size: int = 10000,
+    concurrency: int = 8
+) -> None:
+    """
+    Removes expired entries from the registry and deletes the files that are not used anymore.
+
+    Works in chunks of chunk_size entries, each in its own transaction. The files of a chunk are
+    deleted (in batches, by up to concurrency workers) only after the chunk is committed, so no
+    transaction is held open while talking to the storage. If deleting fails, the files are orphaned
+    but no data is lost.
+    """
+    logger.info(f"Garbage collecting files older than {older_than}")
+
+    total_entries = 0
+    total_files = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        while True:
+            with transaction.atomic(using=DATA_SERIES_DYNAMIC_SQL_DB):
+                entry_count, garbage_files = _collect_chunk(older_than=older_than, chunk_size=chunk_size)
+
+            futures = [
+                executor.submit(_delete_files, storage, garbage_files[i:i + MAX_FILES_PER_DELETE_BATCH])
+                for i in range(0, len(garbage_files), MAX_FILES_PER_DELETE_BATCH)
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception('Failed to delete garbage files, they are orphaned now.')
+                    raise
+
+            total_entries += entry_count
+            total_files += len(garbage_files)
+            logger.info(f"Garbage collected {total_entries} registry entries and {total_files} files so far.")
+
+            if entry_count < chunk_size:
+                break
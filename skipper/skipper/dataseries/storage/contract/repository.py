@@ -4,7 +4,7 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
-from typing import Protocol, Optional, Union, NamedTuple
+from typing import Protocol, Optional, Union, NamedTuple, Dict, List
 from uuid import UUID
 
 from skipper.dataseries.storage.static_ds_information import BasicDataSeriesQueryInfo
@@ -23,3 +23,12 @@ class Repository(Protocol):
             data_series_query_info: BasicDataSeriesQueryInfo
     ) -> Optional[ReadOnlyDataPoint]: ...
 
+    def get_data_points(
+            self,
+            identifiers: List[str],
+            data_series_query_info: BasicDataSeriesQueryInfo
+    ) -> Dict[str, ReadOnlyDataPoint]:
+        """
+        :return: all data points that exist for the given identifiers, keyed by their id
+        """
+        ...
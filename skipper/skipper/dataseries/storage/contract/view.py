@@ -8,15 +8,21 @@ import datetime
 from abc import ABCMeta, abstractmethod
 from django.db.models import QuerySet
 from django.http import HttpRequest
-from typing import Any, Dict, Optional, List, Type, Iterable, Protocol
+from typing import Any, Dict, Optional, List, Type, Iterable, Iterator, Protocol
 
 from rest_framework.serializers import ModelSerializer
 
 from skipper.dataseries.storage.contract.models import DisplayDataPoint
+from skipper.dataseries.storage.contract.repository import ReadOnlyDataPoint
 from skipper.dataseries.models.metamodel.data_series import DataSeries
 from skipper.dataseries.storage.contract.base import BaseDataPointModificationSerializer, BaseDataPointSerializer
 
 
+EXPORT_FORMAT_NDJSON = 'ndjson'
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMATS = [EXPORT_FORMAT_NDJSON, EXPORT_FORMAT_CSV]
+
+
 class EmptySerializer(ModelSerializer[Any]):
     class Meta:
         # hack, but works
@@ -183,7 +189,10 @@ class StorageViewAdapter(metaclass=ABCMeta):
         raise NotImplementedError()
 
     @abstractmethod
-    def data_point_count(self, view: BaseDataSeries_DataPointViewSet) -> int:
+    def data_point_count(self, view: BaseDataSeries_DataPointViewSet, estimate: bool = False) -> int:
+        """
+        :param estimate: whether the row estimate of the query planner is good enough
+        """
         raise NotImplementedError()
 
     # custom methods
@@ -200,10 +209,36 @@ class StorageViewAdapter(metaclass=ABCMeta):
     ) -> List[str]:
         raise NotImplementedError()
 
+    @abstractmethod
+    def delete_bulk(
+            self,
+            view: BaseDataSeries_DataPointViewSetBulk,
+            user_id: str,
+            record_source: str,
+            data_point_ids: List[str],
+            point_in_time: datetime.datetime,
+            sub_clock: int
+    ) -> List[ReadOnlyDataPoint]:
+        """
+        deletes all existing data points out of the given ids, unknown ids are ignored
+
+        :return: the data points that were deleted
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def check_external_ids(self, view: BaseDataSeries_DataPointViewSetCheckExternalIds, external_ids: List[str]) -> List[str]:
         raise NotImplementedError()
 
+    @abstractmethod
+    def export_data_points(self, view: BaseDataSeries_DataPointViewSet, export_format: str) -> Iterator[str]:
+        """
+        all data points matching the options of the view, rendered in the given export format.
+        Everything that can fail (permissions, validation) has to happen before this returns,
+        the result is only consumed while the response is being streamed
+        """
+        raise NotImplementedError()
+
     def serialize_list(self, view: BaseDataSeries_DataPointViewSetWithSerialization, page: Any) -> List[
         Dict[str, Any]]:
         """
@@ -26,6 +26,7 @@ handle_create_data_series = ddl_data_series.handle_create_data_series
 handle_create_fact = ddl_fact.handle_create_fact
 handle_create_dimension = ddl_dimension.handle_create_dimension
 handle_create_user_defined_index = ddl_user_defined_index.handle_create_user_defined_index
+user_defined_index_build_states = ddl_user_defined_index.user_defined_index_build_states
 
 
 def nuke_data_series(
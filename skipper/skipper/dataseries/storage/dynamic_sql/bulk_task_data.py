@@ -0,0 +1,55 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+Compact encoding of the validated data points of async bulk inserts (BulkInsertTaskData.compressed_data).
+
+The data points are split into chunks that are compressed independently and written as length prefixed frames.
+This way the persist task only ever has to decompress and decode the chunk it is currently inserting.
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, Generator, Iterable, List, Union
+
+from skipper.core.models import JSONEncoder
+from skipper.core.utils.functions import chunks
+
+_FRAME_HEADER = struct.Struct('>I')
+
+# the values are mostly repeated keys and small numbers/strings, a fast level compresses them well enough
+_COMPRESSION_LEVEL = 3
+
+
+def encode_validated_datas(validated_datas: Iterable[Dict[str, Any]], chunk_size: int) -> bytes:
+    frames: List[bytes] = []
+    chunk: Iterable[Dict[str, Any]]
+    for chunk in chunks(validated_datas, size=chunk_size):  # type: ignore
+        # same encoder as for the data JSONField, so that the decoded values look exactly the same
+        compressed = zlib.compress(
+            json.dumps(list(chunk), cls=JSONEncoder, separators=(',', ':')).encode('utf-8'),
+            _COMPRESSION_LEVEL
+        )
+        frames.append(_FRAME_HEADER.pack(len(compressed)))
+        frames.append(compressed)
+    return b''.join(frames)
+
+
+def decode_validated_datas(encoded: Union[bytes, memoryview]) -> Generator[List[Dict[str, Any]], None, None]:
+    """
+    lazily decodes the chunks of data points written by encode_validated_datas
+    """
+    view = memoryview(encoded)
+    offset = 0
+    while offset < len(view):
+        (length,) = _FRAME_HEADER.unpack_from(view, offset)
+        offset += _FRAME_HEADER.size
+        if offset + length > len(view):
+            raise ValueError('truncated bulk insert task data')
+        chunk: List[Dict[str, Any]] = json.loads(zlib.decompress(view[offset:offset + length]))
+        offset += length
+        yield chunk
@@ -0,0 +1,136 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+Streams the result of a display query with a server side cursor
+so that exports of whole data series never have to be held in memory.
+"""
+
+import csv
+import datetime
+import io
+import json
+from django.db import connections, transaction
+from rest_framework.utils import encoders
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from skipper.core.models import default_media_storage
+from skipper.dataseries.storage.dynamic_sql.queries.select_info import SelectInfo
+from skipper.dataseries.storage.dynamic_sql.serializers.display import display_payload
+from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
+
+# number of rows fetched from the server side cursor per round trip
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+def _unescape(identifier: str) -> str:
+    return identifier[1:-1].replace('""', '"')
+
+
+def _fetch(query_str: str, query_params: Dict[str, Any], read_db: str) -> Iterator[Tuple[Dict[str, int], Sequence[Any]]]:
+    # the cursor only streams inside of a transaction, in autocommit mode
+    # the whole result would be materialized for the WITH HOLD cursor
+    with transaction.atomic(using=read_db):
+        with connections[read_db].chunked_cursor() as cursor:
+            cursor.execute(query_str, query_params)
+            columns = {column.name: index for index, column in enumerate(cursor.description)}
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if len(rows) == 0:
+                    break
+                yield columns, rows
+
+
+def stream_ndjson(
+        query_str: str,
+        query_params: Dict[str, Any],
+        payload_as_text: bool,
+        data_series_query_info: DataSeriesQueryInfo,
+        read_db: str
+) -> Iterator[str]:
+    """
+    one json object per line with id, external_id, point_in_time and payload
+
+    :param read_db: the database to read from. This has to be decided while the request is handled,
+    the response is streamed afterwards.
+    """
+    for columns, rows in _fetch(query_str, query_params, read_db):
+        id_idx = columns['id']
+        external_id_idx = columns['external_id']
+        point_in_time_idx = columns['point_in_time']
+        payload_idx = columns['payload_text' if payload_as_text else 'payload']
+
+        lines: List[str] = []
+        for row in rows:
+            if payload_as_text:
+                payload = row[payload_idx]
+            else:
+                _payload = row[payload_idx]
+                if isinstance(_payload, str):
+                    _payload = json.loads(_payload)
+                payload = _encode(display_payload(_payload, data_series_query_info))
+            lines.append(
+                f'{{"id":{_encode(row[id_idx])},"external_id":{_encode(row[external_id_idx])},'
+                f'"point_in_time":{_encode(row[point_in_time_idx])},"payload":{payload}}}\n'
+            )
+        yield ''.join(lines)
+
+
+def _csv_value(value: Any, is_file: bool) -> Any:
+    if value is None:
+        return ''
+    if is_file:
+        return default_media_storage.url(value) if value != '' else ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return _encode(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(
+        query_str: str,
+        query_params: Dict[str, Any],
+        select_infos: List[SelectInfo],
+        data_series_query_info: DataSeriesQueryInfo,
+        read_db: str
+) -> Iterator[str]:
+    """
+    id, external_id, point_in_time and one column per dimension/fact (named by its external id).
+    Expects the query to be built with payload_as_json=False, see stream_ndjson for read_db
+    """
+    file_external_ids = {*data_series_query_info.file_facts.keys(), *data_series_query_info.image_facts.keys()}
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id', 'external_id', 'point_in_time', *[elem.unescaped_display_id for elem in select_infos]])
+    yield buffer.getvalue()
+
+    for columns, rows in _fetch(query_str, query_params, read_db):
+        payload_columns = [
+            (columns[_unescape(elem.select_alias)], elem.unescaped_display_id in file_external_ids)
+            for elem in select_infos
+        ]
+        id_idx = columns['id']
+        external_id_idx = columns['external_id']
+        point_in_time_idx = columns['point_in_time']
+
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([
+                row[id_idx],
+                row[external_id_idx],
+                _csv_value(row[point_in_time_idx], False),
+                *[_csv_value(row[idx], is_file) for idx, is_file in payload_columns]
+            ])
+        yield buffer.getvalue()
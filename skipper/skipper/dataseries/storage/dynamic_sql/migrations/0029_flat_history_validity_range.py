@@ -0,0 +1,38 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from django.apps.registry import Apps
+from django.db import migrations
+from typing import List, Any
+
+
+def backfill_flat_history_validity_ranges(apps: Apps, schema_editor: Any) -> Any:
+    from skipper import settings
+    from skipper.dataseries.storage.dynamic_sql.tasks.ddl.data_series import ensure_validity_range_materialized_flat_history
+
+    DataSeries = apps.get_model('dataseries', 'DataSeries')
+    for dataseries in DataSeries.all_objects.filter(backend='DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY').select_related('tenant'):
+        ensure_validity_range_materialized_flat_history(
+            dataseries.id,
+            dataseries.external_id,
+            dataseries.tenant.name,
+            chunk_size=settings.SKIPPER_DATA_SERIES_BACKEND_MIGRATION_CHUNK_SIZE
+        )
+
+
+class Migration(migrations.Migration):
+    # every table (and every chunk of its backfill) is handled in its own transaction
+    atomic = False
+
+    dependencies = [
+        ('skipper_dataseries_storage_dynamic_sql', '0028_delete_writabledatapoint'),
+    ]
+
+    operations: List[Any] = (
+            [
+                migrations.RunPython(backfill_flat_history_validity_ranges, migrations.RunPython.noop)
+            ]
+    )
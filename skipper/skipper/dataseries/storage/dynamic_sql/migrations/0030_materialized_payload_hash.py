@@ -0,0 +1,33 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from django.apps.registry import Apps
+from django.db import migrations
+from typing import List, Any
+
+
+def add_payload_hash_to_materialized_tables(apps: Apps, schema_editor: Any) -> Any:
+    from skipper.dataseries.storage.dynamic_sql.tasks.ddl.data_series import ensure_payload_hash_materialized
+
+    DataSeries = apps.get_model('dataseries', 'DataSeries')
+    for dataseries in DataSeries.all_objects.filter(
+            backend__in=['DYNAMIC_SQL_NO_HISTORY', 'DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY']
+    ).select_related('tenant'):
+        ensure_payload_hash_materialized(dataseries.id, dataseries.external_id, dataseries.tenant.name)
+
+
+class Migration(migrations.Migration):
+    atomic = True
+
+    dependencies = [
+        ('skipper_dataseries_storage_dynamic_sql', '0029_flat_history_validity_range'),
+    ]
+
+    operations: List[Any] = (
+            [
+                migrations.RunPython(add_payload_hash_to_materialized_tables, migrations.RunPython.noop)
+            ]
+    )
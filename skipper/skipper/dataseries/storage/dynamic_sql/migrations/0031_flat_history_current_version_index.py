@@ -0,0 +1,32 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from django.apps.registry import Apps
+from django.db import migrations
+from typing import List, Any
+
+
+def add_current_version_index_to_flat_history_tables(apps: Apps, schema_editor: Any) -> Any:
+    from skipper.dataseries.storage.dynamic_sql.tasks.ddl.data_series import ensure_indexes_materialized_flat_history
+
+    DataSeries = apps.get_model('dataseries', 'DataSeries')
+    for dataseries in DataSeries.all_objects.filter(backend='DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY').select_related('tenant'):
+        ensure_indexes_materialized_flat_history(dataseries.id, dataseries.external_id, dataseries.tenant.name)
+
+
+class Migration(migrations.Migration):
+    # the lock on a table is released as soon as its index is built
+    atomic = False
+
+    dependencies = [
+        ('skipper_dataseries_storage_dynamic_sql', '0030_materialized_payload_hash'),
+    ]
+
+    operations: List[Any] = (
+            [
+                migrations.RunPython(add_current_version_index_to_flat_history_tables, migrations.RunPython.noop)
+            ]
+    )
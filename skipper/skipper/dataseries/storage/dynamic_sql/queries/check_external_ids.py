@@ -7,11 +7,11 @@
 from django.db import transaction, connections
 from typing import List, Dict, Any, cast
 
+from skipper.core.db_routers import data_point_read_db
 from skipper.core.utils.functions import chunks
 from skipper.dataseries.storage.contract import StorageBackendType
 from skipper.dataseries.storage.dynamic_sql.models.datapoint import DataPoint
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
-from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
 from skipper.core.lint import sql_cursor
 
 
@@ -21,7 +21,9 @@ def check_external_ids(
         data_series_id: str,
         data_series_query_info: DataSeriesQueryInfo
 ) -> List[str]:
-    with transaction.atomic():
+    # the endpoint is a POST, but it never writes anything
+    read_db = data_point_read_db(read_only=True)
+    with transaction.atomic(using=read_db):
         external_ids_in_use: List[Dict[str, Any]] = []
 
         chunk: Any
@@ -29,7 +31,7 @@ def check_external_ids(
             if backend == StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value\
                     or backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
                 chunk = list(chunk)
-                with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+                with sql_cursor(read_db) as cursor:
                     placeholders = ', '.join(['%s'] * len(chunk))
                     sql = f"""
                         SELECT ds_dp.external_id
@@ -30,6 +30,17 @@ def can_use_materialized_table(data_series_query_info: BasicDataSeriesQueryInfo,
            )
 
 
+def render_validity_part_flat_history(point_in_time: bool) -> str:
+    """
+    restricts the flat history table ds_dp to the versions that were valid at %(point_in_time)s
+    or, without a point in time, to the current ones. Every version knows when it was superseded (valid_to),
+    so both can be looked up directly via an index (see ensure_indexes_materialized_flat_history).
+    """
+    if point_in_time:
+        return "AND tstzrange(ds_dp.point_in_time, ds_dp.valid_to, '[)') @> %(point_in_time)s::timestamptz"
+    return "AND ds_dp.valid_to IS NULL"
+
+
 def is_timestamp_utc_fact(select_info: SelectInfo) -> bool:
     return select_info.type == 'timestamp_fact'
 
@@ -97,3 +108,21 @@ def render_main_extra_fields_columns(main_tbl_alias: str, main_extra_fields: Lis
     if len(_main_extra_fields_elems) > 0:
         _main_extra_fields_sql = f'{comma_nl.join(_main_extra_fields_elems)},\n'
     return _main_extra_fields_sql
+
+
+def render_json_payload_column(payload_parts: List[str], select_infos: List[SelectInfo], payload_as_text: bool) -> str:
+    payload = f'({"||".join(payload_parts)})'
+    if not payload_as_text:
+        return f',{payload} as payload'
+
+    # nulls are stripped on the top level only, jsonb_strip_nulls would
+    # also strip nulls inside of json facts
+    if any(select_info.type == 'json_fact' for select_info in select_infos):
+        stripped = f"""(
+            SELECT COALESCE(jsonb_object_agg("__payload_elem"."key", "__payload_elem"."value"), '{{}}'::jsonb)
+            FROM jsonb_each({payload}) AS "__payload_elem"
+            WHERE "__payload_elem"."value" <> 'null'::jsonb
+        )"""
+    else:
+        stripped = f'jsonb_strip_nulls({payload})'
+    return f',{stripped} as payload_text'
@@ -11,7 +11,7 @@ from skipper.dataseries.models.partitions import fully_qualified_partition_table
 from skipper.dataseries.storage.contract import StorageBackendType
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
 from skipper.dataseries.storage.dynamic_sql.queries.common import render_join_part, render_wheres, \
-    can_use_materialized_table
+    can_use_materialized_table, render_validity_part_flat_history
 from skipper.core.lint import lint
 
 
@@ -20,11 +20,16 @@ def data_series_data_point_count(
         point_in_time: bool,
         changes_since: bool,
         used_data_series_children: DataSeriesQueryInfo,
-        filter_str: str = ''
+        filter_str: str = '',
+        estimate: bool = False
 ) -> str:
+    """
+    :param estimate: renders the plain select of the counted rows instead,
+    to be used for the row estimate of the query planner (see estimate_row_count)
+    """
     use_materialized = can_use_materialized_table(used_data_series_children, point_in_time)
     sql = f"""
-SELECT count(ds_dp.id)
+SELECT {'ds_dp.id' if estimate else 'count(ds_dp.id)'}
 {render_base_sources(use_materialized, changes_since, point_in_time, used_data_series_children)}
 {render_where_part(point_in_time, changes_since, use_materialized, data_series, used_data_series_children)}
 {filter_str}
@@ -48,23 +53,8 @@ def render_base_sources_materialized(data_series_query_info: DataSeriesQueryInfo
 
 
 def render_materialized_flat_history_base_sources(point_in_time: bool, changes_since: bool, data_series_query_info: DataSeriesQueryInfo) -> str:
-    def render_changes_since_ds_dp2() -> str:
-        if not changes_since:
-            return ""
-        return f"AND ds_dp2.point_in_time > %(changes_since)s"
-
-    point_in_time_part_ds_dp2 = ''
-    if point_in_time:
-        point_in_time_part_ds_dp2 = f"AND ds_dp2.point_in_time <= %(point_in_time)s"
-
     return f"""
     FROM {data_series_query_info.schema_name}.{data_series_query_info.materialized_flat_history_table_name} ds_dp
-    LEFT OUTER JOIN {data_series_query_info.schema_name}.{data_series_query_info.materialized_flat_history_table_name} ds_dp2 ON (
-    ds_dp.id = ds_dp2.id
-    AND (ds_dp.point_in_time, ds_dp.sub_clock) < (ds_dp2.point_in_time, ds_dp2.sub_clock)
-    {point_in_time_part_ds_dp2}
-    {render_changes_since_ds_dp2()}
-    )
 """
 
 
@@ -147,15 +137,10 @@ def render_where_part_flat_history(point_in_time: bool, changes_since: bool) ->
             return ""
         return f"AND ds_dp.point_in_time > %(changes_since)s"
 
-    point_in_time_part_ds_dp = ''
-    if point_in_time:
-        point_in_time_part_ds_dp = f"AND ds_dp.point_in_time <= %(point_in_time)s"
-
     return f"""
 WHERE
-ds_dp2.id IS NULL
-AND ds_dp.deleted = false
-{point_in_time_part_ds_dp}
+ds_dp.deleted = false
+{render_validity_part_flat_history(point_in_time)}
 {render_changes_since_ds_dp()}
 """
 
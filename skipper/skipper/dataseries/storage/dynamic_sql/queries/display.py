@@ -14,7 +14,7 @@ from skipper.dataseries.models.partitions import fully_qualified_partition_table
 from skipper.dataseries.raw_sql.escape import escape
 from skipper.dataseries.storage.contract import StorageBackendType
 from skipper.dataseries.storage.dynamic_sql.queries.common import can_use_materialized_table, \
-    render_main_extra_fields_columns
+    render_main_extra_fields_columns, render_json_payload_column, render_validity_part_flat_history
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo, \
     compute_data_series_query_info, compute_basic_data_series_query_info
 from skipper.dataseries.storage.dynamic_sql.queries.select_info import select_infos, SelectInfo, \
@@ -25,7 +25,8 @@ from skipper.core.lint import lint
 _central_table = escape('__central_table')
 
 
-def render_selects(unescaped_display_ids_with_order: List[SelectInfo], payload_as_json: bool, agg_dimension_select_infos: Dict[str, SelectInfo] = {}) -> str:
+def render_selects(unescaped_display_ids_with_order: List[SelectInfo], payload_as_json: bool, agg_dimension_select_infos: Dict[str, SelectInfo] = {},
+                   payload_as_text: bool = False) -> str:
     comma_nl = ',\n'
     if payload_as_json:
         chunk_strs = ["'{}'::jsonb"]
@@ -43,7 +44,7 @@ def render_selects(unescaped_display_ids_with_order: List[SelectInfo], payload_a
                 argument_list.append(f'%({unescaped_display_id_with_order.payload_variable_name})s,{value}')
             chunk_strs.append(f'(jsonb_build_object({comma_nl.join(argument_list)})::jsonb)')
 
-        return f',({"||".join(chunk_strs)}) as payload'
+        return render_json_payload_column(chunk_strs, unescaped_display_ids_with_order, payload_as_text)
     else:
         if len(unescaped_display_ids_with_order) == 0:
             return ""
@@ -88,7 +89,8 @@ def _data_series_as_sql_table(
         filter_str: str,
         resolve_dimension_external_ids: bool,
         data_series_query_info: DataSeriesQueryInfo,
-        use_materialized: Optional[bool]
+        use_materialized: Optional[bool],
+        payload_as_text: bool = False
 ) -> str:
     include_pagination_data = payload_as_json
     _data_series_query_info = data_series_query_info
@@ -116,7 +118,8 @@ def _data_series_as_sql_table(
         point_in_time=point_in_time,
         changes_since=changes_since,
         include_versions=include_versions,
-        filter_str=filter_str
+        filter_str=filter_str,
+        payload_as_text=payload_as_text
     )
     if not actually_resolve_dimension_external_ids:
         return central_table_sql
@@ -168,14 +171,8 @@ def _data_series_as_sql_table(
                         {escape(f'__resolve_{_select_info.actual_id}')} AS (
                             SELECT ds_dp.id as data_point_id, ds_dp.external_id as external_id
                             FROM {_dimension_query_info.dimension.reference.schema_name}.{_dimension_query_info.dimension.reference.materialized_flat_history_table_name} ds_dp
-                            LEFT OUTER JOIN {_dimension_query_info.dimension.reference.schema_name}.{_dimension_query_info.dimension.reference.materialized_flat_history_table_name} ds_dp2 ON (
-                                ds_dp.id = ds_dp2.id
-                                AND (ds_dp.point_in_time, ds_dp.sub_clock) < (ds_dp2.point_in_time, ds_dp2.sub_clock)
-                                {point_in_time_part_ds_dp2}
-                            )
-                            WHERE ds_dp2.id IS NULL
-                            AND ds_dp.deleted = false
-                            {point_in_time_part_ds_dp}
+                            WHERE ds_dp.deleted = false
+                            {render_validity_part_flat_history(point_in_time)}
                         )
                     """
                 else:
@@ -212,7 +209,7 @@ def _data_series_as_sql_table(
 {all_with_parts}
 SELECT {_central_table}.id,
 {_central_table}.data_series_id
-{render_selects(all_select_infos, agg_dimension_select_infos=_agg_dimension_select_infos, payload_as_json=payload_as_json)},
+{render_selects(all_select_infos, agg_dimension_select_infos=_agg_dimension_select_infos, payload_as_json=payload_as_json, payload_as_text=payload_as_text)},
 {render_version_select(include_versions)}
 {render_current_version_select(payload_as_json=payload_as_json)}
 {render_pagination_data_select(include_pagination_data=include_pagination_data)}
@@ -235,6 +232,7 @@ def data_series_as_sql_table(
         resolve_dimension_external_ids: bool = False,
         data_series_query_info: Optional[DataSeriesQueryInfo] = None,
         use_materialized: Optional[bool] = None,
+        payload_as_text: bool = False
 ) -> str:
     _data_series_query_info: DataSeriesQueryInfo
     if data_series_query_info is None:
@@ -251,7 +249,8 @@ def data_series_as_sql_table(
         filter_str=filter_str,
         resolve_dimension_external_ids=resolve_dimension_external_ids,
         data_series_query_info=_data_series_query_info,
-        use_materialized=use_materialized
+        use_materialized=use_materialized,
+        payload_as_text=payload_as_text
     )
     lint(sql)
     return sql
\ No newline at end of file
@@ -9,7 +9,7 @@ import uuid
 from typing import List, Tuple, Dict, Any
 
 import datetime
-from django.db import connections, transaction
+from django.db import transaction
 
 from skipper.core.models.tenant import Tenant
 from skipper.dataseries.raw_sql import escape
@@ -31,20 +31,20 @@ def _generate_history_select_for_delete(
         history_select_columns.append(f'"deleted".{column_name}')
 
 
-def delete_datapoint(
-        tenant: Tenant,
+def _render_delete_query(
+        cursor: Any,
+        schema_name: str,
         data_series_id: str,
         data_series_external_id: str,
         backend: str,
-        datapoint_id: str,
-        datapoint_external_id: str,
-        point_in_time: datetime.datetime,
-        sub_clock: int,
         user_id: str,
         record_source: str,
         data_point_serialization_keys: DataPointSerializationKeys,
-) -> None:
-    schema_name = escaped_tenant_schema(tenant.name)
+        to_delete_query: str
+) -> str:
+    """
+    :param to_delete_query: query returning the id and external_id of all data points to delete (unique by id)
+    """
     table_name = escape.escape(materialized_table_name(data_series_id, data_series_external_id))
 
     history_select_columns = [
@@ -59,76 +59,117 @@ def delete_datapoint(
     for key in FACT_DIM_ORDER_IN_SQL:
         _generate_history_select_for_delete(data_point_serialization_keys[key], history_select_columns)  # type: ignore
 
+    # default to inserting a deleted entry, but use upsert for actual delete if it exists
+    # this ensures that we always return rows from this query without requiring a
+    # second SQL statement therefore removing possible race conditions completely
+    central_update_query = f"""
+        INSERT INTO {schema_name}.{table_name} as target_tbl (
+            "id",
+            "external_id",
+            "point_in_time",
+            "inserted_at",
+            "deleted_at",
+            "sub_clock"
+        )
+        SELECT
+            "to_delete".id,
+            "to_delete".external_id,
+            %(point_in_time)s,
+            %(point_in_time)s,
+            %(point_in_time)s,
+            %(sub_clock)s
+        FROM "to_delete"
+        ON CONFLICT (id) DO 
+            UPDATE
+            SET deleted_at = %(point_in_time)s,
+                sub_clock = %(sub_clock)s
+            WHERE (
+                (
+                    target_tbl.sub_clock IS NULL AND (
+                        target_tbl.point_in_time < %(point_in_time)s
+                    )
+                ) OR (
+                    target_tbl.sub_clock IS NOT NULL AND (
+                        (target_tbl.point_in_time, target_tbl.sub_clock) < (%(point_in_time)s, %(sub_clock)s)
+                    )
+                )
+            )
+        """
+
+    if backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
+        _insert = insert_to_flat_history_query(
+            data_series_id=data_series_id,
+            data_series_external_id=data_series_external_id,
+            user_id=user_id,
+            record_source=record_source,
+            cursor=cursor,
+            source_query=f"""
+            SELECT {','.join(history_select_columns)}
+            FROM "deleted"
+            """,
+            escaped_schema_name=schema_name,
+            data_point_serialization_keys=data_point_serialization_keys,
+            with_statement_outside=True
+        )
+        return f"""
+        WITH "to_delete" AS (
+            {to_delete_query}
+        ),
+        "deleted" AS (
+            {central_update_query}
+            RETURNING *
+        ),
+        {_insert}
+        """
+    return f"""
+        WITH "to_delete" AS (
+            {to_delete_query}
+        )
+        {central_update_query}
+        """
+
+
+def delete_datapoint(
+        tenant: Tenant,
+        data_series_id: str,
+        data_series_external_id: str,
+        backend: str,
+        datapoint_id: str,
+        datapoint_external_id: str,
+        point_in_time: datetime.datetime,
+        sub_clock: int,
+        user_id: str,
+        record_source: str,
+        data_point_serialization_keys: DataPointSerializationKeys,
+        backend_migration_in_progress: bool = False
+) -> None:
+    """
+    :param backend_migration_in_progress: see DataSeries.backend_migration_in_progress
+    """
     with transaction.atomic():
         with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
-            # Note: if we want to do a bulk delete at some point, we
-            # only have to feed data in with a with statement similar to what we do
-            # in the insert
-
-            # default to inserting a deleted entry, but use upsert for actual delete if it exists
-            # this ensures that we always return rows from this query without requiring a
-            # second SQL statement therefore removing possible race conditions completely
-            central_update_query = f"""
-                INSERT INTO {schema_name}.{table_name} as target_tbl (
-                    "id",
-                    "external_id",
-                    "point_in_time",
-                    "inserted_at",
-                    "deleted_at",
-                    "sub_clock"
-                )
-                VALUES (
-                    %(id)s,
-                    %(external_id)s,
-                    %(point_in_time)s,
-                    %(point_in_time)s,
-                    %(point_in_time)s,
-                    %(sub_clock)s
+            if backend_migration_in_progress:
+                from skipper.dataseries.storage.dynamic_sql.tasks.migrate import no_history_to_flat_history
+                no_history_to_flat_history.copy_on_write(
+                    cursor=cursor,
+                    data_series_id=data_series_id,
+                    data_series_external_id=data_series_external_id,
+                    tenant_name=tenant.name,
+                    data_point_serialization_keys=data_point_serialization_keys,
+                    data_point_ids=[datapoint_id]
                 )
-                ON CONFLICT (id) DO 
-                    UPDATE
-                    SET deleted_at = %(point_in_time)s,
-                        sub_clock = %(sub_clock)s
-                    WHERE (
-                        (
-                            target_tbl.sub_clock IS NULL AND (
-                                target_tbl.point_in_time < %(point_in_time)s
-                            )
-                        ) OR (
-                            target_tbl.sub_clock IS NOT NULL AND (
-                                (target_tbl.point_in_time, target_tbl.sub_clock) < (%(point_in_time)s, %(sub_clock)s)
-                            )
-                        )
-                    )
-                """
-
-            if backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
-                _insert = insert_to_flat_history_query(
+            cursor.execute(
+                _render_delete_query(
+                    cursor=cursor,
+                    schema_name=escaped_tenant_schema(tenant.name),
                     data_series_id=data_series_id,
                     data_series_external_id=data_series_external_id,
+                    backend=backend,
                     user_id=user_id,
                     record_source=record_source,
-                    cursor=cursor,
-                    source_query=f"""
-                    SELECT {','.join(history_select_columns)}
-                    FROM "deleted"
-                    """,
-                    escaped_schema_name=schema_name,
                     data_point_serialization_keys=data_point_serialization_keys,
-                    with_statement_outside=True
-                )
-                final_update_query = f"""
-                WITH "deleted" AS (
-                    {central_update_query}
-                    RETURNING *
+                    to_delete_query='SELECT %(id)s::varchar AS id, %(external_id)s::varchar AS external_id'
                 ),
-                {_insert}
-                """
-            else:
-                final_update_query = central_update_query
-
-            cursor.execute(
-                final_update_query,
                 {
                     "id": datapoint_id,
                     "external_id": datapoint_external_id,
@@ -136,3 +177,60 @@ def delete_datapoint(
                     "sub_clock": sub_clock
                 }
             )
+
+
+def delete_datapoints(
+        tenant: Tenant,
+        data_series_id: str,
+        data_series_external_id: str,
+        backend: str,
+        datapoints: List[Tuple[str, str]],
+        point_in_time: datetime.datetime,
+        sub_clock: int,
+        user_id: str,
+        record_source: str,
+        data_point_serialization_keys: DataPointSerializationKeys,
+        backend_migration_in_progress: bool = False
+) -> None:
+    """
+    set based variant of delete_datapoint for many data points at once
+
+    :param datapoints: (id, external_id) of the data points to delete, the ids must be unique
+    :param backend_migration_in_progress: see DataSeries.backend_migration_in_progress
+    """
+    if len(datapoints) == 0:
+        return
+    with transaction.atomic():
+        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            if backend_migration_in_progress:
+                from skipper.dataseries.storage.dynamic_sql.tasks.migrate import no_history_to_flat_history
+                no_history_to_flat_history.copy_on_write(
+                    cursor=cursor,
+                    data_series_id=data_series_id,
+                    data_series_external_id=data_series_external_id,
+                    tenant_name=tenant.name,
+                    data_point_serialization_keys=data_point_serialization_keys,
+                    data_point_ids=[elem[0] for elem in datapoints]
+                )
+            cursor.execute(
+                _render_delete_query(
+                    cursor=cursor,
+                    schema_name=escaped_tenant_schema(tenant.name),
+                    data_series_id=data_series_id,
+                    data_series_external_id=data_series_external_id,
+                    backend=backend,
+                    user_id=user_id,
+                    record_source=record_source,
+                    data_point_serialization_keys=data_point_serialization_keys,
+                    to_delete_query="""
+                    SELECT "t".id, "t".external_id
+                    FROM unnest(%(ids)s::varchar[], %(external_ids)s::varchar[]) AS "t" (id, external_id)
+                    """
+                ),
+                {
+                    "ids": [elem[0] for elem in datapoints],
+                    "external_ids": [elem[1] for elem in datapoints],
+                    "point_in_time": point_in_time,
+                    "sub_clock": sub_clock
+                }
+            )
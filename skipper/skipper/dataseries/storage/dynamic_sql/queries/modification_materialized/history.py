@@ -39,6 +39,11 @@ def insert_to_flat_history_query(
 
     :param escaped_schema_name: the schema name the flat history table resides in. usually this is fetched via escaped_tenant_schema(...)
     :data_point_serialization_keys: the relevant DataPointSerializationKeys.
+
+    Besides inserting the new versions, the query closes the validity range of the previous version
+    of every touched data point by setting its valid_to to the point_in_time of the new version.
+    This relies on new versions always being the latest ones for their data point, which the upserts into
+    the materialized table (that feed the source_query) guarantee.
     """
     flat_history_table_name = escape.escape(materialized_flat_history_table_name(data_series_id, data_series_external_id))
 
@@ -57,7 +62,8 @@ def insert_to_flat_history_query(
     return f"""
             {'WITH' if not with_statement_outside else ''} rows AS (
             {source_query}
-            )
+            ),
+            "history_inserted" AS (
             INSERT INTO {escaped_schema_name}.{flat_history_table_name}(
             {','.join(all_flat_cols)}
             )
@@ -75,4 +81,12 @@ def insert_to_flat_history_query(
                 {user_id_and_record_source},
                 rows.sub_clock {data_col_string}
             FROM rows
+            RETURNING id, point_in_time, sub_clock
+            )
+            UPDATE {escaped_schema_name}.{flat_history_table_name} tbl
+            SET valid_to = "history_inserted".point_in_time
+            FROM "history_inserted"
+            WHERE tbl.id = "history_inserted".id
+            AND tbl.valid_to IS NULL
+            AND (tbl.point_in_time, tbl.sub_clock) < ("history_inserted".point_in_time, "history_inserted".sub_clock)
     """
\ No newline at end of file
@@ -5,26 +5,46 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 
+import hashlib
 import json
 import uuid
 
 import datetime
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from typing import Iterable, Dict, Any, List, Tuple, Optional, Union, Sequence
+from django.db import transaction
+from typing import Iterable, Dict, Any, List, Tuple, Optional, Union, Sequence, Set
 
 from skipper.core.models.fields import default_media_storage
 from skipper.dataseries.raw_sql import escape
 from skipper.dataseries.raw_sql.tenant import escaped_tenant_schema
 from skipper.dataseries.storage.contract import StorageBackendType, file_registry
-from skipper.dataseries.storage.contract.file_registry import HistoryDataPointIdentifier, delete_all_but_latest_for_datapoints
+from skipper.dataseries.storage.contract.file_registry import HistoryDataPointIdentifier, FileToSave, \
+    delete_all_but_latest_for_datapoints
 from skipper.dataseries.storage.dynamic_sql.materialized import materialized_column_name, materialized_table_name
 from skipper.dataseries.storage.static_ds_information import DataPointSerializationKeys
+from skipper import settings
 from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
 from skipper.core.lint import sql_cursor
 from skipper.dataseries.storage.dynamic_sql.queries.modification_materialized.history import insert_to_flat_history_query
 from skipper.dataseries.storage.dynamic_sql.queries.modification_materialized.order import FACT_DIM_ORDER_IN_SQL, FACT_DIM_TYPES, add_columns_to_list, add_columns_to_types_list
 from skipper.dataseries.storage.dynamic_sql.migrations.custom_v1.helpers import data_point_id_column_def, external_id_column_def
 
+# only used to keep the order of the rows in the staging table, never part of the actual data
+_STAGING_ORDINAL_COLUMN = '"_3_ordinal"'
+
+# position of the payload_hash in the values of a data point, see _data_point_values
+_PAYLOAD_HASH_INDEX = 6
+# bookkeeping columns that do not make up the content of a data point
+_UNHASHED_COLUMNS = {'point_in_time', 'inserted_at', 'deleted_at', 'sub_clock', 'payload_hash'}
+
+
+def _payload_hash(columns: List[str], values: List[Any]) -> bytes:
+    # the column names contain the ids of the facts/dimensions, so moving a value
+    # to another fact changes the hash even if the plain values stay the same
+    content = [[column, value] for column, value in zip(columns, values) if column not in _UNHASHED_COLUMNS]
+    return hashlib.blake2b(json.dumps(content, default=str).encode('utf-8'), digest_size=16).digest()
+
+
 def _add_json_values_to_list(keys: Sequence[Tuple[str, Union[str, uuid.UUID]]], _validated_data: Dict[str, Any], values: List[Any]) -> None:
     for external_id, uuid in keys:
         if external_id in _validated_data['payload']:
@@ -37,13 +57,11 @@ def _add_file_like_values_to_list(
         keys: Sequence[Tuple[str, Union[str, uuid.UUID]]],
         _validated_data: Dict[str, Any],
         values: List[Any],
-        tenant_id: Union[str, uuid.UUID],
-        data_series_id: str,
         point_in_time: datetime.datetime,
         sub_clock: int,
-        backend: str
+        backend: str,
+        files_to_save: List[FileToSave]
 ) -> None:
-    _files_to_save: List[InMemoryUploadedFile] = []
     for external_id, uuid in keys:
         if external_id in _validated_data['payload']:
             _val: InMemoryUploadedFile = _validated_data['payload'][external_id]
@@ -51,10 +69,8 @@ def _add_file_like_values_to_list(
                     StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value,
                     StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
             ]:
-                file_registry.save(
-                    storage=default_media_storage,
-                    tenant_id=tenant_id,
-                    data_series_id=data_series_id,
+                # saved for all data points at once, see _insert_or_update_data_points_impl
+                files_to_save.append(FileToSave(
                     fact_id=uuid,
                     history_data_point_identifier=HistoryDataPointIdentifier(
                         data_point_id=_validated_data['id'],
@@ -62,7 +78,7 @@ def _add_file_like_values_to_list(
                         sub_clock=sub_clock
                     ),
                     file=_val
-                )
+                ))
             if _val is not None:
                 values.append(_val.name)
             else:
@@ -121,6 +137,63 @@ def _generate_history_select_for_single(
 
 
 
+def _data_point_values(
+        validated_data: Dict[str, Any],
+        data_point_serialization_keys: DataPointSerializationKeys,
+        point_in_time: datetime.datetime,
+        sub_clock: Optional[int],
+        backend: str,
+        files_to_save: List[FileToSave],
+        hash_columns: Optional[List[str]] = None
+) -> List[Any]:
+    """
+    :param files_to_save: the uploaded files of the data point are added to this
+    :param hash_columns: the columns of the upsert, if passed the payload_hash of the values is computed
+    """
+    values = [
+        validated_data['id'],
+        validated_data['external_id'],
+        point_in_time,  # point_in_time
+        point_in_time,  # inserted_at, upsert will take care of this
+        None,  # deleted_at,
+        sub_clock,
+        None  # payload_hash
+    ]
+
+    for key in FACT_DIM_ORDER_IN_SQL:
+        # for images we have to get the value from the uploaded file object
+        # and then extract the filename out of it.
+        if key == 'image_facts':
+            _add_file_like_values_to_list(
+                data_point_serialization_keys['image_facts'],
+                validated_data,
+                values,
+                point_in_time=point_in_time,
+                sub_clock=sub_clock,  # type: ignore
+                backend=backend,
+                files_to_save=files_to_save
+            )
+        elif key == 'file_facts':
+            _add_file_like_values_to_list(
+                data_point_serialization_keys['file_facts'],
+                validated_data,
+                values,
+                point_in_time=point_in_time,
+                sub_clock=sub_clock,  # type: ignore
+                backend=backend,
+                files_to_save=files_to_save
+            )
+        elif key == 'json_facts':
+            _add_json_values_to_list(data_point_serialization_keys['json_facts'], validated_data, values)
+        else:
+            _add_values_to_list(data_point_serialization_keys[key], validated_data, values)  # type: ignore
+
+    if hash_columns is not None:
+        values[_PAYLOAD_HASH_INDEX] = _payload_hash(hash_columns, values)
+
+    return values
+
+
 def insert_or_update_data_points(
         tenant_id: Union[str, uuid.UUID],
         tenant_name: str,
@@ -133,11 +206,22 @@ def insert_or_update_data_points(
         sub_clock: int,
         backend: str,
         user_id: str,
-        record_source: str
-) -> None:
+        record_source: str,
+        skip_unchanged: bool = False,
+        backend_migration_in_progress: bool = False
+) -> Set[str]:
+    """
+    :param skip_unchanged: do not write data points whose payload equals the stored one (by payload_hash).
+    Only used for full (non partial) writes to data series without image/file facts as files are always stored anew.
+    :param backend_migration_in_progress: see DataSeries.backend_migration_in_progress
+    :return: the ids of the data points that were skipped because they did not change
+    """
     columns = ['id', 'external_id', 'point_in_time', 'inserted_at', 'deleted_at', 'sub_clock']
     col_types = [data_point_id_column_def, external_id_column_def, 'timestamp with time zone', 'timestamp with time zone', 'timestamp with time zone', 'bigint']
     history_select_columns = [f'"values_to_insert".{escape.escape(column)}' for column in columns]
+    # not part of the history
+    columns.append('payload_hash')
+    col_types.append('bytea')
     set_statements = [
         # keep old inserted_at if not deleted, change inserted_at to new value if was deleted
         """inserted_at = CASE 
@@ -147,7 +231,9 @@ def insert_or_update_data_points(
             END""",
         'deleted_at = EXCLUDED.deleted_at',
         'point_in_time = EXCLUDED.point_in_time',
-        'sub_clock = EXCLUDED.sub_clock'
+        'sub_clock = EXCLUDED.sub_clock',
+        # writes without a hash clear it, so a stale hash can never match
+        'payload_hash = EXCLUDED.payload_hash'
     ]
 
     # FIXME: determine if something is a PUT, if yes, we can use update set? or does the performance not matter
@@ -177,15 +263,18 @@ def insert_or_update_data_points(
                 sub_clock=sub_clock,
                 backend=backend,
                 user_id=user_id,
-                record_source=record_source
+                record_source=record_source,
+                skip_unchanged=False,
+                backend_migration_in_progress=backend_migration_in_progress
             )
+        return set()
     else:
         for key, col_type in FACT_DIM_TYPES:
             add_columns_to_list(data_point_serialization_keys[key], columns)  # type: ignore
             _generate_set_statements_non_partial(data_point_serialization_keys[key], set_statements)  # type: ignore
             add_columns_to_types_list(data_point_serialization_keys[key], col_type, col_types)  # type: ignore
             _generate_history_select_non_partial(data_point_serialization_keys[key], history_select_columns)  # type: ignore
-        _insert_or_update_data_points_impl(
+        return _insert_or_update_data_points_impl(
             tenant_id=tenant_id,
             tenant_name=tenant_name,
             data_series_id=data_series_id,
@@ -200,7 +289,11 @@ def insert_or_update_data_points(
             sub_clock=sub_clock,
             backend=backend,
             user_id=user_id,
-            record_source=record_source
+            record_source=record_source,
+            skip_unchanged=skip_unchanged
+                and len(data_point_serialization_keys['image_facts']) == 0
+                and len(data_point_serialization_keys['file_facts']) == 0,
+            backend_migration_in_progress=backend_migration_in_progress
         )
 
 
@@ -219,74 +312,94 @@ def _insert_or_update_data_points_impl(
         sub_clock: Optional[int],
         backend: str,
         user_id: str,
-        record_source: str
-) -> None:
+        record_source: str,
+        skip_unchanged: bool,
+        backend_migration_in_progress: bool
+) -> Set[str]:
     schema_name = escaped_tenant_schema(tenant_name)
     table_name = escape.escape(materialized_table_name(data_series_id, data_series_external_id))
 
-    all_values = []
-
-    for validated_data in validated_datas:
-        values = [
-            validated_data['id'],
-            validated_data['external_id'],
-            point_in_time,  # point_in_time
-            point_in_time,  # inserted_at, upsert will take care of this
-            None,  # deleted_at,
-            sub_clock
-        ]
-
-        for key in FACT_DIM_ORDER_IN_SQL:
-            # for images we have to get the value from the object that we already persisted earlier
-            # and then extract the filename out of it.
-            if key == 'image_facts':
-                _add_file_like_values_to_list(
-                    data_point_serialization_keys['image_facts'],
-                    validated_data,
-                    values,
-                    tenant_id=tenant_id,
-                    data_series_id=data_series_id,
-                    point_in_time=point_in_time,
-                    sub_clock=sub_clock,
-                    backend=backend
-                )
-            elif key == 'file_facts':
-                _add_file_like_values_to_list(
-                    data_point_serialization_keys['file_facts'],
-                    validated_data,
-                    values,
-                    tenant_id=tenant_id,
-                    data_series_id=data_series_id,
-                    point_in_time=point_in_time,
-                    sub_clock=sub_clock,
-                    backend=backend
-                )
-            elif key == 'json_facts':
-                _add_json_values_to_list(data_point_serialization_keys['json_facts'], validated_data, values)
-            else:
-                _add_values_to_list(data_point_serialization_keys[key], validated_data, values)  # type: ignore
+    # we iterate over the data more than once, so make sure we are not working on a generator
+    validated_datas = list(validated_datas)
 
-        all_values.append(values)
+    files_to_save: List[FileToSave] = []
+    all_values = [
+        _data_point_values(
+            validated_data=validated_data,
+            data_point_serialization_keys=data_point_serialization_keys,
+            point_in_time=point_in_time,
+            sub_clock=sub_clock,
+            backend=backend,
+            files_to_save=files_to_save,
+            hash_columns=columns if skip_unchanged else None
+        ) for validated_data in validated_datas
+    ]
 
-    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
-        with_statement = f"""
-        WITH "values_to_insert" AS (
-            SELECT {','.join(map(lambda x: f'{x[0]}::{x[1]}', zip(columns, column_types)))} FROM (
-                VALUES ({', '.join(['%s'] * len(columns))})
-            ) AS "t" ({','.join(columns)})
-        )
-        """
+    # upload all files of the chunk in parallel before they are referenced in the upsert
+    file_registry.save_bulk(
+        storage=default_media_storage,
+        tenant_id=tenant_id,
+        data_series_id=data_series_id,
+        files=files_to_save
+    )
+
+    # the staging table only lives until the end of the transaction, so we need one
+    with transaction.atomic(using=DATA_SERIES_DYNAMIC_SQL_DB), sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        unchanged_ids: Set[str] = set()
+        if skip_unchanged:
+            unchanged_ids = _lock_unchanged_data_points(
+                cursor=cursor,
+                schema_name=schema_name,
+                table_name=table_name,
+                all_values=all_values
+            )
+            validated_datas = [elem for elem in validated_datas if elem['id'] not in unchanged_ids]
+            all_values = [values for values in all_values if values[0] not in unchanged_ids]
+            if len(all_values) == 0:
+                return unchanged_ids
+
+        if backend_migration_in_progress:
+            from skipper.dataseries.storage.dynamic_sql.tasks.migrate import no_history_to_flat_history
+            no_history_to_flat_history.copy_on_write(
+                cursor=cursor,
+                data_series_id=data_series_id,
+                data_series_external_id=data_series_external_id,
+                tenant_name=tenant_name,
+                data_point_serialization_keys=data_point_serialization_keys,
+                data_point_ids=[values[0] for values in all_values]
+            )
+
+        use_copy = 0 < settings.SKIPPER_DATA_SERIES_BULK_COPY_THRESHOLD <= len(all_values)
+
+        if use_copy:
+            staging_table_name = _copy_into_staging_table(
+                cursor=cursor,
+                columns=columns,
+                column_types=column_types,
+                all_values=all_values
+            )
+            # the id is unique per chunk for bulk requests, but to stay consistent with
+            # the row by row behaviour (first write wins for the same point_in_time/sub_clock)
+            # we still only take the first row for each id
+            with_statement = f"""
+            WITH "values_to_insert" AS (
+                SELECT DISTINCT ON ("t".id) {','.join(map(lambda x: f'"t".{x}', columns))}
+                FROM {staging_table_name} AS "t"
+                ORDER BY "t".id, "t".{_STAGING_ORDINAL_COLUMN}
+            )
+            """
+        else:
+            with_statement = f"""
+            WITH "values_to_insert" AS (
+                SELECT {','.join(map(lambda x: f'{x[0]}::{x[1]}', zip(columns, column_types)))} FROM (
+                    VALUES ({', '.join(['%s'] * len(columns))})
+                ) AS "t" ({','.join(columns)})
+            )
+            """
 
         # for concurrent updates, only upsert if current date is newer
         # than already existing one
-        central_insert = f"""
-            INSERT INTO {schema_name}.{table_name} AS target_tbl (
-                {','.join(columns)}
-            )
-            SELECT * FROM "values_to_insert"
-            ON CONFLICT (id) DO 
-                UPDATE SET {','.join(set_statements)}
-                WHERE
+        update_condition = """
                     (
                         target_tbl.sub_clock IS NULL AND (
                                 target_tbl.point_in_time < EXCLUDED.point_in_time AND target_tbl.deleted_at IS NULL
@@ -298,6 +411,24 @@ def _insert_or_update_data_points_impl(
                             OR  (target_tbl.deleted_at, target_tbl.sub_clock) < (EXCLUDED.point_in_time, EXCLUDED.sub_clock) AND target_tbl.deleted_at IS NOT NULL
                         )
                     )
+        """
+        if skip_unchanged:
+            # unchanged rows are already filtered out above (and locked), this only guards the upsert itself.
+            # Skipped rows are not part of RETURNING, so they do not get a history entry either
+            update_condition = f"""
+                    ({update_condition}) AND (
+                        target_tbl.deleted_at IS NOT NULL
+                        OR target_tbl.payload_hash IS DISTINCT FROM EXCLUDED.payload_hash
+                    )
+            """
+        central_insert = f"""
+            INSERT INTO {schema_name}.{table_name} AS target_tbl (
+                {','.join(columns)}
+            )
+            SELECT * FROM "values_to_insert"
+            ON CONFLICT (id) DO 
+                UPDATE SET {','.join(set_statements)}
+                WHERE {update_condition}
             """
         
         if backend == StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value:
@@ -343,7 +474,75 @@ def _insert_or_update_data_points_impl(
             {central_insert}
             """
 
-        cursor.executemany(
-            final_insert_sql,
-            all_values
-        )
+        if use_copy:
+            # a single set based upsert for the whole chunk
+            cursor.execute(final_insert_sql)
+            cursor.execute(f'DROP TABLE {staging_table_name}')
+        else:
+            cursor.executemany(
+                final_insert_sql,
+                all_values
+            )
+
+    return unchanged_ids
+
+
+def _lock_unchanged_data_points(
+        cursor: Any,
+        schema_name: str,
+        table_name: str,
+        all_values: List[List[Any]]
+) -> Set[str]:
+    """
+    finds the data points whose stored payload_hash equals the one of the values to write and locks them
+    until the end of the transaction, so that they can not change before the upsert.
+
+    Only the first values of each id are compared, as only these would be written (see the upsert).
+
+    :return: the ids of the unchanged data points
+    """
+    hash_by_id: Dict[str, bytes] = {}
+    for values in all_values:
+        hash_by_id.setdefault(values[0], values[_PAYLOAD_HASH_INDEX])
+    if len(hash_by_id) == 0:
+        return set()
+    cursor.execute(f"""
+        SELECT tbl.id
+        FROM {schema_name}.{table_name} tbl
+        JOIN unnest(%(ids)s::text[], %(hashes)s::bytea[]) AS "new"(id, payload_hash)
+        ON tbl.id = "new".id
+        WHERE tbl.deleted_at IS NULL
+        AND tbl.payload_hash = "new".payload_hash
+        FOR UPDATE OF tbl
+    """, {
+        'ids': list(hash_by_id.keys()),
+        'hashes': list(hash_by_id.values())
+    })
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _copy_into_staging_table(
+        cursor: Any,
+        columns: List[str],
+        column_types: List[str],
+        all_values: List[List[Any]]
+) -> str:
+    """
+    streams all values into a fresh temporary table via COPY so that the actual
+    upsert can be done in a single set based statement instead of a statement per row.
+    The table is dropped at the end of the transaction at the latest.
+
+    :return: the escaped name of the staging table
+    """
+    staging_table_name = escape.escape(f'_3_bulk_staging_{uuid.uuid4().hex}')
+    column_defs = [f'{column} {column_type}' for column, column_type in zip(columns, column_types)]
+    column_defs.append(f'{_STAGING_ORDINAL_COLUMN} bigint')
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE {staging_table_name} (
+            {','.join(column_defs)}
+        ) ON COMMIT DROP
+    """)
+    with cursor.copy(f'COPY {staging_table_name} ({",".join(columns)},{_STAGING_ORDINAL_COLUMN}) FROM STDIN') as copy:
+        for ordinal, values in enumerate(all_values):
+            copy.write_row([*values, ordinal])
+    return staging_table_name
@@ -30,6 +30,24 @@ AND ds_dp.id = %(data_point_id)s
     return sql
 
 
+def read_only_datapoints_by_ids_query(
+        data_series_query_info: BasicDataSeriesQueryInfo
+) -> str:
+    """
+    constructs a query returning ds_dp.id, ds_dp.external_id in this order
+    for all ids in the list parameter data_point_ids
+    """
+    use_materialized = can_use_materialized_table(data_series_query_info, False)
+    sql = f"""
+SELECT ds_dp.id, ds_dp.external_id
+{render_base_sources(use_materialized, data_series_query_info)}
+{render_where_part(use_materialized, data_series_query_info)}
+AND ds_dp.id = ANY(%(data_point_ids)s)
+"""
+    lint(sql)
+    return sql
+
+
 def render_base_sources(use_materialized_table: bool, data_series_query_info: BasicDataSeriesQueryInfo) -> str:
     if use_materialized_table:
         return render_base_sources_materialized(data_series_query_info)
@@ -17,13 +17,14 @@ from skipper.dataseries.models.partitions import fully_qualified_partition_table
 from skipper.dataseries.raw_sql.escape import escape
 from skipper.dataseries.storage.contract import StorageBackendType
 from skipper.dataseries.storage.dynamic_sql.queries.common import is_timestamp_utc_fact, \
-    render_main_extra_fields_columns
+    render_main_extra_fields_columns, render_json_payload_column
 from skipper.dataseries.storage.dynamic_sql.queries.versions import versions_render_with_join_parts, \
     versions_render_with_parts, versions_render_select
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
 from skipper.dataseries.storage.dynamic_sql.queries.select_info import SelectInfo
 
-from skipper.dataseries.storage.dynamic_sql.queries.common import render_join_part, render_wheres
+from skipper.dataseries.storage.dynamic_sql.queries.common import render_join_part, render_wheres, \
+    render_validity_part_flat_history
 from skipper.core.lint import lint
 
 
@@ -45,7 +46,8 @@ def single_data_series_as_sql_table(
         changes_since: bool = False,
         include_versions: bool = False,
         include_pagination_data: bool = False,
-        filter_str: str = ''
+        filter_str: str = '',
+        payload_as_text: bool = False
 ) -> str:
     version_ds_dp = escape(f'version_ds_dp_{str(data_series_query_info.data_series_id)}')
     # if we use changes since,
@@ -61,7 +63,8 @@ def single_data_series_as_sql_table(
 SELECT "ds_dp"."id",
 ('{data_series_query_info.data_series_id}') as data_series_id
 {render_payload_selects(use_materialized,
-                        select_infos=all_select_infos, payload_as_json=payload_as_json, data_series_query_info=data_series_query_info)},
+                        select_infos=all_select_infos, payload_as_json=payload_as_json, data_series_query_info=data_series_query_info,
+                        payload_as_text=payload_as_text)},
 {versions_render_select(include_versions, version_ds_dp, data_series_query_info, all_select_infos)}
 {render_point_in_time(payload_as_json)},
 {render_pagination_data_select(include_pagination_data=include_pagination_data, use_materialized=use_materialized)}
@@ -89,16 +92,17 @@ def render_pagination_data_select(include_pagination_data: bool, use_materialize
         return f"(jsonb_build_object('id', ds_dp.id)::jsonb) as pagination_data,"
 
 
-def render_payload_selects(use_materialized: bool, select_infos: List[SelectInfo], payload_as_json: bool, data_series_query_info: DataSeriesQueryInfo) -> str:
+def render_payload_selects(use_materialized: bool, select_infos: List[SelectInfo], payload_as_json: bool, data_series_query_info: DataSeriesQueryInfo,
+                           payload_as_text: bool = False) -> str:
     # for the flat history backend, both the historical and
     # the normal table have essentially the same columns and access structure
     if use_materialized or data_series_query_info.backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
-        return render_payload_selects_singular_table(select_infos, payload_as_json)
+        return render_payload_selects_singular_table(select_infos, payload_as_json, payload_as_text)
     else:
-        return render_payload_selects_split_tables(select_infos, payload_as_json)
+        return render_payload_selects_split_tables(select_infos, payload_as_json, payload_as_text)
 
 
-def render_payload_selects_singular_table(select_infos: List[SelectInfo], payload_as_json: bool) -> str:
+def render_payload_selects_singular_table(select_infos: List[SelectInfo], payload_as_json: bool, payload_as_text: bool = False) -> str:
     comma_nl = ',\n'
     if payload_as_json:
         chunk_strs = ["'{}'::jsonb"]
@@ -116,7 +120,7 @@ def render_payload_selects_singular_table(select_infos: List[SelectInfo], payloa
                 argument_list.append(f'%({select_info.payload_variable_name})s,{value}')
             chunk_strs.append(f'(jsonb_build_object({comma_nl.join(argument_list)})::jsonb)')
 
-        return f',({"||".join(chunk_strs)}) as payload'
+        return render_json_payload_column(chunk_strs, select_infos, payload_as_text)
     else:
         if len(select_infos) == 0:
             return ""
@@ -132,7 +136,7 @@ def render_payload_selects_singular_table(select_infos: List[SelectInfo], payloa
         return f",{comma_nl.join(sub_parts)}"
 
 
-def render_payload_selects_split_tables(select_infos: List[SelectInfo], payload_as_json: bool) -> str:
+def render_payload_selects_split_tables(select_infos: List[SelectInfo], payload_as_json: bool, payload_as_text: bool = False) -> str:
     comma_nl = ',\n'
     if payload_as_json:
         chunk_strs = ["'{}'::jsonb"]
@@ -153,7 +157,7 @@ def render_payload_selects_split_tables(select_infos: List[SelectInfo], payload_
 
             chunk_strs.append(f'(jsonb_build_object({comma_nl.join(argument_list)})::jsonb)')
 
-        return f',({"||".join(chunk_strs)}) as payload'
+        return render_json_payload_column(chunk_strs, select_infos, payload_as_text)
     else:
         if len(select_infos) == 0:
             return ""
@@ -219,15 +223,10 @@ def render_where_part_flat_history(point_in_time: bool, changes_since: bool) ->
             return ""
         return f"AND ds_dp.point_in_time > %(changes_since)s"
 
-    point_in_time_part_ds_dp = ''
-    if point_in_time:
-        point_in_time_part_ds_dp = f"AND ds_dp.point_in_time <= %(point_in_time)s"
-
     return f"""
 WHERE
-ds_dp2.id IS NULL
-AND ds_dp.deleted = false
-{point_in_time_part_ds_dp}
+ds_dp.deleted = false
+{render_validity_part_flat_history(point_in_time)}
 {render_changes_since_ds_dp()}
 """
 
@@ -277,23 +276,8 @@ FROM {data_series_query_info.schema_name}.{data_series_query_info.main_query_tab
 
 
 def render_materialized_flat_history_base_sources(point_in_time: bool, changes_since: bool, data_series_query_info: DataSeriesQueryInfo) -> str:
-    def render_changes_since_ds_dp2() -> str:
-        if not changes_since:
-            return ""
-        return f"AND ds_dp2.point_in_time > %(changes_since)s"
-
-    point_in_time_part_ds_dp2 = ''
-    if point_in_time:
-        point_in_time_part_ds_dp2 = f"AND ds_dp2.point_in_time <= %(point_in_time)s"
-
     return f"""
     FROM {data_series_query_info.schema_name}.{data_series_query_info.materialized_flat_history_table_name} ds_dp
-    LEFT OUTER JOIN {data_series_query_info.schema_name}.{data_series_query_info.materialized_flat_history_table_name} ds_dp2 ON (
-    ds_dp.id = ds_dp2.id
-    AND (ds_dp.point_in_time, ds_dp.sub_clock) < (ds_dp2.point_in_time, ds_dp2.sub_clock)
-    {point_in_time_part_ds_dp2}
-    {render_changes_since_ds_dp2()}
-    )
 """
 
 
@@ -5,7 +5,7 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 from django.db import connections
-from typing import Optional
+from typing import Optional, Dict, List
 
 from skipper.dataseries.storage.contract import StorageBackendType
 from skipper.dataseries.storage.contract.repository import Repository
@@ -44,3 +44,33 @@ class DynamicSQLRepository(Repository):
             # FIXME: delete in 2.2.0
             return data_point_accessor(identifier=identifier, data_series_id=data_series_query_info.data_series_id)
 
+    def get_data_points(
+            self,
+            identifiers: List[str],
+            data_series_query_info: BasicDataSeriesQueryInfo
+    ) -> Dict[str, ReadOnlyDataPoint]:
+        if len(identifiers) == 0:
+            return {}
+        if data_series_query_info.backend == StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value\
+                or data_series_query_info.backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
+            with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+                cursor.execute(repository.read_only_datapoints_by_ids_query(
+                    data_series_query_info
+                ), {
+                    'data_point_ids': identifiers
+                })
+                return {
+                    val[0]: ReadOnlyDataPoint(
+                        id=val[0],
+                        data_series_id=data_series_query_info.data_series_id,
+                        external_id=val[1]
+                    ) for val in cursor.fetchall()
+                }
+        else:
+            # FIXME: delete in 2.2.0
+            ret: Dict[str, ReadOnlyDataPoint] = {}
+            for identifier in identifiers:
+                _data_point = data_point_accessor(identifier=identifier, data_series_id=data_series_query_info.data_series_id)
+                if _data_point is not None:
+                    ret[identifier] = _data_point
+            return ret
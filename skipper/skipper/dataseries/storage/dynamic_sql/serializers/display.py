@@ -4,45 +4,102 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
+import json
 
+from django.db import models
+from rest_framework import serializers
 from rest_framework.fields import JSONField
-from typing import Any, Type, Dict
+from rest_framework.utils import encoders
+from typing import Any, Type, Dict, Optional, Iterable, cast
 
 from skipper.core.models import default_media_storage
+from skipper.core.renderers import RawJSON
 from skipper.dataseries.storage.contract.base import BaseDataPointSerializer
 from ..models.datapoint import DisplayDataPoint
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
 
 
+class BaseDisplayDataPointListSerializer(serializers.ListSerializer):  # type: ignore
+    """
+    generates the urls of all files and images of a page at once instead of row by row
+    """
+
+    def to_representation(self, data: Any) -> Any:
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(iterable)
+        child = cast(BaseDisplayDataPointSerializer, self.child)
+        names = [
+            name for item in items if isinstance(item.payload, dict)
+            for name in file_names(item.payload, child.data_series_children_query_info)
+        ]
+        child.file_urls = default_media_storage.urls(names) if len(names) > 0 else None
+        try:
+            return super().to_representation(items)
+        finally:
+            child.file_urls = None
+
+
 class BaseDisplayDataPointSerializer(BaseDataPointSerializer):
     data_series_children_query_info: DataSeriesQueryInfo
 
     payload = JSONField(binary=False)
 
+    # set by BaseDisplayDataPointListSerializer
+    file_urls: Optional[Dict[str, str]] = None
+
     def to_representation(self, obj: Any) -> Dict[str, Any]:
         representation: Dict[str, Any] = super().to_representation(obj)
+        display_payload(representation['payload'], self.data_series_children_query_info, self.file_urls)
+        return representation
 
-        for external_id, value in self.data_series_children_query_info.file_facts.items():
-            if external_id in representation['payload']:
-                if representation['payload'][external_id] == '' or representation['payload'][external_id] is None:
-                    del representation['payload'][external_id]
-                else:
-                    representation['payload'][external_id] = default_media_storage.url(representation['payload'][external_id])
-
-        for external_id, value in self.data_series_children_query_info.image_facts.items():
-            if external_id in representation['payload']:
-                if representation['payload'][external_id] == '' or representation['payload'][external_id] is None:
-                    del representation['payload'][external_id]
-                else:
-                    representation['payload'][external_id] = default_media_storage.url(representation['payload'][external_id])
-
-        # do this in post, we can not handle this
-        # at db level as jsonb_strip_nulls would strip all nulls from json payloads as well!
-        for key in list(representation['payload'].keys()):
-            if representation['payload'][key] is None:
-                del representation['payload'][key]
 
-        return representation
+def file_names(payload: Dict[str, Any], data_series_children_query_info: DataSeriesQueryInfo) -> Iterable[str]:
+    """
+    the names of all files and images in the payload
+    """
+    for facts in [data_series_children_query_info.file_facts, data_series_children_query_info.image_facts]:
+        for external_id in facts.keys():
+            if external_id in payload and payload[external_id] != '' and payload[external_id] is not None:
+                yield payload[external_id]
+
+
+def _file_url(name: str, file_urls: Optional[Dict[str, str]]) -> str:
+    if file_urls is not None and name in file_urls:
+        return file_urls[name]
+    return str(default_media_storage.url(name))
+
+
+def display_payload(
+        payload: Dict[str, Any],
+        data_series_children_query_info: DataSeriesQueryInfo,
+        file_urls: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    turns file and image paths into urls and strips nulls on the top level (in place)
+
+    :param file_urls: already generated urls by file name, see PrivatePublicS3Boto3Storage.urls
+    """
+    for external_id, value in data_series_children_query_info.file_facts.items():
+        if external_id in payload:
+            if payload[external_id] == '' or payload[external_id] is None:
+                del payload[external_id]
+            else:
+                payload[external_id] = _file_url(payload[external_id], file_urls)
+
+    for external_id, value in data_series_children_query_info.image_facts.items():
+        if external_id in payload:
+            if payload[external_id] == '' or payload[external_id] is None:
+                del payload[external_id]
+            else:
+                payload[external_id] = _file_url(payload[external_id], file_urls)
+
+    # do this in post, we can not handle this
+    # at db level as jsonb_strip_nulls would strip all nulls from json payloads as well!
+    for key in list(payload.keys()):
+        if payload[key] is None:
+            del payload[key]
+
+    return payload
 
 
 def display_data_point_serializer_class(
@@ -58,6 +115,50 @@ def display_data_point_serializer_class(
     class ActualSerializer(BaseDisplayDataPointSerializer):
         data_series_children_query_info = _data_series_children_query_info
 
+        class Meta:
+            model = DisplayDataPoint
+            fields = _fields
+            read_only_fields = _fields
+            list_serializer_class = BaseDisplayDataPointListSerializer
+
+    return ActualSerializer
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, cls=encoders.JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+class BasePassThroughDisplayDataPointSerializer(BaseDataPointSerializer):
+    """
+    renders a data point as RawJSON. The payload is taken as is from the
+    payload_text column that the database already built for us
+    (see payload_as_text in data_series_as_sql_table) instead of decoding and encoding it again
+    """
+    include_versions: bool
+
+    def to_representation(self, obj: Any) -> RawJSON:  # type: ignore
+        representation: Dict[str, Any] = super().to_representation(obj)
+        versions = representation.pop('versions', None)
+
+        parts = [_encode(representation)[:-1], ',"payload":', obj.payload_text]
+        if self.include_versions:
+            parts.extend([',"versions":', _encode(versions)])
+        parts.append('}')
+        return RawJSON(''.join(parts))
+
+
+def pass_through_display_data_point_serializer_class(
+        include_versions: bool
+) -> Type[BasePassThroughDisplayDataPointSerializer]:
+    _fields = ['url', 'history_url', 'id', 'external_id', 'point_in_time']
+    if include_versions:
+        _fields.append('versions')
+
+    _include_versions = include_versions
+
+    class ActualSerializer(BasePassThroughDisplayDataPointSerializer):
+        include_versions = _include_versions
+
         class Meta:
             model = DisplayDataPoint
             fields = _fields
@@ -13,7 +13,8 @@ from typing import Dict, Any, Optional
 
 from skipper.dataseries.models.metamodel.data_series import DataSeries
 from skipper.dataseries.raw_sql import dbtime
-from skipper.dataseries.storage.contract.base import BaseDataPointModificationSerializer
+from skipper.dataseries.storage.contract.base import BaseDataPointModificationSerializer, \
+    BaseDataPointModificationListSerializer
 from skipper.dataseries.storage.dynamic_sql.models.datapoint import DataPoint, DisplayDataPoint
 from skipper.dataseries.storage.dynamic_sql.queries.display import data_series_as_sql_table
 from skipper.dataseries.storage.dynamic_sql.queries.select_info import select_infos
@@ -22,6 +23,7 @@ from skipper.dataseries.storage.dynamic_sql.serializers.display import \
 from skipper.dataseries.storage.dynamic_sql.tasks.persist_data_point import create_data_points, \
     set_missing_structure_elements_to_none
 from skipper.dataseries.storage.static_ds_information import DataPointSerializationKeys
+from skipper.dataseries.storage.static_ds_information_cache import cached_consumer_ids
 
 
 class DataPointModificationSerializer(BaseDataPointModificationSerializer):
@@ -90,7 +92,9 @@ class DataPointModificationSerializer(BaseDataPointModificationSerializer):
                 user_id=user_id,
                 record_source=record_source,
                 partial=False,
-                sub_clock=sub_clock
+                sub_clock=sub_clock,
+                consumer_ids=cached_consumer_ids(self.get_data_series()),
+                backend_migration_in_progress=self.get_data_series().backend_migration_in_progress
             )[0]
 
     def impl_update(
@@ -125,10 +129,13 @@ class DataPointModificationSerializer(BaseDataPointModificationSerializer):
                 user_id=user_id,
                 record_source=record_source,
                 partial=self.patch,
-                sub_clock=sub_clock
+                sub_clock=sub_clock,
+                consumer_ids=cached_consumer_ids(self.get_data_series()),
+                backend_migration_in_progress=self.get_data_series().backend_migration_in_progress
             )[0]
         return new_data_point
 
     class Meta:
         model = DataPoint
         fields = ['url', 'history_url', 'id', 'identify_dimensions_by_external_id', 'external_id', 'payload']
+        list_serializer_class = BaseDataPointModificationListSerializer
@@ -16,38 +16,46 @@ from django.db.models.query import RawQuerySet
 from django.http import HttpRequest
 from django_multitenant.utils import get_current_tenant  # type: ignore
 from rest_framework.exceptions import ValidationError, NotFound
-from typing import Callable, Any, Generator, List, Dict, cast, Optional, Tuple, Type, TypeVar
+from typing import Callable, Any, Generator, List, Dict, cast, Optional, Tuple, Type, TypeVar, Iterator
 
-from skipper import settings
-from skipper.core.utils.memoize import Memoize
+from skipper import metrics, settings
+from skipper.core.db_routers import data_point_read_db
+from skipper.core.renderers import PassThroughJSONRenderer
 from skipper.dataseries.models import data_point_event, ConsumerEventType, BulkInsertTaskData
-from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.models.metamodel.data_series import DataSeries, ExtraConfigParameters
 from skipper.dataseries.raw_sql import dbtime
-from skipper.dataseries.storage.contract import StorageBackendType
+from skipper.dataseries.storage.contract import StorageBackendType, file_registry
 from skipper.dataseries.storage.contract.base import BaseDataPointModificationSerializer, BaseDataPointSerializer
 from skipper.dataseries.storage.contract.factory import \
     get_data_point_serializer_for_data_series
 from skipper.dataseries.storage.contract.view import BaseDataSeries_DataPointViewSetCheckExternalIds, \
     BaseDataSeries_DataPointViewSetBulk, \
     BaseDataSeries_DataPointViewSet, \
-    StorageViewAdapter
+    StorageViewAdapter, BaseDataSeries_DataPointViewSetWithSerialization, EXPORT_FORMAT_CSV
+from skipper.dataseries.storage.dynamic_sql.bulk_task_data import encode_validated_datas
+from skipper.dataseries.storage.dynamic_sql.export import stream_ndjson, stream_csv
+from skipper.dataseries.storage.contract.repository import ReadOnlyDataPoint
 from skipper.dataseries.storage.dynamic_sql.models.datapoint import DataPoint, DisplayDataPoint
+from skipper.dataseries.storage.dynamic_sql.repository import DynamicSQLRepository
 from skipper.dataseries.storage.dynamic_sql.queries.check_external_ids import check_external_ids
 from skipper.dataseries.storage.dynamic_sql.queries.common import can_use_materialized_table
 from skipper.dataseries.storage.dynamic_sql.queries.count import data_series_data_point_count
 from skipper.dataseries.storage.dynamic_sql.queries.display import data_series_as_sql_table
-from skipper.dataseries.storage.dynamic_sql.queries.modification_materialized.delete import delete_datapoint
+from skipper.dataseries.storage.dynamic_sql.queries.modification_materialized.delete import delete_datapoint, delete_datapoints
 from skipper.dataseries.storage.dynamic_sql.queries.select_info import select_infos
 from skipper.dataseries.storage.dynamic_sql.queries.user_defined_filter import compute_user_defined_filter_for_raw_query
-from skipper.dataseries.storage.dynamic_sql.serializers.display import display_data_point_serializer_class
+from skipper.dataseries.storage.dynamic_sql.serializers.display import display_data_point_serializer_class, \
+    pass_through_display_data_point_serializer_class
 from skipper.dataseries.storage.dynamic_sql.serializers.modification import DataPointModificationSerializer
 from skipper.dataseries.storage.dynamic_sql.tasks.persist_data_point import persist_data_point_chunk, \
     async_persist_data_point_chunk
-from skipper.dataseries.storage.static_ds_information import compute_data_series_query_info, \
-    DataSeriesQueryInfo, data_point_serialization_keys
+from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
+from skipper.dataseries.storage.static_ds_information_cache import cached_data_series_query_info, \
+    cached_data_point_serialization_keys, cached_consumer_ids
 from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
 from skipper.testing import SKIPPER_CELERY_TESTING
 from skipper.core.lint import sql_cursor
+from skipper.pagination import estimate_row_count
 from skipper.dataseries.raw_sql import dbtime
 
 __T = TypeVar('__T')
@@ -107,7 +115,56 @@ def raw_display_data_point_query(
         start_object: Optional[str] = None,
         reverse: bool = False,
         limit: Optional[int] = None,
+        payload_as_text: bool = False
 ) -> RawQuerySet:  # type: ignore
+    """
+    :param payload_as_text: select the final payload json (with top level nulls stripped) as payload_text instead
+    of the payload. Not usable for data series with file or image facts in the payload.
+    """
+    query_str, query_params = display_data_point_query(
+        include_in_payload=include_in_payload,
+        filter_value=filter_value,
+        data_series=data_series,
+        external_id_as_dimension_identifier=external_id_as_dimension_identifier,
+        external_ids=external_ids,
+        point_in_time=point_in_time,
+        changes_since=changes_since,
+        should_include_versions=should_include_versions,
+        data_series_query_info=data_series_query_info,
+        data_point_id=data_point_id,
+        start_object=start_object,
+        reverse=reverse,
+        limit=limit,
+        payload_as_text=payload_as_text
+    )
+
+    raw = DisplayDataPoint.objects\
+        .raw(
+            query_str,
+            query_params,
+            using=data_point_read_db()
+        )
+
+    return raw
+
+
+def display_data_point_query(
+        include_in_payload: Optional[List[str]],
+        filter_value: Dict[str, Any],
+        data_series: DataSeries,
+        external_id_as_dimension_identifier: bool,
+        external_ids: Optional[List[str]],
+        point_in_time: Optional[datetime.datetime],
+        changes_since: Optional[datetime.datetime],
+        should_include_versions: bool,
+        data_series_query_info: DataSeriesQueryInfo,
+        data_point_id: Optional[str] = None,
+        start_object: Optional[str] = None,
+        reverse: bool = False,
+        limit: Optional[int] = None,
+        payload_as_text: bool = False,
+        payload_as_json: bool = True
+) -> Tuple[str, Dict[str, Any]]:
     data_series_obj: DataSeries = data_series
 
     query_params: Dict[str, Any] = {select_info.payload_variable_name: select_info.unescaped_display_id for
@@ -209,30 +266,24 @@ def raw_display_data_point_query(
     query_str = data_series_as_sql_table(
         include_in_payload=include_in_payload,
         data_series=data_series_obj,
-        payload_as_json=True,
+        payload_as_json=payload_as_json,
         point_in_time=is_point_in_time,
         changes_since=is_changes_since,
         include_versions=should_include_versions,
         filter_str=filter_query_str,
         resolve_dimension_external_ids=external_id_as_dimension_identifier,
-        data_series_query_info=data_series_query_info
+        data_series_query_info=data_series_query_info,
+        payload_as_text=payload_as_text
     )
-    
-    raw = DisplayDataPoint.objects\
-        .raw(
-            query_str,
-            query_params
-        )
 
-    return raw
+    return query_str, query_params
 
 
 class DynamicStorageViewAdapter(StorageViewAdapter):
-    data_series_query_info: Memoize[
-        DataSeries, DataSeriesQueryInfo]
+    data_series_query_info: Callable[[DataSeries], DataSeriesQueryInfo]
 
     def __init__(self) -> None:
-        self.data_series_query_info = Memoize(compute_data_series_query_info)
+        self.data_series_query_info = cached_data_series_query_info
 
     def access_object(
             self,
@@ -301,9 +352,8 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
                 sub_clock=sub_clock,
                 record_source=record_source,
                 user_id=user_id,
-                data_point_serialization_keys=data_point_serialization_keys(
-                    self.data_series_query_info(view.access_data_series())
-                )
+                data_point_serialization_keys=cached_data_point_serialization_keys(view.access_data_series()),
+                backend_migration_in_progress=view.access_data_series().backend_migration_in_progress
             )
 
         data_point_event(
@@ -321,7 +371,8 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
                 }]
             },
             event_type=ConsumerEventType.DATA_POINT_DELETED,
-            sub_clock=sub_clock
+            sub_clock=sub_clock,
+            consumer_ids=cached_consumer_ids(view.access_data_series())
         )
 
     def get_empty_queryset(
@@ -346,9 +397,35 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
             should_include_versions=view.should_include_versions(),
             external_ids=view.get_external_ids(),
             external_id_as_dimension_identifier=view.external_id_as_dimension_identifier(),
-            data_series_query_info=self.data_series_query_info(view.access_data_series())
+            data_series_query_info=self.data_series_query_info(view.access_data_series()),
+            payload_as_text=self.can_pass_through_payload(view, request)
         )
 
+    def can_pass_through_payload(self, view: BaseDataSeries_DataPointViewSet, request: HttpRequest) -> bool:
+        """
+        whether the page can be rendered with the payload exactly as the database built it
+        """
+        if not isinstance(getattr(request, 'accepted_renderer', None), PassThroughJSONRenderer):
+            return False
+        # file and image facts are stored as paths and have to be turned into urls
+        data_series_query_info = self.data_series_query_info(view.access_data_series())
+        include_in_payload = view.get_include_in_payload()
+        for external_id in [*data_series_query_info.file_facts.keys(), *data_series_query_info.image_facts.keys()]:
+            if include_in_payload is None or external_id in include_in_payload:
+                return False
+        return True
+
+    def serialize_list(self, view: BaseDataSeries_DataPointViewSetWithSerialization, page: Any) -> List[
+        Dict[str, Any]]:
+        if len(page) == 0 or not hasattr(page[0], 'payload_text'):
+            return super().serialize_list(view, page)
+
+        _view = cast(Any, view)
+        serializer_class = pass_through_display_data_point_serializer_class(
+            include_versions=_view.should_include_versions()
+        )
+        return serializer_class(page, many=True, context=_view.get_serializer_context()).data  # type: ignore
+
     def get_prev_page_query_for_pagination(
             self,
             view: BaseDataSeries_DataPointViewSet,
@@ -374,7 +451,8 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
 
     def data_point_count(
             self,
-            view: BaseDataSeries_DataPointViewSet
+            view: BaseDataSeries_DataPointViewSet,
+            estimate: bool = False
     ) -> int:
         data_series: DataSeries = view.access_data_series()
         pit = view.get_point_in_time()
@@ -402,10 +480,14 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
             point_in_time=pit is not None,
             changes_since=changes_since is not None,
             used_data_series_children=used_data_series_children,
-            filter_str=filter_query_part
+            filter_str=filter_query_part,
+            estimate=estimate
         )
-        with transaction.atomic():
-            with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        read_db = data_point_read_db()
+        with transaction.atomic(using=read_db):
+            with sql_cursor(read_db) as cursor:
+                if estimate:
+                    return estimate_row_count(cursor, count_query, query_params)
                 cursor.execute(count_query, query_params)
                 return cast(int, cursor.fetchone()[0])
 
@@ -482,7 +564,8 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
                 bulk_insert=True
             )
 
-            valid = serializer.is_valid(raise_exception=False)
+            with metrics.BULK_VALIDATION_SECONDS.time():
+                valid = serializer.is_valid(raise_exception=False)
             if not valid:
                 # HACK: set this to None here, so that DRF does not
                 # try to render anything and then fail
@@ -514,12 +597,11 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
                     tenant=data_series_obj.tenant,
                     data_series=data_series_obj,
                     point_in_time=datetime.datetime.fromtimestamp(point_in_time_timestamp, tz=datetime.timezone.utc),
-                    # contains validated data and the serialization keys
                     data={
-                        'validated_datas': list_chunk,
                         # hack, to ensure the serialization keys are not UUID objects anymore
                         'serialization_keys': serializer_class.serialization_keys
                     },
+                    compressed_data=encode_validated_datas(list_chunk, settings.SKIPPER_DATA_SERIES_BULK_BATCH_SIZE),
                     user=User.objects.get(id=user_id),
                     record_source=record_source,
                     sub_clock=sub_clock
@@ -537,7 +619,8 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
                     # if it is launched immediately
                     task_data_ids.append(task_data.id)
             else:
-                persist_data_point_chunk(
+                # only the data points that actually changed were written
+                created_external_ids = persist_data_point_chunk(
                     tenant_id=get_current_tenant().id,
                     tenant_name=get_current_tenant().name,
                     data_series_id=str(data_series_obj.id),
@@ -548,7 +631,12 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
                     point_in_time_timestamp=point_in_time_timestamp,
                     user_id=user_id,
                     record_source=record_source,
-                    sub_clock=sub_clock
+                    sub_clock=sub_clock,
+                    consumer_ids=cached_consumer_ids(data_series_obj),
+                    skip_unchanged=data_series_obj.get_extra_config_property_value(
+                        ExtraConfigParameters.skip_unchanged_data_points
+                    ),
+                    backend_migration_in_progress=data_series_obj.backend_migration_in_progress
                 )
 
             queue_time = dbtime.now()
@@ -567,13 +655,120 @@ class DynamicStorageViewAdapter(StorageViewAdapter):
 
             return created_external_ids
 
+    def delete_bulk(
+            self,
+            view: BaseDataSeries_DataPointViewSetBulk,
+            user_id: str,
+            record_source: str,
+            data_point_ids: List[str],
+            point_in_time: datetime.datetime,
+            sub_clock: int
+    ) -> List[ReadOnlyDataPoint]:
+        data_series_obj = view.access_data_series()
+        data_series_id = str(data_series_obj.id)
+        data_series_query_info = self.data_series_query_info(data_series_obj)
+        consumer_ids = cached_consumer_ids(data_series_obj)
+        repository = DynamicSQLRepository()
+
+        # order preserving, the same data point must not be updated twice in one statement
+        unique_ids = list(dict.fromkeys(data_point_ids))
+
+        file_fact_ids: List[str] = []
+        if data_series_obj.backend == StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value:
+            # history backends still reference the files of deleted data points until the history is pruned
+            file_fact_ids = [
+                fact.id for fact in [*data_series_query_info.image_facts.values(), *data_series_query_info.file_facts.values()]
+            ]
+
+        deleted: List[ReadOnlyDataPoint] = []
+        with transaction.atomic(using=DATA_SERIES_DYNAMIC_SQL_DB):
+            chunk_size = settings.SKIPPER_DATA_SERIES_BULK_BATCH_SIZE
+            for chunk_start in range(0, len(unique_ids), chunk_size):
+                existing = repository.get_data_points(
+                    unique_ids[chunk_start:chunk_start + chunk_size],
+                    data_series_query_info
+                )
+                if len(existing) == 0:
+                    continue
+                chunk = list(existing.values())
+                delete_datapoints(
+                    get_current_tenant(),
+                    data_series_id,
+                    data_series_obj.external_id,
+                    data_series_obj.backend,
+                    [(data_point.id, data_point.external_id) for data_point in chunk],
+                    point_in_time,
+                    sub_clock=sub_clock,
+                    record_source=record_source,
+                    user_id=user_id,
+                    data_point_serialization_keys=cached_data_point_serialization_keys(data_series_obj),
+                    backend_migration_in_progress=data_series_obj.backend_migration_in_progress
+                )
+                file_registry.delete_all_for_datapoints(
+                    tenant_id=get_current_tenant().id,
+                    data_series_id=data_series_id,
+                    fact_ids=file_fact_ids,
+                    data_point_ids=[data_point.id for data_point in chunk]
+                )
+                data_point_event(
+                    tenant=get_current_tenant(),
+                    point_in_time=point_in_time,
+                    data_series_id=data_series_id,
+                    payload={
+                        'data_series': {
+                            'id': data_series_id,
+                            'external_id': data_series_obj.external_id
+                        },
+                        'data_points': [{
+                            'id': data_point.id,
+                            'external_id': data_point.external_id
+                        } for data_point in chunk]
+                    },
+                    event_type=ConsumerEventType.DATA_POINT_DELETED,
+                    sub_clock=sub_clock,
+                    consumer_ids=consumer_ids
+                )
+                deleted.extend(chunk)
+        return deleted
+
     def check_external_ids(self, view: BaseDataSeries_DataPointViewSetCheckExternalIds, external_ids: List[str]) -> List[str]:
         return check_external_ids(
             external_ids=external_ids,
             backend=view.access_data_series().backend,
             data_series_id=str(view.access_data_series().id),
-            data_series_query_info=compute_data_series_query_info(view.access_data_series())
+            data_series_query_info=self.data_series_query_info(view.access_data_series())
         )
 
+    def export_data_points(self, view: BaseDataSeries_DataPointViewSet, export_format: str) -> Iterator[str]:
+        data_series_query_info = self.data_series_query_info(view.access_data_series())
+        include_in_payload = view.get_include_in_payload()
+        _select_infos = select_infos(data_series_query_info)
+        if include_in_payload is not None:
+            _select_infos = [elem for elem in _select_infos if elem.unescaped_display_id in include_in_payload]
+
+        file_external_ids = {*data_series_query_info.file_facts.keys(), *data_series_query_info.image_facts.keys()}
+        payload_as_json = export_format != EXPORT_FORMAT_CSV
+        payload_as_text = payload_as_json and \
+            not any(elem.unescaped_display_id in file_external_ids for elem in _select_infos)
+
+        query_str, query_params = display_data_point_query(
+            include_in_payload=include_in_payload,
+            filter_value=view.get_filter_value(),
+            data_series=view.access_data_series(),
+            point_in_time=view.get_point_in_time(),
+            changes_since=view.get_changes_since(),
+            should_include_versions=False,
+            external_ids=view.get_external_ids(),
+            external_id_as_dimension_identifier=view.external_id_as_dimension_identifier(),
+            data_series_query_info=data_series_query_info,
+            payload_as_json=payload_as_json,
+            payload_as_text=payload_as_text
+        )
+
+        read_db = data_point_read_db()
+        if export_format == EXPORT_FORMAT_CSV:
+            return stream_csv(query_str, query_params, _select_infos, data_series_query_info, read_db)
+        return stream_ndjson(query_str, query_params, payload_as_text, data_series_query_info, read_db)
+
 
 adapter = DynamicStorageViewAdapter
@@ -98,6 +98,21 @@ def ensure_indexes_materialized_flat_history(
             (point_in_time ASC NULLS LAST)
             TABLESPACE pg_default;
             """,
+            # for point in time queries, see valid_to in insert_to_flat_history_query
+            f"""
+            CREATE INDEX IF NOT EXISTS {escape.escape(f'_mfhist_validity_{str(data_series_id)}_{data_series_external_id}')}
+            ON {schema_name}.{table_name} USING gist
+            (tstzrange(point_in_time, valid_to, '[)'))
+            TABLESPACE pg_default;
+            """,
+            # for queries on the current versions, see render_validity_part_flat_history
+            f"""
+            CREATE INDEX IF NOT EXISTS {escape.escape(f'_mfhist_current_{str(data_series_id)}_{data_series_external_id}')}
+            ON {schema_name}.{table_name} USING btree
+            (id)
+            TABLESPACE pg_default
+            WHERE valid_to IS NULL;
+            """,
             f"""
             CREATE INDEX IF NOT EXISTS {escape.escape(f'_mfhist_external_id_{str(data_series_id)}_{data_series_external_id}')}
             ON {schema_name}.{table_name} USING btree
@@ -127,6 +142,95 @@ def ensure_indexes_materialized_flat_history(
             cursor.execute(query)
 
 
+def ensure_validity_range_materialized_flat_history(
+        data_series_id: Union[str, uuid.UUID],
+        data_series_external_id: str,
+        tenant_name: str,
+        chunk_size: int
+) -> None:
+    """
+    adds the valid_to column to flat history tables created before it existed and
+    backfills it from the next version of each data point. valid_to is maintained on every
+    write afterwards (see insert_to_flat_history_query).
+
+    The backfill handles the data points in chunks of chunk_size ordered by id, each chunk in its own transaction,
+    so that large tables are not rewritten (and locked) in one go.
+    """
+    schema_name = escaped_tenant_schema(tenant_name)
+    ensure_schema(schema_name, connection_name=DATA_SERIES_DYNAMIC_SQL_DB)
+    table_name_unescaped = materialized_flat_history_table_name(data_series_id, data_series_external_id)
+    table_name = escape.escape(table_name_unescaped)
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        # no default, so this does not rewrite the table
+        cursor.execute(f"""
+        ALTER TABLE {schema_name}.{table_name}
+        ADD COLUMN IF NOT EXISTS valid_to timestamp with time zone NULL;
+        """)
+
+    # all ids are non empty, so this sorts before the first one
+    last_id = ''
+    while True:
+        with transaction.atomic(using=DATA_SERIES_DYNAMIC_SQL_DB), sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            cursor.execute(f"""
+            SELECT DISTINCT id FROM {schema_name}.{table_name}
+            WHERE id > %(last_id)s
+            ORDER BY id ASC
+            LIMIT %(chunk_size)s
+            """, {'last_id': last_id, 'chunk_size': chunk_size})
+            chunk_ids = [row[0] for row in cursor.fetchall()]
+            if len(chunk_ids) == 0:
+                break
+            # all versions of a data point are in the same chunk, so lead() sees all of them
+            cursor.execute(f"""
+            UPDATE {schema_name}.{table_name} tbl
+            SET valid_to = versions."next_point_in_time"
+            FROM (
+                SELECT
+                    id,
+                    point_in_time,
+                    sub_clock,
+                    lead(point_in_time) OVER (
+                        PARTITION BY id ORDER BY point_in_time ASC, sub_clock ASC NULLS FIRST
+                    ) AS "next_point_in_time"
+                FROM {schema_name}.{table_name}
+                WHERE id = ANY(%(chunk_ids)s)
+            ) versions
+            WHERE tbl.id = versions.id
+            AND tbl.point_in_time = versions.point_in_time
+            AND tbl.sub_clock IS NOT DISTINCT FROM versions.sub_clock
+            AND tbl.valid_to IS DISTINCT FROM versions."next_point_in_time"
+            """, {'chunk_ids': chunk_ids})
+        if len(chunk_ids) < chunk_size:
+            break
+        last_id = chunk_ids[-1]
+
+    ensure_indexes_materialized_flat_history(
+        data_series_id=data_series_id,
+        data_series_external_id=data_series_external_id,
+        tenant_name=tenant_name
+    )
+
+
+def ensure_payload_hash_materialized(
+        data_series_id: Union[str, uuid.UUID],
+        data_series_external_id: str,
+        tenant_name: str
+) -> None:
+    """
+    adds the payload_hash column to materialized tables created before it existed.
+    The hash is only filled for data series that skip unchanged data points
+    (see insert_or_update_data_points), existing rows simply start out without one.
+    """
+    schema_name = escaped_tenant_schema(tenant_name)
+    ensure_schema(schema_name, connection_name=DATA_SERIES_DYNAMIC_SQL_DB)
+    table_name = escape.escape(materialized_table_name(data_series_id, data_series_external_id))
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        cursor.execute(f"""
+        ALTER TABLE {schema_name}.{table_name}
+        ADD COLUMN IF NOT EXISTS payload_hash bytea NULL;
+        """)
+
+
 def handle_create_data_series_materialized_flat_history(
         data_series_id: Union[str, uuid.UUID],
         data_series_external_id: str,
@@ -147,7 +251,8 @@ def handle_create_data_series_materialized_flat_history(
                     deleted boolean NOT NULL,
                     user_id varchar(256),
                     record_source varchar(256),
-                    sub_clock bigint NULL
+                    sub_clock bigint NULL,
+                    valid_to timestamp with time zone NULL
                 )
                 """
         ]
@@ -195,7 +300,8 @@ def handle_create_data_series_materialized(
                 point_in_time timestamp with time zone NOT NULL,
                 inserted_at timestamp with time zone NOT NULL,
                 deleted_at timestamp with time zone,
-                sub_clock bigint NULL
+                sub_clock bigint NULL,
+                payload_hash bytea NULL
             )
             """
         ]
@@ -5,10 +5,12 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 
+import time
 import uuid
+from contextlib import contextmanager
 
-from django.db import connections, transaction
-from typing import Any, Dict, List, Mapping, Union
+from django.db import connections
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Union
 from psycopg import errors # type: ignore
 from skipper.core.lint import sql_cursor  # type: ignore
 
@@ -37,18 +39,113 @@ def index_rel_name_flat_history(index_id: uuid.UUID) -> str:
     return limit.limit_length('_mfhist_userindex_' + str(index_id))
 
 
-def handle_create_user_defined_index_on_materialized_or_flat_table(
-    unescaped_table_name: str, target_table_type: TargetTableType, escaped_schema_name: str, index_id: uuid.UUID,
-    index_rel_name: str, escaped_target_columns: List[str]
-) -> None:
-    targets_list_string = ','.join(escaped_target_columns)
+# an interrupted concurrent build leaves an invalid index behind, which we drop and build again
+_MAX_INDEX_BUILD_ATTEMPTS = 3
+
+# seconds between attempts to get the build lock of an index that someone else is building
+_INDEX_BUILD_LOCK_POLL_INTERVAL = 1.0
+
+
+def _build_concurrently() -> bool:
+    # CREATE/DROP INDEX CONCURRENTLY can not run inside a transaction block,
+    # if we are called from within one (e.g. while pruning) we have to lock the table instead
+    return not connections[DATA_SERIES_DYNAMIC_SQL_DB].in_atomic_block
+
+
+def _index_is_valid(escaped_schema_name: str, index_rel_name: str) -> Optional[bool]:
+    """
+    None if the index does not exist (yet), otherwise whether it can be used by queries
+    """
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        cursor.execute(
+            """
+                SELECT "indisvalid" FROM "pg_catalog"."pg_index"
+                WHERE "indexrelid" = to_regclass(%(index_name)s);
+            """,
+            {'index_name': f'{escaped_schema_name}.{escape.escape(index_rel_name)}'}
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return bool(row[0])
+
+
+@contextmanager
+def _index_build_lock(escaped_schema_name: str, index_rel_name: str) -> Iterator[None]:
+    """
+    serializes all builds of the same index, so that an invalid index is only ever dropped
+    by the worker that is about to build it and never while another worker is still building it
+    """
+    params = {'lock_name': f'user_defined_index:{escaped_schema_name}.{escape.escape(index_rel_name)}'}
+    if not _build_concurrently():
+        # released together with the surrounding transaction
+        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtextextended(%(lock_name)s, 0));', params)
+        yield
+        return
+
+    # no blocking pg_advisory_lock here: the waiting statement would hold a snapshot,
+    # which the CREATE INDEX CONCURRENTLY of the lock holder waits for
+    while True:
+        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(hashtextextended(%(lock_name)s, 0));', params)
+            row = cursor.fetchone()
+        if row is not None and row[0]:
+            break
+        time.sleep(_INDEX_BUILD_LOCK_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(hashtextextended(%(lock_name)s, 0));', params)
+
+
+def _drop_index(escaped_schema_name: str, index_rel_name: str) -> None:
+    concurrently = 'CONCURRENTLY' if _build_concurrently() else ''
     with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
         cursor.execute(
             f"""
-                CREATE INDEX IF NOT EXISTS {escape.escape(index_rel_name)}
-                ON {escaped_schema_name}.{escape.escape(unescaped_table_name)} ({targets_list_string});
+                DROP INDEX {concurrently} IF EXISTS {escaped_schema_name}.{escape.escape(index_rel_name)};
             """
         )
+
+
+def _create_index(
+    escaped_schema_name: str, unescaped_table_name: str, index_rel_name: str, escaped_target_columns: List[str]
+) -> None:
+    concurrently = 'CONCURRENTLY' if _build_concurrently() else ''
+    targets_list_string = ','.join(escaped_target_columns)
+    with _index_build_lock(escaped_schema_name, index_rel_name):
+        for _ in range(_MAX_INDEX_BUILD_ATTEMPTS):
+            if _index_is_valid(escaped_schema_name, index_rel_name) is False:
+                # IF NOT EXISTS would happily keep the broken index. As we hold the build lock,
+                # it is not still being built by someone else.
+                _drop_index(escaped_schema_name, index_rel_name)
+            with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+                cursor.execute(
+                    f"""
+                        CREATE INDEX {concurrently} IF NOT EXISTS {escape.escape(index_rel_name)}
+                        ON {escaped_schema_name}.{escape.escape(unescaped_table_name)} ({targets_list_string});
+                    """
+                )
+            if _index_is_valid(escaped_schema_name, index_rel_name):
+                return
+    raise AssertionError(
+        f'index {index_rel_name} is still invalid after {_MAX_INDEX_BUILD_ATTEMPTS} attempts to build it'
+    )
+
+
+def handle_create_user_defined_index_on_materialized_or_flat_table(
+    unescaped_table_name: str, target_table_type: TargetTableType, escaped_schema_name: str, index_id: uuid.UUID,
+    index_rel_name: str, escaped_target_columns: List[str]
+) -> None:
+    _create_index(
+        escaped_schema_name=escaped_schema_name,
+        unescaped_table_name=unescaped_table_name,
+        index_rel_name=index_rel_name,
+        escaped_target_columns=escaped_target_columns
+    )
+    # the registry entry marks the index as ready, see user_defined_index_build_state
     if not IndexByUUID.objects.filter(source_id=index_id, target_table_type=target_table_type.value).exists():
         IndexByUUID.objects.create(
             source_id=index_id,
@@ -59,6 +156,12 @@ def handle_create_user_defined_index_on_materialized_or_flat_table(
         )
 
 
+def _drop_registered_indexes(indexes: List[IndexByUUID], escaped_schema_name: str) -> None:
+    for index in indexes:
+        _drop_index(escaped_schema_name, index.db_name)
+        index.delete()
+
+
 def handle_drop_user_defined_index_materialized(
     index_id: uuid.UUID, escaped_schema_name: str
 ) -> None:
@@ -66,14 +169,7 @@ def handle_drop_user_defined_index_materialized(
     indexes = list(IndexByUUID.objects.filter(source_id=index_id, source_type=IndexRegistrySourceType.USER_DEFINED_INDEX.value))
     if len(indexes) != 1:
         raise AssertionError("Unexpected amount of indexes registered in IndexByUUID with is UUID: " + str(index_id))
-    for index in indexes:
-        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
-            cursor.execute(
-                f"""
-                    DROP INDEX {escaped_schema_name}.{escape.escape(index.db_name)};
-                """
-            )
-        index.delete()
+    _drop_registered_indexes(indexes, escaped_schema_name)
 
 
 def handle_drop_user_defined_index_flat_history(
@@ -82,14 +178,7 @@ def handle_drop_user_defined_index_flat_history(
     indexes = list(IndexByUUID.objects.filter(source_id=index_id, source_type=IndexRegistrySourceType.USER_DEFINED_INDEX.value))
     if len(indexes) != 2:
         raise AssertionError("Unexpected amount of indexes registered in IndexByUUID with this ID: " + str(index_id))
-    for index in indexes:
-        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
-            cursor.execute(
-                f"""
-                    DROP INDEX {escaped_schema_name}.{escape.escape(index.db_name)};
-                """
-            )
-        index.delete()
+    _drop_registered_indexes(indexes, escaped_schema_name)
 
 
 def handle_drop_user_defined_index_by_target_table_type(
@@ -102,14 +191,81 @@ def handle_drop_user_defined_index_by_target_table_type(
     ))
     if len(indexes) != 1:
         raise AssertionError("Unexpected amount of indexes registered in IndexByUUID with this ID: " + str(index_id))
-    for index in indexes:
+    _drop_registered_indexes(indexes, escaped_schema_name)
+
+
+def _index_rel_names_by_target_table_type(index_id: uuid.UUID, backend: str) -> Dict[TargetTableType, str]:
+    ret: Dict[TargetTableType, str] = {}
+    if backend in (
+        StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value,
+        StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+    ):
+        ret[TargetTableType.MATERIALIZED] = index_rel_name(index_id)
+    if backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
+        ret[TargetTableType.FLAT_HISTORY] = index_rel_name_flat_history(index_id)
+    return ret
+
+
+def user_defined_index_build_states(
+    backends_by_index_id: Mapping[uuid.UUID, str], tenant_name: str
+) -> Dict[uuid.UUID, Dict[str, Any]]:
+    """
+    whether each index has been built on all tables of its data series and, as long as it is not,
+    the progress of the running builds as reported by pg_stat_progress_create_index.
+    Only concurrent builds report progress, the entry of a table whose build has not started is None.
+
+    The states of all indexes are fetched at once, so that listing indexes does not query per index.
+
+    :param backends_by_index_id: the backend of the data series of every index
+    """
+    registered = set(
+        (str(source_id), target_table_type) for source_id, target_table_type in IndexByUUID.objects.filter(
+            source_id__in=list(backends_by_index_id.keys()),
+            source_type=IndexRegistrySourceType.USER_DEFINED_INDEX.value
+        ).values_list('source_id', 'target_table_type')
+    )
+    escaped_schema_name = escaped_tenant_schema(tenant_name)
+    pending: Dict[uuid.UUID, Dict[TargetTableType, str]] = {}
+    for index_id, backend in backends_by_index_id.items():
+        _pending = {
+            target_table_type: f'{escaped_schema_name}.{escape.escape(rel_name)}'
+            for target_table_type, rel_name in _index_rel_names_by_target_table_type(index_id, backend).items()
+            if (str(index_id), target_table_type.value) not in registered
+        }
+        if len(_pending) > 0:
+            pending[index_id] = _pending
+
+    progress_by_index_name: Dict[str, Dict[str, Any]] = {}
+    if len(pending) > 0:
         with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
             cursor.execute(
-                f"""
-                    DROP INDEX {escaped_schema_name}.{escape.escape(index.db_name)};
                 """
+                    SELECT "index_names"."index_name", "phase", "blocks_total", "blocks_done", "tuples_total", "tuples_done"
+                    FROM unnest(%(index_names)s::text[]) AS "index_names"("index_name")
+                    JOIN "pg_catalog"."pg_stat_progress_create_index"
+                    ON "index_relid" = to_regclass("index_names"."index_name");
+                """,
+                {'index_names': [index_name for _pending in pending.values() for index_name in _pending.values()]}
             )
-        index.delete()
+            for row in cursor.fetchall():
+                progress_by_index_name[row[0]] = {
+                    'phase': row[1],
+                    'blocks_total': row[2],
+                    'blocks_done': row[3],
+                    'tuples_total': row[4],
+                    'tuples_done': row[5]
+                }
+
+    ret: Dict[uuid.UUID, Dict[str, Any]] = {}
+    for index_id in backends_by_index_id.keys():
+        if index_id not in pending:
+            ret[index_id] = {'ready': True, 'progress': None}
+        else:
+            ret[index_id] = {'ready': False, 'progress': {
+                target_table_type.value: progress_by_index_name.get(index_name, None)
+                for target_table_type, index_name in pending[index_id].items()
+            }}
+    return ret
 
 
 def handle_create_user_defined_index(
@@ -188,26 +344,27 @@ def handle_create_user_defined_index_actual(
     ensure_schema(escaped_schema_name, connection_name=DATA_SERIES_DYNAMIC_SQL_DB)
     
     # 2.: Create indexes
-    with transaction.atomic():
-        if backend in (
-            StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value,
-            StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
-        ):
-            handle_create_user_defined_index_on_materialized_or_flat_table(
-                unescaped_table_name=materialized_table_name(data_series_id, data_series_external_id),
-                target_table_type=TargetTableType.MATERIALIZED,
-                escaped_schema_name=escaped_schema_name,
-                index_rel_name=index_rel_name(index_id),
-                escaped_target_columns=escaped_schema_target_columns,
-                index_id=index_id
-            )
+    # deliberately not in a transaction, so that the indexes are built CONCURRENTLY
+    # and writes to the tables are not blocked while the index is built
+    if backend in (
+        StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value,
+        StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+    ):
+        handle_create_user_defined_index_on_materialized_or_flat_table(
+            unescaped_table_name=materialized_table_name(data_series_id, data_series_external_id),
+            target_table_type=TargetTableType.MATERIALIZED,
+            escaped_schema_name=escaped_schema_name,
+            index_rel_name=index_rel_name(index_id),
+            escaped_target_columns=escaped_schema_target_columns,
+            index_id=index_id
+        )
 
-        if backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
-            handle_create_user_defined_index_on_materialized_or_flat_table(
-                unescaped_table_name=materialized_flat_history_table_name(data_series_id, data_series_external_id),
-                target_table_type=TargetTableType.FLAT_HISTORY,
-                escaped_schema_name=escaped_schema_name,
-                index_rel_name=index_rel_name_flat_history(index_id),
-                escaped_target_columns=escaped_schema_target_columns,
-                index_id=index_id
-            )
+    if backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
+        handle_create_user_defined_index_on_materialized_or_flat_table(
+            unescaped_table_name=materialized_flat_history_table_name(data_series_id, data_series_external_id),
+            target_table_type=TargetTableType.FLAT_HISTORY,
+            escaped_schema_name=escaped_schema_name,
+            index_rel_name=index_rel_name_flat_history(index_id),
+            escaped_target_columns=escaped_schema_target_columns,
+            index_id=index_id
+        )
@@ -9,7 +9,7 @@ from skipper.dataseries.models.task_data import MetaModelTaskData
 from .no_history_to_flat_history import spawn_migrate_no_history_to_flat_history
 from .flat_history_to_no_history import spawn_migrate_flat_history_to_no_history
 
-def register(registry: Dict[str, Callable[[MetaModelTaskData], None]]) -> None:
+def register(registry: Dict[str, Callable[[MetaModelTaskData], bool]]) -> None:
     from skipper.dataseries.storage.dynamic_sql.tasks.migrate import no_history_to_flat_history
     from skipper.dataseries.storage.dynamic_sql.tasks.migrate import flat_history_to_no_history
     
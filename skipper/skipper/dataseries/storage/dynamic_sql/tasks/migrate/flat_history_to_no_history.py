@@ -6,15 +6,21 @@
 
 
 import datetime
+import uuid
 from django.db import transaction
 from django_multitenant.utils import set_current_tenant  # type: ignore
-from typing import Dict, Callable
+from typing import Any, Dict, Callable, List, Optional, Union
 
 from skipper.core.celery import task
 from skipper.core.models.tenant import Tenant
 from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.models.metamodel.file_fact import DataSeries_FileFact
+from skipper.dataseries.models.metamodel.image_fact import DataSeries_ImageFact
+from skipper.dataseries.storage.contract import file_registry
 from skipper.dataseries.storage.dynamic_sql.tasks.common import get_or_fail
-from skipper.dataseries.storage.dynamic_sql.tasks.prune import prune_history
+from skipper.dataseries.storage.contract.file_registry import HistoryDataPointIdentifier
+from skipper.dataseries.storage.dynamic_sql.tasks.prune import prune_history, generate_prune_query_flat_history, \
+    PRUNE_FILE_LOOKUP_BATCH_SIZE
 from skipper.dataseries.storage.static_ds_information import data_point_serialization_keys, \
     compute_data_series_query_info
 from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
@@ -23,10 +29,23 @@ from skipper.core.lint import sql_cursor
 from skipper.dataseries.models.metamodel.index import TargetTableType
 from skipper.dataseries.raw_sql.tenant import escaped_tenant_schema
 from skipper.dataseries.raw_sql import escape
-from skipper.dataseries.storage.dynamic_sql.materialized import materialized_flat_history_table_name
+from skipper.dataseries.storage.dynamic_sql.materialized import materialized_table_name, materialized_flat_history_table_name
+from skipper.dataseries.storage.dynamic_sql.tasks.migrate import online
 from skipper.dataseries.models.task_data import MetaModelTaskData
 
-def register(registry: Dict[str, Callable[[MetaModelTaskData], None]]) -> None:
+# prunes all versions but the current ones
+_PRUNE_ALL_OLDER_THAN = datetime.datetime(
+    year=4000,
+    month=1,
+    day=1,
+    hour=1,
+    minute=1,
+    second=1,
+    microsecond=1
+).isoformat()
+
+
+def register(registry: Dict[str, Callable[[MetaModelTaskData], bool]]) -> None:
     registry['_3_dynamic_sql_migrate_flat_history_to_no_history'] = _run_migrate_flat_history_to_no_history
 
 
@@ -42,12 +61,105 @@ def spawn_migrate_flat_history_to_no_history(
 
 def _run_migrate_flat_history_to_no_history(
     meta_model_task_data: MetaModelTaskData
-) -> None:
+) -> bool:
     _data_series: DataSeries = meta_model_task_data.data_series
-    _migrate_flat_history_to_no_history(
-        data_series_id = str(_data_series.id),
-        tenant_id=str(_data_series.tenant.id)
+    data_series_id = str(_data_series.id)
+    tenant_id = str(_data_series.tenant.id)
+    if not online.is_online(meta_model_task_data):
+        _migrate_flat_history_to_no_history(
+            data_series_id = data_series_id,
+            tenant_id=tenant_id
+        )
+        return True
+    return online.run_step(
+        meta_model_task_data,
+        # the data series already has the no history backend, so nothing is written
+        # to the flat history anymore and the materialized table is complete
+        prepare=lambda: online.unlock_data_series(data_series_id),
+        copy_chunk=lambda last_id, chunk_size: _prune_chunk(
+            data_series_id=data_series_id,
+            tenant_id=tenant_id,
+            last_id=last_id,
+            chunk_size=chunk_size
+        ),
+        switch=lambda: _switch_to_no_history(data_series_id=data_series_id, tenant_id=tenant_id)
+    )
+
+
+def _drop_flat_history(
+        data_series: DataSeries,
+        tenant: Tenant
+) -> None:
+    for index in data_series.dataseries_userdefinedindex_set.all():
+        handle_drop_user_defined_index_by_target_table_type(
+            index_id=index.user_defined_index.id,
+            target_table_type=TargetTableType.FLAT_HISTORY,
+            escaped_schema_name=escaped_tenant_schema(tenant.name)
+        )
+
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        schema_name = escaped_tenant_schema(tenant.name)
+        table_name = escape.escape(materialized_flat_history_table_name(str(data_series.id), data_series.external_id))
+        cursor.execute(f'DROP TABLE IF EXISTS {schema_name}.{table_name}')
+
+
+def _file_like_fact_ids(data_series_id: str) -> List[Union[str, uuid.UUID]]:
+    return [
+        *DataSeries_ImageFact.all_objects.filter(data_series_id=uuid.UUID(data_series_id)).values_list('fact_id', flat=True),
+        *DataSeries_FileFact.all_objects.filter(data_series_id=uuid.UUID(data_series_id)).values_list('fact_id', flat=True)
+    ]
+
+
+def _prune_flat_history(
+        cursor: Any,
+        data_series: DataSeries,
+        tenant: Tenant,
+        file_like_fact_ids: List[Union[str, uuid.UUID]],
+        after_id: str,
+        up_to_id: Optional[str]
+) -> None:
+    """
+    prunes all versions but the current ones of the data points with after_id < id <= up_to_id
+    from the flat history. The flat history is dropped at the end of the migration,
+    so the files of the pruned versions have to be released here.
+    """
+    schema_name = escaped_tenant_schema(tenant.name)
+    should_return = len(file_like_fact_ids) > 0
+    cursor.execute(
+        generate_prune_query_flat_history(
+            schema_name=schema_name,
+            escaped_table_name=escape.escape(materialized_table_name(str(data_series.id), data_series.external_id)),
+            flat_history_table_name=escape.escape(
+                materialized_flat_history_table_name(str(data_series.id), data_series.external_id)
+            ),
+            columns_to_return=['id', 'point_in_time', 'sub_clock'],
+            should_return=should_return,
+            id_range=True
+        ),
+        {
+            'older_than': _PRUNE_ALL_OLDER_THAN,
+            'after_id': after_id,
+            'up_to_id': up_to_id
+        }
     )
+    if should_return:
+        while True:
+            batch = cursor.fetchmany(PRUNE_FILE_LOOKUP_BATCH_SIZE)
+            if len(batch) == 0:
+                break
+            # the files themselves are deleted by the file registry cleanup
+            file_registry.delete_all_matching_bulk(
+                tenant_id=tenant.id,
+                data_series_id=data_series.id,
+                fact_ids=file_like_fact_ids,
+                history_data_point_identifiers=[
+                    HistoryDataPointIdentifier(
+                        data_point_id=data_point_id,
+                        point_in_time=point_in_time,
+                        sub_clock=sub_clock
+                    ) for data_point_id, point_in_time, sub_clock in batch
+                ]
+            )
 
 
 def _migrate_flat_history_to_no_history(
@@ -65,29 +177,100 @@ def _migrate_flat_history_to_no_history(
         _data_point_serialization_keys = data_point_serialization_keys(data_series_query_info)
         
         prune_history(tenant_id=str(tenant.id), data_series_id=data_series_id,
-                      older_than=datetime.datetime(
-                          year=4000,
-                          month=1,
-                          day=1,
-                          hour=1,
-                          minute=1,
-                          second=1,
-                          microsecond=1
-                      ).isoformat())
-
-
-    for index in data_series.dataseries_userdefinedindex_set.all():
-        handle_drop_user_defined_index_by_target_table_type(
-            index_id=index.user_defined_index.id,
-            target_table_type=TargetTableType.FLAT_HISTORY,
-            escaped_schema_name=escaped_tenant_schema(tenant.name)
-        )
+                      older_than=_PRUNE_ALL_OLDER_THAN)
+        # prune_history only prunes the flat history of data series that still have the flat history backend
+        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            _prune_flat_history(
+                cursor=cursor,
+                data_series=data_series,
+                tenant=tenant,
+                file_like_fact_ids=_file_like_fact_ids(data_series_id),
+                after_id='',
+                up_to_id=None
+            )
 
-    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
-        schema_name = escaped_tenant_schema(tenant.name)
-        table_name = escape.escape(materialized_flat_history_table_name(data_series_id, data_series.external_id))
-        cursor.execute(f'DROP TABLE IF EXISTS {schema_name}.{table_name}')
+    _drop_flat_history(data_series=data_series, tenant=tenant)
 
     with transaction.atomic():
         data_series.locked = False
         data_series.save()
+
+
+def _prune_chunk(
+        data_series_id: str,
+        tenant_id: str,
+        last_id: str,
+        chunk_size: int
+) -> List[str]:
+    """
+    the chunked equivalent of the prune_history in the offline migration. Data points deleted
+    after their chunk was handled are pruned by the next regular prune of the data series.
+    """
+    tenant = get_or_fail(Tenant.objects.filter(id=tenant_id))
+    set_current_tenant(tenant)
+
+    data_series: DataSeries = DataSeries.objects.get(id=data_series_id)
+
+    schema_name = escaped_tenant_schema(tenant.name)
+    table_name = escape.escape(materialized_table_name(data_series_id, data_series.external_id))
+    file_like_fact_ids = _file_like_fact_ids(data_series_id)
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        cursor.execute(
+            f"""
+            SELECT id FROM {schema_name}.{table_name}
+            WHERE id > %(last_id)s
+            ORDER BY id
+            LIMIT %(chunk_size)s
+            """,
+            {
+                'last_id': last_id,
+                'chunk_size': chunk_size
+            }
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+        deleted_ids: List[str] = []
+        if len(ids) > 0:
+            cursor.execute(
+                f"""
+                DELETE FROM {schema_name}.{table_name}
+                WHERE id = ANY(%(ids)s)
+                AND deleted_at IS NOT NULL
+                RETURNING id
+                """,
+                {
+                    'ids': ids
+                }
+            )
+            deleted_ids = [row[0] for row in cursor.fetchall()]
+
+        # the last chunk has no upper bound, so that the history of data points
+        # that are not in the materialized table anymore is pruned as well
+        _prune_flat_history(
+            cursor=cursor,
+            data_series=data_series,
+            tenant=tenant,
+            file_like_fact_ids=file_like_fact_ids,
+            after_id=last_id,
+            up_to_id=ids[-1] if len(ids) == chunk_size else None
+        )
+
+    # the files themselves are deleted by the file registry cleanup
+    file_registry.delete_all_for_datapoints(
+        tenant_id=tenant_id,
+        data_series_id=data_series_id,
+        fact_ids=file_like_fact_ids,
+        data_point_ids=deleted_ids
+    )
+    return ids
+
+
+def _switch_to_no_history(
+        data_series_id: str,
+        tenant_id: str
+) -> None:
+    tenant = get_or_fail(Tenant.objects.filter(id=tenant_id))
+    set_current_tenant(tenant)
+
+    data_series: DataSeries = DataSeries.objects.select_for_update().get(id=data_series_id)
+    _drop_flat_history(data_series=data_series, tenant=tenant)
@@ -8,7 +8,7 @@
 import uuid
 from django.db import transaction
 from django_multitenant.utils import set_current_tenant  # type: ignore
-from typing import List, Tuple, Dict, Union, Callable, Dict
+from typing import Any, List, Tuple, Dict, Union, Callable
 
 from skipper.core.celery import task
 from skipper.core.models.tenant import Tenant
@@ -17,7 +17,7 @@ from skipper.dataseries.storage.contract import FactType
 from skipper.dataseries.storage.dynamic_sql.tasks.common import get_or_fail
 from skipper.dataseries.storage.dynamic_sql.tasks.ddl.fact import handle_create_fact_materialized_flat_history
 from skipper.dataseries.storage.static_ds_information import data_point_serialization_keys, \
-    compute_data_series_query_info
+    compute_data_series_query_info, DataPointSerializationKeys
 from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
 from skipper.dataseries.storage.dynamic_sql.tasks.ddl.data_series import handle_create_data_series_materialized_flat_history
 from skipper.dataseries.storage.dynamic_sql.tasks.ddl.dimension import handle_create_dimension_materialized_flat_history
@@ -26,11 +26,16 @@ from skipper.core.lint import sql_cursor
 from skipper.dataseries.storage.dynamic_sql.queries.modification_materialized.history import insert_to_flat_history_query
 from skipper.dataseries.raw_sql import escape
 from skipper.dataseries.raw_sql.tenant import escaped_tenant_schema
-from skipper.dataseries.storage.dynamic_sql.materialized import materialized_table_name
+from skipper.dataseries.storage.dynamic_sql.materialized import materialized_table_name, materialized_flat_history_table_name
+from skipper.dataseries.storage.dynamic_sql.tasks.migrate import online
 from skipper.dataseries.models.task_data import MetaModelTaskData
 
-def register(registry: Dict[str, Callable[[MetaModelTaskData], None]]) -> None:
-    registry['_3_dynamic_sql_migrate_no_history_to_flat_history'] = _run_migrate_no_history_to_flat_history
+MIGRATION_RECORD_SOURCE = 'migration - no history to flat history'
+MIGRATION_TASK_NAME = '_3_dynamic_sql_migrate_no_history_to_flat_history'
+
+
+def register(registry: Dict[str, Callable[[MetaModelTaskData], bool]]) -> None:
+    registry[MIGRATION_TASK_NAME] = _run_migrate_no_history_to_flat_history
 
 
 def spawn_migrate_no_history_to_flat_history(
@@ -39,20 +44,114 @@ def spawn_migrate_no_history_to_flat_history(
     from skipper.dataseries.storage.dynamic_sql.tasks.migrate import spawn
     spawn.spawn_migrate_task(
         data_series=data_series,
-        task_name='_3_dynamic_sql_migrate_no_history_to_flat_history'
+        task_name=MIGRATION_TASK_NAME
     )
 
 
 def _run_migrate_no_history_to_flat_history(
     meta_model_task_data: MetaModelTaskData
-) -> None:
+) -> bool:
     _data_series: DataSeries = meta_model_task_data.data_series
-    _migrate_no_history_to_flat_history(
-        data_series_id = str(_data_series.id),
-        tenant_id=str(_data_series.tenant.id)
+    data_series_id = str(_data_series.id)
+    tenant_id = str(_data_series.tenant.id)
+    if not online.is_online(meta_model_task_data):
+        _migrate_no_history_to_flat_history(
+            data_series_id = data_series_id,
+            tenant_id=tenant_id
+        )
+        return True
+    return online.run_step(
+        meta_model_task_data,
+        prepare=lambda: _prepare_online_migration(data_series_id=data_series_id, tenant_id=tenant_id),
+        copy_chunk=lambda last_id, chunk_size: _copy_chunk_to_flat_history(
+            data_series_id=data_series_id,
+            tenant_id=tenant_id,
+            last_id=last_id,
+            chunk_size=chunk_size
+        ),
+        backfill_chunk=lambda last_id, chunk_size: _backfill_validity_chunk(
+            data_series_id=data_series_id,
+            tenant_id=tenant_id,
+            last_id=last_id,
+            chunk_size=chunk_size
+        ),
+        switch=lambda: _switch_to_flat_history(data_series_id=data_series_id, tenant_id=tenant_id)
     )
 
 
+def _create_flat_history_structure(
+        data_series: DataSeries,
+        tenant: Tenant
+) -> None:
+    data_series_id = str(data_series.id)
+    data_series_query_info = compute_data_series_query_info(data_series)
+    _data_point_serialization_keys = data_point_serialization_keys(data_series_query_info)
+
+    # simulate creation
+    handle_create_data_series_materialized_flat_history(
+        data_series_id=data_series_id,
+        data_series_external_id=data_series.external_id, 
+        tenant_name=tenant.name, 
+        tenant=tenant
+    )
+
+    def handle_facts(fact_relations: List[Tuple[str, str]], fact_type: FactType) -> None:
+        for external_id, uuid in fact_relations:
+            handle_create_fact_materialized_flat_history(
+                data_series_id=data_series_id,
+                data_series_external_id=data_series.external_id,
+                fact_id=uuid,
+                fact_type=fact_type,
+                tenant_name=tenant.name,
+                external_id=external_id
+            )
+
+    handle_facts(_data_point_serialization_keys['float_facts'], FactType.Float)
+    handle_facts(_data_point_serialization_keys['boolean_facts'], FactType.Boolean)
+    handle_facts(_data_point_serialization_keys['image_facts'], FactType.Image)
+    handle_facts(_data_point_serialization_keys['file_facts'], FactType.File)
+    handle_facts(_data_point_serialization_keys['json_facts'], FactType.JSON)
+    handle_facts(_data_point_serialization_keys['string_facts'], FactType.String)
+    handle_facts(_data_point_serialization_keys['text_facts'], FactType.Text)
+    handle_facts(_data_point_serialization_keys['timestamp_facts'], FactType.Timestamp)
+
+    def handle_dimensions(dim_relations: List[Tuple[str, str]]) -> None:
+        for external_id, uuid in dim_relations:
+            handle_create_dimension_materialized_flat_history(
+                data_series_id=data_series_id,
+                data_series_external_id=data_series.external_id,
+                dimension_id=uuid,
+                tenant_name=tenant.name,
+                external_id=external_id
+            )
+
+    handle_dimensions(_data_point_serialization_keys['dimensions'])
+
+
+def _recreate_user_defined_indexes(
+        data_series: DataSeries,
+        tenant: Tenant
+) -> None:
+    for index in data_series.dataseries_userdefinedindex_set.all():
+        targets: List[Dict[str, Union[str, uuid.UUID]]] = []
+        for target in index.user_defined_index.userdefinedindex_target_set\
+            .order_by('target_position_in_index_order').all():
+            targets.append({
+                "target_type": target.target_type,
+                "target_id": target.target_id
+            })
+        
+        # simply re-run the index creation.
+        handle_create_user_defined_index(
+            data_series_id=str(data_series.id),
+            data_series_external_id=data_series.external_id,
+            tenant_name=tenant.name,
+            targets=targets,
+            backend=data_series.backend,
+            index_id=index.user_defined_index.id
+        )
+
+
 def _migrate_no_history_to_flat_history(
         data_series_id: str,
         tenant_id: str
@@ -65,47 +164,8 @@ def _migrate_no_history_to_flat_history(
         data_series: DataSeries = DataSeries.objects.select_for_update().get(id=data_series_id)
 
         data_series_query_info = compute_data_series_query_info(data_series)
-        _data_point_serialization_keys = data_point_serialization_keys(data_series_query_info)
-
-        # simulate creation
-        handle_create_data_series_materialized_flat_history(
-            data_series_id=data_series_id,
-            data_series_external_id=data_series.external_id, 
-            tenant_name=tenant.name, 
-            tenant=tenant
-        )
-
-        def handle_facts(fact_relations: List[Tuple[str, str]], fact_type: FactType) -> None:
-            for external_id, uuid in fact_relations:
-                handle_create_fact_materialized_flat_history(
-                    data_series_id=data_series_id,
-                    data_series_external_id=data_series.external_id,
-                    fact_id=uuid,
-                    fact_type=fact_type,
-                    tenant_name=tenant.name,
-                    external_id=external_id
-                )
 
-        handle_facts(_data_point_serialization_keys['float_facts'], FactType.Float)
-        handle_facts(_data_point_serialization_keys['boolean_facts'], FactType.Boolean)
-        handle_facts(_data_point_serialization_keys['image_facts'], FactType.Image)
-        handle_facts(_data_point_serialization_keys['file_facts'], FactType.File)
-        handle_facts(_data_point_serialization_keys['json_facts'], FactType.JSON)
-        handle_facts(_data_point_serialization_keys['string_facts'], FactType.String)
-        handle_facts(_data_point_serialization_keys['text_facts'], FactType.Text)
-        handle_facts(_data_point_serialization_keys['timestamp_facts'], FactType.Timestamp)
-
-        def handle_dimensions(dim_relations: List[Tuple[str, str]]) -> None:
-            for external_id, uuid in dim_relations:
-                handle_create_dimension_materialized_flat_history(
-                    data_series_id=data_series_id,
-                    data_series_external_id=data_series.external_id,
-                    dimension_id=uuid,
-                    tenant_name=tenant.name,
-                    external_id=external_id
-                )
-
-        handle_dimensions(_data_point_serialization_keys['dimensions'])
+        _create_flat_history_structure(data_series=data_series, tenant=tenant)
 
         with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
             schema_name = escaped_tenant_schema(tenant.name)
@@ -114,7 +174,7 @@ def _migrate_no_history_to_flat_history(
                 data_series_id=data_series_id,
                 data_series_external_id=data_series.external_id,
                 user_id=None,
-                record_source='migration - no history to flat history',
+                record_source=MIGRATION_RECORD_SOURCE,
                 cursor=cursor,
                 source_query=f'SELECT * FROM {schema_name}.{non_historical_table_name}',
                 escaped_schema_name=schema_name,
@@ -124,25 +184,228 @@ def _migrate_no_history_to_flat_history(
                 insert_sql
             )
 
-        for index in data_series.dataseries_userdefinedindex_set.all():
-            targets: List[Dict[str, Union[str, uuid.UUID]]] = []
-            for target in index.user_defined_index.userdefinedindex_target_set\
-                .order_by('target_position_in_index_order').all():
-                targets.append({
-                    "target_type": target.target_type,
-                    "target_id": target.target_id
-                })
-            
-            # simply re-run the index creation.
-            handle_create_user_defined_index(
-                data_series_id=data_series_id,
-                data_series_external_id=data_series.external_id,
-                tenant_name=tenant.name,
-                targets=targets,
-                backend=data_series.backend,
-                index_id=index.user_defined_index.id
-            )
+        _recreate_user_defined_indexes(data_series=data_series, tenant=tenant)
 
     with transaction.atomic():
         data_series.locked = False
         data_series.save()
+
+
+def _prepare_online_migration(
+        data_series_id: str,
+        tenant_id: str
+) -> None:
+    tenant = get_or_fail(Tenant.objects.filter(id=tenant_id))
+    set_current_tenant(tenant)
+
+    data_series: DataSeries = DataSeries.objects.select_for_update().get(id=data_series_id)
+    _create_flat_history_structure(data_series=data_series, tenant=tenant)
+    # the data series already has the flat history backend, so writes from now on
+    # go to the materialized table and the flat history alike
+    data_series.locked = False
+    # writes see this together with the unlock, so none of them misses the copy_on_write
+    data_series.backend_migration_in_progress = True
+    data_series.save()
+
+
+def _copy_current_versions_to_flat_history(
+        cursor: Any,
+        data_series_id: str,
+        data_series_external_id: str,
+        tenant_name: str,
+        data_point_serialization_keys: DataPointSerializationKeys,
+        ids: List[str]
+) -> None:
+    """
+    copies the current version of the given (locked) data points from the materialized table
+    to the flat history, unless a data point already has a version in the flat history
+    """
+    schema_name = escaped_tenant_schema(tenant_name)
+    non_historical_table_name = escape.escape(materialized_table_name(data_series_id, data_series_external_id))
+    flat_history_table_name = escape.escape(materialized_flat_history_table_name(data_series_id, data_series_external_id))
+    insert_sql = insert_to_flat_history_query(
+        data_series_id=data_series_id,
+        data_series_external_id=data_series_external_id,
+        user_id=None,
+        record_source=MIGRATION_RECORD_SOURCE,
+        cursor=cursor,
+        source_query=f"""
+        SELECT * FROM {schema_name}.{non_historical_table_name} tbl
+        WHERE tbl.id = ANY(%(ids)s)
+        AND NOT EXISTS (
+            SELECT 1 FROM {schema_name}.{flat_history_table_name} tbl2
+            WHERE tbl2.id = tbl.id
+        )
+        """,
+        escaped_schema_name=schema_name,
+        data_point_serialization_keys=data_point_serialization_keys
+    )
+    cursor.execute(insert_sql, {'ids': ids})
+
+
+def copy_on_write(
+        cursor: Any,
+        data_series_id: str,
+        data_series_external_id: str,
+        tenant_name: str,
+        data_point_serialization_keys: DataPointSerializationKeys,
+        data_point_ids: List[str]
+) -> None:
+    """
+    has to be called by every write to a data series with backend_migration_in_progress set
+    before the materialized table is changed.
+
+    While an online migration is running, the data points that are not copied yet only have their version
+    from before the migration in the materialized table. A write would overwrite it, so it is copied to the
+    flat history first.
+    """
+    if len(data_point_ids) == 0:
+        return
+
+    schema_name = escaped_tenant_schema(tenant_name)
+    non_historical_table_name = escape.escape(materialized_table_name(data_series_id, data_series_external_id))
+    # same lock (and lock order) as the copy of a chunk, so only one of them copies a data point
+    cursor.execute(
+        f"""
+        SELECT id FROM {schema_name}.{non_historical_table_name}
+        WHERE id = ANY(%(ids)s)
+        ORDER BY id
+        FOR UPDATE
+        """,
+        {
+            'ids': data_point_ids
+        }
+    )
+    _copy_current_versions_to_flat_history(
+        cursor=cursor,
+        data_series_id=data_series_id,
+        data_series_external_id=data_series_external_id,
+        tenant_name=tenant_name,
+        data_point_serialization_keys=data_point_serialization_keys,
+        ids=data_point_ids
+    )
+
+
+def _copy_chunk_to_flat_history(
+        data_series_id: str,
+        tenant_id: str,
+        last_id: str,
+        chunk_size: int
+) -> List[str]:
+    tenant = get_or_fail(Tenant.objects.filter(id=tenant_id))
+    set_current_tenant(tenant)
+
+    data_series: DataSeries = DataSeries.objects.get(id=data_series_id)
+    data_series_query_info = compute_data_series_query_info(data_series)
+
+    schema_name = escaped_tenant_schema(tenant.name)
+    non_historical_table_name = escape.escape(materialized_table_name(data_series_id, data_series.external_id))
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        # writes to the data points of the chunk wait until it is copied. Data points that were written
+        # since the migration started were already copied by the write (see copy_on_write)
+        cursor.execute(
+            f"""
+            SELECT id FROM {schema_name}.{non_historical_table_name}
+            WHERE id > %(last_id)s
+            ORDER BY id
+            LIMIT %(chunk_size)s
+            FOR UPDATE
+            """,
+            {
+                'last_id': last_id,
+                'chunk_size': chunk_size
+            }
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if len(ids) == 0:
+            return ids
+
+        _copy_current_versions_to_flat_history(
+            cursor=cursor,
+            data_series_id=data_series_id,
+            data_series_external_id=data_series.external_id,
+            tenant_name=tenant.name,
+            data_point_serialization_keys=data_point_serialization_keys(data_series_query_info),
+            ids=ids
+        )
+    return ids
+
+
+def _backfill_validity_chunk(
+        data_series_id: str,
+        tenant_id: str,
+        last_id: str,
+        chunk_size: int
+) -> List[str]:
+    """
+    a write that had to wait for the copy of its chunk does not see the version copied for it
+    and therefore can not close the validity of that version. Once every chunk is copied,
+    this closes them for the next chunk of data points.
+    """
+    tenant = get_or_fail(Tenant.objects.filter(id=tenant_id))
+    set_current_tenant(tenant)
+
+    data_series: DataSeries = DataSeries.objects.get(id=data_series_id)
+
+    schema_name = escaped_tenant_schema(tenant.name)
+    non_historical_table_name = escape.escape(materialized_table_name(data_series_id, data_series.external_id))
+    flat_history_table_name = escape.escape(materialized_flat_history_table_name(data_series_id, data_series.external_id))
+    with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        # same lock as the copy, so writes to the chunk that are still running finish first
+        cursor.execute(
+            f"""
+            SELECT id FROM {schema_name}.{non_historical_table_name}
+            WHERE id > %(last_id)s
+            ORDER BY id
+            LIMIT %(chunk_size)s
+            FOR UPDATE
+            """,
+            {
+                'last_id': last_id,
+                'chunk_size': chunk_size
+            }
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if len(ids) > 0:
+            cursor.execute(
+                f"""
+                UPDATE {schema_name}.{flat_history_table_name} tbl
+                SET valid_to = (
+                    SELECT tbl2.point_in_time FROM {schema_name}.{flat_history_table_name} tbl2
+                    WHERE tbl2.id = tbl.id
+                    AND (tbl2.point_in_time, tbl2.sub_clock) > (tbl.point_in_time, tbl.sub_clock)
+                    ORDER BY tbl2.point_in_time, tbl2.sub_clock
+                    LIMIT 1
+                )
+                WHERE tbl.id = ANY(%(ids)s)
+                AND tbl.record_source = %(record_source)s
+                AND tbl.valid_to IS NULL
+                AND EXISTS (
+                    SELECT 1 FROM {schema_name}.{flat_history_table_name} tbl2
+                    WHERE tbl2.id = tbl.id
+                    AND (tbl2.point_in_time, tbl2.sub_clock) > (tbl.point_in_time, tbl.sub_clock)
+                )
+                """,
+                {
+                    'ids': ids,
+                    'record_source': MIGRATION_RECORD_SOURCE
+                }
+            )
+
+    if len(ids) < chunk_size:
+        # the flat history is complete, the indexes are built concurrently in their own tasks
+        _recreate_user_defined_indexes(data_series=data_series, tenant=tenant)
+    return ids
+
+
+def _switch_to_flat_history(
+        data_series_id: str,
+        tenant_id: str
+) -> None:
+    tenant = get_or_fail(Tenant.objects.filter(id=tenant_id))
+    set_current_tenant(tenant)
+
+    data_series: DataSeries = DataSeries.objects.select_for_update().get(id=data_series_id)
+    # every data point has a version in the flat history now, writes do not have to copy anymore
+    data_series.backend_migration_in_progress = False
+    data_series.save()
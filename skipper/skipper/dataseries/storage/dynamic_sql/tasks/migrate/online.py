@@ -0,0 +1,98 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+
+"""
+Online backend migrations do not keep the data series locked while the data is moved. They run as a
+sequence of steps of the meta model task, each in its own transaction, and checkpoint their progress in
+the data of the MetaModelTaskData:
+
+- prepare: create the target structure and unlock the data series. From here on writes go to the new backend,
+  so every change made during the migration is written in the target format as well.
+- copy: handle the data points in chunks ordered by id, the id of the last handled data point is the checkpoint.
+- backfill (optional): a second pass over the data points in chunks, for work that needs the copy to be complete.
+- switch: finish the migration while holding the lock on the data series. Only metadata changes belong here,
+  everything that has to touch the data itself is done in chunks in one of the previous phases.
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+from skipper import settings
+from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.models.task_data import MetaModelTaskData
+
+PHASE_PREPARE = 'prepare'
+PHASE_COPY = 'copy'
+PHASE_BACKFILL = 'backfill'
+PHASE_SWITCH = 'switch'
+
+
+def initial_task_data() -> Dict[str, Any]:
+    if not settings.SKIPPER_DATA_SERIES_ONLINE_BACKEND_MIGRATION:
+        return {}
+    return {
+        'online': True,
+        'phase': PHASE_PREPARE,
+        # all ids are non empty, so this sorts before the first one
+        'last_id': ''
+    }
+
+
+def is_online(meta_model_task_data: MetaModelTaskData) -> bool:
+    return bool(meta_model_task_data.data.get('online', False))
+
+
+def unlock_data_series(data_series_id: str) -> None:
+    data_series: DataSeries = DataSeries.objects.select_for_update().get(id=data_series_id)
+    data_series.locked = False
+    data_series.save()
+
+
+def run_step(
+    meta_model_task_data: MetaModelTaskData,
+    prepare: Callable[[], None],
+    copy_chunk: Callable[[str, int], List[str]],
+    switch: Callable[[], None],
+    backfill_chunk: Optional[Callable[[str, int], List[str]]] = None
+) -> bool:
+    """
+    runs the next step of an online migration and records the progress in meta_model_task_data.data
+
+    :param copy_chunk: handles the next chunk of at most chunk_size data points with an id greater
+    than last_id and returns the ids of the data points it handled in order
+    :param backfill_chunk: same as copy_chunk, run once all chunks are copied
+    :return: whether the migration is done
+    """
+    data = meta_model_task_data.data
+    phase = data['phase']
+    if phase == PHASE_PREPARE:
+        prepare()
+        data['phase'] = PHASE_COPY
+    elif phase == PHASE_COPY:
+        if _run_chunk(data, copy_chunk):
+            data['phase'] = PHASE_SWITCH if backfill_chunk is None else PHASE_BACKFILL
+            data['last_id'] = ''
+    elif phase == PHASE_BACKFILL:
+        assert backfill_chunk is not None
+        if _run_chunk(data, backfill_chunk):
+            data['phase'] = PHASE_SWITCH
+    elif phase == PHASE_SWITCH:
+        switch()
+        return True
+    else:
+        raise AssertionError(f'unknown phase {phase} of online migration')
+    return False
+
+
+def _run_chunk(data: Dict[str, Any], chunk: Callable[[str, int], List[str]]) -> bool:
+    """
+    :return: whether this was the last chunk
+    """
+    chunk_size = settings.SKIPPER_DATA_SERIES_BACKEND_MIGRATION_CHUNK_SIZE
+    handled_ids = chunk(data['last_id'], chunk_size)
+    if len(handled_ids) < chunk_size:
+        return True
+    data['last_id'] = handled_ids[-1]
+    return False
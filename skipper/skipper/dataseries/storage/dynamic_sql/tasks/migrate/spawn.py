@@ -10,6 +10,7 @@ from typing import Union
 from skipper.dataseries.models.metamodel.data_series import DataSeries
 from skipper.dataseries.models.task_data import MetaModelTaskData
 from skipper.dataseries.tasks.metamodel import spawn_meta_model_task
+from skipper.dataseries.storage.dynamic_sql.tasks.migrate import online
 from skipper.dataseries.raw_sql import dbtime
 from skipper.core.middleware import get_current_request
 from django.http import HttpRequest
@@ -29,7 +30,7 @@ def spawn_migrate_task(
         task=task_name,
         data_series = data_series,
         point_in_time=dbtime.now(),
-        data={},
+        data=online.initial_task_data(),
         user=_user if _user is not None else None,
         record_source='REST API' if _current_request is not None else None
     )
@@ -15,12 +15,14 @@ from celery.exceptions import Ignore # type: ignore
 from django.db import transaction
 from django_multitenant.utils import set_current_tenant, get_current_tenant  # type: ignore
 
-from skipper import settings
+from skipper import metrics, settings
 from skipper.core.celery import task, acquire_semaphore, release_semaphore
 from skipper.core.models.tenant import Tenant
 from skipper.dataseries.models import BulkInsertTaskData
-from skipper.dataseries.models.event import data_point_event, ConsumerEventType
+from skipper.dataseries.models.metamodel.data_series import DataSeries, ExtraConfigParameters
+from skipper.dataseries.models.event import data_point_event, ConsumerEventType, consumer_ids_for_data_series
 from skipper.dataseries.storage.contract import StorageBackendType
+from skipper.dataseries.storage.dynamic_sql.bulk_task_data import decode_validated_datas
 from skipper.dataseries.storage.dynamic_sql.models.datapoint import DataPoint
 from skipper.dataseries.storage.dynamic_sql.queries.modification_materialized.insert import insert_or_update_data_points
 from skipper.dataseries.storage.dynamic_sql.tasks.common import get_or_fail
@@ -66,14 +68,20 @@ def create_data_points(
         user_id: str,
         record_source: str,
         partial: bool,
-        sub_clock: int
+        sub_clock: int,
+        consumer_ids: Optional[List[str]] = None,
+        skip_unchanged: bool = False,
+        backend_migration_in_progress: bool = False
 ) -> List[Any]:
     """
     :param data_series_id:
     :param validated_datas:
     :param serialization_keys:
     :param point_in_time: defaults to now
-    :return:
+    :param consumer_ids: the consumers to create events for, resolved from the database if not passed
+    :param skip_unchanged: do not write data points whose payload did not change, see insert_or_update_data_points
+    :param backend_migration_in_progress: see DataSeries.backend_migration_in_progress
+    :return: the data points that were written
     """
 
     def _create_bare_data_points(validated_datas: Iterable[Any]) -> Tuple[
@@ -105,7 +113,7 @@ def create_data_points(
 
     if data_series_backend == StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value\
             or data_series_backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
-        insert_or_update_data_points(
+        unchanged_ids = insert_or_update_data_points(
             tenant_id=tenant_id,
             tenant_name=tenant_name,
             data_series_id=str(data_series_id),
@@ -117,8 +125,15 @@ def create_data_points(
             sub_clock=sub_clock,
             backend=data_series_backend,
             record_source=record_source,
-            user_id=user_id
+            user_id=user_id,
+            skip_unchanged=skip_unchanged,
+            backend_migration_in_progress=backend_migration_in_progress
         )
+        if len(unchanged_ids) > 0:
+            data_points = [dp for dp in data_points if dp.id not in unchanged_ids]
+            if len(data_points) == 0:
+                # nothing changed, so there is nothing to notify consumers about
+                return data_points
     data_point_event(
         tenant=get_current_tenant(),
         data_series_id=data_series_id,
@@ -134,7 +149,8 @@ def create_data_points(
             } for dp in data_points]
         },
         event_type=ConsumerEventType.DATA_POINT_CHANGED,
-        sub_clock=sub_clock
+        sub_clock=sub_clock,
+        consumer_ids=consumer_ids
     )
     # FIXME: returning WritableDataPoint is fine here since all of our
     # code does not really care about the class anyways, it's not nice, though
@@ -199,6 +215,8 @@ def async_persist_data_point_chunk(
             logger.info(f'task data for task with id {task_data_reference_id} not found, either claimed by someone else or task does not exist (anymore)')
 
         if task_data is not None:
+            metrics.BULK_INSERT_TASK_QUEUE_AGE_SECONDS.observe((timezone.now() - task_data.point_in_time).total_seconds())
+
             # make sure to notify the requeuing mechanism that we are working on this task via the extra semaphore
             if not acquire_semaphore(
                 semaphore_key='bulk-requeue-taskdata-id:task_data:' + str(task_data.id),
@@ -218,6 +236,13 @@ def async_persist_data_point_chunk(
                 logger.info("Retrying in {} seconds".format(retry_delay))
                 raise self.retry(countdown=retry_delay)
             
+            validated_datas: Iterable[Dict[str, Any]]
+            if task_data.compressed_data is not None:
+                # only decompress one chunk at a time
+                validated_datas = itertools.chain.from_iterable(decode_validated_datas(task_data.compressed_data))
+            else:
+                validated_datas = task_data.data['validated_datas']
+
             try:
                 # should we lock here?
                 persist_data_point_chunk(
@@ -226,12 +251,16 @@ def async_persist_data_point_chunk(
                     data_series_id=str(task_data.data_series.id),
                     data_series_external_id=task_data.data_series.external_id,
                     data_series_backend=task_data.data_series.backend,
-                    validated_datas=task_data.data['validated_datas'],
+                    validated_datas=validated_datas,
                     serialization_keys=task_data.data['serialization_keys'],
                     point_in_time_timestamp=task_data.point_in_time.timestamp(),
                     user_id=str(task_data.user.id),
                     record_source=task_data.record_source,
-                    sub_clock=task_data.sub_clock
+                    sub_clock=task_data.sub_clock,
+                    skip_unchanged=task_data.data_series.get_extra_config_property_value(
+                        ExtraConfigParameters.skip_unchanged_data_points
+                    ),
+                    backend_migration_in_progress=task_data.data_series.backend_migration_in_progress
                 )
                 task_data.delete()
                 # TODO: write error if error happened
@@ -248,18 +277,38 @@ def persist_data_point_chunk(
         data_series_id: str,
         data_series_external_id: str,
         data_series_backend: str,
-        validated_datas: List[Dict[str, Any]],
+        validated_datas: Iterable[Dict[str, Any]],
         serialization_keys: DataPointSerializationKeys,
         point_in_time_timestamp: float,
         user_id: str,
         record_source: str,
-        sub_clock: int
-) -> None:
+        sub_clock: int,
+        consumer_ids: Optional[List[str]] = None,
+        skip_unchanged: Optional[bool] = None,
+        backend_migration_in_progress: Optional[bool] = None
+) -> List[str]:
+    """
+    :param skip_unchanged: resolved from the extra_config of the data series if not passed
+    :param backend_migration_in_progress: resolved from the data series if not passed
+    :return: the external ids of the data points that were written
+    """
     set_current_tenant(get_or_fail(Tenant.objects.filter(id=tenant_id)))
+    if consumer_ids is None:
+        # resolve once for all chunks instead of once per chunk
+        consumer_ids = consumer_ids_for_data_series(get_current_tenant(), data_series_id)
+    if skip_unchanged is None or backend_migration_in_progress is None:
+        data_series = get_or_fail(DataSeries.objects.filter(id=data_series_id))
+        if skip_unchanged is None:
+            skip_unchanged = data_series.get_extra_config_property_value(
+                ExtraConfigParameters.skip_unchanged_data_points
+            )
+        if backend_migration_in_progress is None:
+            backend_migration_in_progress = data_series.backend_migration_in_progress
     point_in_time = datetime.datetime.fromtimestamp(point_in_time_timestamp, tz=datetime.timezone.utc)
 
     flattened_keys = flatten_serialization_keys(serialization_keys)
 
+    written_external_ids: List[str] = []
     for chunk in cast(Generator[List[Dict[str, Any]], None, None],
                         chunks(
                             validated_datas,
@@ -270,20 +319,27 @@ def persist_data_point_chunk(
                             )
                         )):
         chunk_list = list(chunk)
-        create_data_points(
-            tenant_id=tenant_id,
-            tenant_name=tenant_name,
-            data_series_id=data_series_id,
-            data_series_external_id=data_series_external_id,
-            data_series_backend=data_series_backend,
-            validated_datas=chunk_list,
-            serialization_keys=serialization_keys,
-            point_in_time=point_in_time,
-            user_id=user_id,
-            record_source=record_source,
-            partial=False,
-            sub_clock=sub_clock
-        )
+        with metrics.BULK_CHUNK_PERSIST_SECONDS.labels(backend=data_series_backend).time():
+            written = create_data_points(
+                tenant_id=tenant_id,
+                tenant_name=tenant_name,
+                data_series_id=data_series_id,
+                data_series_external_id=data_series_external_id,
+                data_series_backend=data_series_backend,
+                validated_datas=chunk_list,
+                serialization_keys=serialization_keys,
+                point_in_time=point_in_time,
+                user_id=user_id,
+                record_source=record_source,
+                partial=False,
+                sub_clock=sub_clock,
+                consumer_ids=consumer_ids,
+                skip_unchanged=skip_unchanged,
+                backend_migration_in_progress=backend_migration_in_progress
+            )
+        metrics.BULK_DATA_POINTS_PERSISTED.labels(backend=data_series_backend).inc(len(chunk_list))
+        written_external_ids.extend(dp.external_id for dp in written)
+    return written_external_ids
 
 
 def flatten_serialization_keys(_dict: DataPointSerializationKeys) -> List[Tuple[str, str]]:
@@ -15,7 +15,7 @@ from skipper.dataseries.models import hard_delete_consumer, BulkInsertTaskData
 from skipper.dataseries.models.metamodel.base_fact import BaseDataSeriesFactRelation
 from skipper.dataseries.models.metamodel.boolean_fact import DataSeries_BooleanFact
 from skipper.dataseries.models.metamodel.consumer import DataSeries_Consumer
-from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.models.metamodel.data_series import DataSeries, rotate_structure_version
 from skipper.dataseries.models.metamodel.dimension import DataSeries_Dimension
 from skipper.dataseries.models.metamodel.file_fact import DataSeries_FileFact
 from skipper.dataseries.models.metamodel.float_fact import DataSeries_FloatFact
@@ -39,6 +39,9 @@ from skipper.dataseries.storage.static_ds_information import dead_facts
 from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
 from skipper.core.lint import sql_cursor
 
+# number of pruned history rows whose files are marked as deleted in the file registry at once
+PRUNE_FILE_LOOKUP_BATCH_SIZE = 1000
+
 
 def generate_prune_query_for_dp_relations(
         fact_or_dim_id_column: str,
@@ -114,8 +117,19 @@ def generate_prune_query_flat_history(
     escaped_table_name: str,
     flat_history_table_name: str,
     columns_to_return: List[str],
-    should_return: bool
+    should_return: bool,
+    id_range: bool = False
 ) -> str:
+    """
+    :param id_range: only prune the history of the data points with
+    %(after_id)s < id <= %(up_to_id)s, no upper bound if up_to_id is NULL
+    """
+    id_range_filter = ''
+    if id_range:
+        id_range_filter = """
+        AND historical_data.id > %(after_id)s
+        AND (%(up_to_id)s::varchar IS NULL OR historical_data.id <= %(up_to_id)s::varchar)
+        """
     base_sql = f"""
     DELETE 
     FROM {schema_name}.{flat_history_table_name} to_delete
@@ -135,6 +149,7 @@ def generate_prune_query_flat_history(
                 (to_delete.id, to_delete.point_in_time, to_delete.sub_clock)
         )
     )
+    {id_range_filter}
     """
     if should_return:
         return f"""
@@ -325,6 +340,8 @@ def prune_meta_model(
 
         hard_delete_consumer(consumer=consumer_rel.consumer)
 
+    rotate_structure_version(_data_series_obj.id)
+
 
 @task(name="_3_dynamic_sql_prune_history")  # type: ignore
 def prune_history(
@@ -453,16 +470,18 @@ def prune_history(
                 # the others will do the purging via the history
                 if _data_series_obj.backend == StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value:
                     if should_return:
-                        for to_delete in cursor:
-                            data_point_id, point_in_time, sub_clock = to_delete
-                            for fact_type, fact_id, external_id in materialized_prune_minio_ds_fact_dim_ids:
-                                # TODO: do this in batches
-                                file_registry.delete_all_for_datapoint(
-                                    tenant_id=tenant_id,
-                                    data_series_id=data_series_id,
-                                    fact_id=fact_id,
-                                    data_point_id=data_point_id
-                                )
+                        fact_ids = [fact_id for fact_type, fact_id, external_id in materialized_prune_minio_ds_fact_dim_ids]
+                        while True:
+                            batch = cursor.fetchmany(PRUNE_FILE_LOOKUP_BATCH_SIZE)
+                            if len(batch) == 0:
+                                break
+                            # the files themselves are deleted by the file registry cleanup
+                            file_registry.delete_all_for_datapoints(
+                                tenant_id=tenant_id,
+                                data_series_id=data_series_id,
+                                fact_ids=fact_ids,
+                                data_point_ids=[data_point_id for data_point_id, point_in_time, sub_clock in batch]
+                            )
 
         if _data_series_obj.backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
             with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
@@ -492,20 +511,21 @@ def prune_history(
                     }
                 )
                 if should_return:
-                    for to_delete in cursor:
-                        data_point_id, point_in_time, sub_clock = to_delete
-                        for fact_id in prune_minio_ds_fact_dim_ids:
-                            # TODO: do this in batches
-                            file_registry.delete_all_matching(
-                                tenant_id=tenant_id,
-                                data_series_id=data_series_id,
-                                fact_id=fact_id,
-                                history_data_point_identifiers=[
-                                    HistoryDataPointIdentifier(
-                                        data_point_id=data_point_id,
-                                        point_in_time=point_in_time,
-                                        sub_clock=sub_clock
-                                    )
-                                ]
-                            )
+                    while True:
+                        batch = cursor.fetchmany(PRUNE_FILE_LOOKUP_BATCH_SIZE)
+                        if len(batch) == 0:
+                            break
+                        # the files themselves are deleted by the file registry cleanup
+                        file_registry.delete_all_matching_bulk(
+                            tenant_id=tenant_id,
+                            data_series_id=data_series_id,
+                            fact_ids=prune_minio_ds_fact_dim_ids,
+                            history_data_point_identifiers=[
+                                HistoryDataPointIdentifier(
+                                    data_point_id=data_point_id,
+                                    point_in_time=point_in_time,
+                                    sub_clock=sub_clock
+                                ) for data_point_id, point_in_time, sub_clock in batch
+                            ]
+                        )
 
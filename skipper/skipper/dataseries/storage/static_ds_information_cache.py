@@ -0,0 +1,139 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+Cross request cache for the structure information of a data series.
+
+Entries are keyed by the id and the structure_version of a data series. The structure_version
+is rotated in the same transaction that changes facts, dimensions, indexes or consumers of the data series
+(see rotate_structure_version), so entries never have to be evicted explicitly: a changed
+data series simply does not hit the old entry anymore and the old entry ages out.
+"""
+
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Tuple, Optional, List
+
+from skipper import settings
+from skipper.dataseries.models.event import consumer_ids_for_data_series
+from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.models.metamodel.django_base import get_time_travel_point
+from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo, DataPointSerializationKeys, \
+    compute_data_series_query_info, data_point_serialization_keys
+
+logger = logging.getLogger(__name__)
+
+
+class DataSeriesStructureInfo(NamedTuple):
+    query_info: DataSeriesQueryInfo
+    serialization_keys: DataPointSerializationKeys
+    consumer_ids: List[str]
+
+
+_CacheKey = Tuple[str, str]
+
+_local_cache: 'OrderedDict[_CacheKey, DataSeriesStructureInfo]' = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+
+def _redis_key(key: _CacheKey) -> str:
+    return f'dataseries:structure:{key[0]}:{key[1]}'
+
+
+def _get_local(key: _CacheKey) -> Optional[DataSeriesStructureInfo]:
+    with _local_cache_lock:
+        value = _local_cache.get(key)
+        if value is not None:
+            _local_cache.move_to_end(key)
+        return value
+
+
+def _put_local(key: _CacheKey, value: DataSeriesStructureInfo) -> None:
+    if settings.SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_LOCAL_SIZE <= 0:
+        return
+    with _local_cache_lock:
+        _local_cache[key] = value
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > settings.SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_LOCAL_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def _get_shared(key: _CacheKey) -> Optional[DataSeriesStructureInfo]:
+    if settings.SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_TIMEOUT <= 0:
+        return None
+    from skipper.celery import app as celery_app
+    try:
+        with celery_app.pool.acquire(block=True) as conn:
+            raw = conn.default_channel.client.get(_redis_key(key))
+        if raw is None:
+            return None
+        return DataSeriesStructureInfo(*pickle.loads(raw))
+    except Exception:
+        # the shared cache is only an optimization, never fail a request because of it
+        logger.warning('failed to read data series structure information from redis', exc_info=True)
+        return None
+
+
+def _put_shared(key: _CacheKey, value: DataSeriesStructureInfo) -> None:
+    if settings.SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_TIMEOUT <= 0:
+        return
+    from skipper.celery import app as celery_app
+    try:
+        with celery_app.pool.acquire(block=True) as conn:
+            conn.default_channel.client.set(
+                _redis_key(key),
+                pickle.dumps(tuple(value)),
+                ex=settings.SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_TIMEOUT
+            )
+    except Exception:
+        logger.warning('failed to store data series structure information in redis', exc_info=True)
+
+
+def _compute(data_series: DataSeries) -> DataSeriesStructureInfo:
+    query_info = compute_data_series_query_info(data_series)
+    return DataSeriesStructureInfo(
+        query_info=query_info,
+        serialization_keys=data_point_serialization_keys(query_info),
+        consumer_ids=consumer_ids_for_data_series(data_series.tenant, data_series.id)
+    )
+
+
+def data_series_structure_info(data_series: DataSeries) -> DataSeriesStructureInfo:
+    """
+    cached variant of compute_data_series_query_info/data_point_serialization_keys.
+    The returned values are shared between requests and must not be modified.
+    """
+    if get_time_travel_point() is not None:
+        # the metamodel is resolved as of the time travel point, this is not what we cache
+        return _compute(data_series)
+
+    key: _CacheKey = (str(data_series.id), str(data_series.structure_version))
+
+    value = _get_local(key)
+    if value is not None:
+        return value
+
+    value = _get_shared(key)
+    if value is None:
+        value = _compute(data_series)
+        _put_shared(key, value)
+
+    _put_local(key, value)
+    return value
+
+
+def cached_data_series_query_info(data_series: DataSeries) -> DataSeriesQueryInfo:
+    return data_series_structure_info(data_series).query_info
+
+
+def cached_data_point_serialization_keys(data_series: DataSeries) -> DataPointSerializationKeys:
+    return data_series_structure_info(data_series).serialization_keys
+
+
+def cached_consumer_ids(data_series: DataSeries) -> List[str]:
+    return data_series_structure_info(data_series).consumer_ids
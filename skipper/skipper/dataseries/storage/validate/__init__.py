@@ -12,5 +12,7 @@ from skipper.dataseries.storage.validate import default
 
 validate: contract.DataPointValidation = default.validate
 
+collect_dimension_references: contract.DimensionReferenceCollection = default.collect_dimension_references
+
 ValidationRequest: Type[contract.ValidationRequest] = contract.ValidationRequest
 
@@ -6,7 +6,7 @@
 
 from uuid import UUID
 
-from typing import Optional, NamedTuple, Dict, Any, Union, Protocol
+from typing import Optional, NamedTuple, Dict, Any, Union, Protocol, List, Set, Callable
 
 from skipper.dataseries.storage.contract.repository import ReadOnlyDataPoint
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
@@ -35,3 +35,17 @@ class DataPointValidation(Protocol):
             data: Dict[str, Any],
             request: ValidationRequest
     ) -> Dict[str, Any]: ...
+
+
+class DimensionReferenceCollection(Protocol):
+    def __call__(
+            self,
+            datas: List[Any],
+            data_point_relation_info: DataSeriesQueryInfo,
+            external_id_as_dimension_identifier: Callable[[Any], bool]
+    ) -> Dict[str, Set[str]]:
+        """
+        :return: the ids of all data points referenced by dimensions in the (unvalidated) datas
+                 grouped by the id of the data series they belong to
+        """
+        ...
@@ -6,13 +6,13 @@
 
 
 from rest_framework.exceptions import ValidationError
-from typing import Dict, Any, List, Tuple, Protocol
+from typing import Dict, Any, List, Tuple, Protocol, Set, Callable
 
 from skipper.dataseries.storage.static_ds_information import DataSeriesQueryInfo
 from skipper.dataseries.storage.uuid import gen_uuid
 from skipper.dataseries.storage.validate.contract import ValidationRequest
 from skipper.dataseries.storage.validate.default.internal import _validate_dimensions, _validate_external_id, \
-    _validate_float_facts, _validate_string_facts, _validate_text_facts, _validate_timestamp_facts, \
+    _collect_dimension_references, _validate_float_facts, _validate_string_facts, _validate_text_facts, _validate_timestamp_facts, \
     _validate_json_facts, _validate_image_facts, _validate_boolean_facts, _validate_file_facts
 
 
@@ -106,3 +106,19 @@ def validate(
         )
 
     return data
+
+
+def collect_dimension_references(
+        datas: List[Any],
+        data_point_relation_info: DataSeriesQueryInfo,
+        external_id_as_dimension_identifier: Callable[[Any], bool]
+) -> Dict[str, Set[str]]:
+    references: Dict[str, Set[str]] = {}
+    for data in datas:
+        _collect_dimension_references(
+            data=data,
+            data_point_relation_info=data_point_relation_info,
+            use_external_id_as_dimension_identifier=external_id_as_dimension_identifier(data),
+            references=references
+        )
+    return references
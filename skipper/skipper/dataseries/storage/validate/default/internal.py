@@ -139,6 +139,38 @@ def _validate_dimensions(
     return errors, attrs
 
 
+def _collect_dimension_references(
+        data: Any,
+        data_point_relation_info: DataSeriesQueryInfo,
+        use_external_id_as_dimension_identifier: bool,
+        references: Dict[str, Set[str]]
+) -> None:
+    """
+    collects the ids of all data points referenced by the dimensions of not yet validated data
+    so that their existence can be checked in bulk ahead of the actual validation.
+    Malformed values are skipped here, _validate_dimensions reports them properly afterwards.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('payload', None), dict):
+        return
+    payload = data['payload']
+
+    for _elem in data_point_relation_info.dimensions.values():
+        external_dimension_id = str(_elem.dataseries_dimension.external_id)
+        _value = payload.get(external_dimension_id, None)
+        if not isinstance(_value, str) or _value == "":
+            continue
+
+        _dimension_data_series_id = _elem.dimension.reference.id
+        if use_external_id_as_dimension_identifier:
+            _dp_id = gen_uuid(data_series_id=_dimension_data_series_id, external_id=_value)
+        else:
+            _dp_id = _value
+
+        if str(_dimension_data_series_id) not in references:
+            references[str(_dimension_data_series_id)] = set()
+        references[str(_dimension_data_series_id)].add(_dp_id)
+
+
 def _validate_fact_ids(
         partial: bool,
         data: Dict[str, Any],
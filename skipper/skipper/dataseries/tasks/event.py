@@ -10,6 +10,7 @@ from typing import Any
 
 from opentelemetry import trace  # type: ignore
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from random import shuffle
 from skipper.core.celery import task
 from skipper.core.models.tenant import Tenant
@@ -20,6 +21,7 @@ from skipper.dataseries.tasks.pgq import get_queue, try_run_all
 from skipper.dataseries.models.metamodel.consumer import Consumer, DataSeries_Consumer
 from skipper import environment_common
 from skipper.dataseries.models import try_send_events
+from skipper.dataseries.models.event import ConsumerEvent, ConsumerEventState
 
 logger = logging.getLogger(__name__)
 
@@ -38,12 +40,18 @@ def consumer_heartbeat(queue: BaseTenantQueue, job: TenantPostgresQueueJob) -> A
         # this ensures a snappier behaviour for all one-off events
         # while still being somewhat reasonable for other tasks 
         max_events_per_consumer_heartbeat = environment_common.SKIPPER_CELERY_EVENT_QUEUE_MAX_EVENTS_PER_CONSUMER_HEARTBEAT
+        max_events_per_round = 100
+        if consumer.batch_size is not None:
+            # see SKIPPER_CELERY_EVENT_QUEUE_BATCHED_EVENTS_PER_HEARTBEAT_UNIT
+            batch_factor = max(1, consumer.batch_size // environment_common.SKIPPER_CELERY_EVENT_QUEUE_BATCHED_EVENTS_PER_HEARTBEAT_UNIT)
+            max_events_per_round = max_events_per_round * batch_factor
+            max_events_per_consumer_heartbeat = max_events_per_consumer_heartbeat * batch_factor
         while True:
             with transaction.atomic():
                 more_events, sent_count = try_send_events(
                     consumer,
                     proxy_url=environment_common.SKIPPER_CONSUMER_PROXY_URL,
-                    max_events=100
+                    max_events=max_events_per_round
                 )
                 total_sent_count += sent_count
                 if not more_events:
@@ -93,10 +101,18 @@ def actual_run_heartbeat_consumers(tenant_id: str, consumer_id: str) -> None:
     try_run_all(queue)
 
 
-# run this in celery every x seconds to wake up the event queue beat
+# run this in celery every x seconds to wake up the event queue beat.
+# consumers are usually woken up by the event dispatcher as soon as events are committed,
+# so this only has to catch the consumers whose notification got lost
 @task(name="_3_wake_up_heartbeat_consumers", queue='event_queue', ignore_result=True)   # type: ignore
 def wake_up_heartbeat_consumers() -> None:
+    pending_events = ConsumerEvent.objects.filter(
+        tenant_id=OuterRef('tenant_id'),
+        consumer_id=OuterRef('consumer_id'),
+        state__in=[ConsumerEventState.NEW.value, ConsumerEventState.RETRY.value]
+    )
     dataseries_consumers = list(DataSeries_Consumer.objects.all().filter(
+        Exists(pending_events),
         tenant__deleted_at__isnull=True,
         tenant__id__isnull=False
     ))
@@ -8,7 +8,8 @@ import datetime
 from django.utils import timezone
 from django_multitenant.utils import set_current_tenant  # type: ignore
 
-from skipper.environment import SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS
+from skipper.environment import SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS, \
+    SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CHUNK_SIZE, SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CONCURRENCY
 from skipper.core.celery import task
 from skipper.core.models import default_media_storage
 from skipper.core.models.tenant import Tenant
@@ -19,7 +20,9 @@ from skipper.dataseries.storage.contract import file_registry
 def actual_file_registry_cleanup() -> None:
     file_registry.garbage_collect(
         storage=default_media_storage,
-        older_than=datetime.datetime.now() - timezone.timedelta(hours=SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS)
+        older_than=datetime.datetime.now() - timezone.timedelta(hours=SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS),
+        chunk_size=SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CHUNK_SIZE,
+        concurrency=SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CONCURRENCY
     )
 
 
@@ -10,7 +10,11 @@ from django_multitenant.utils import set_current_tenant  # type: ignore
 
 logger = get_task_logger(__name__)
 
-meta_model_task_registry: Dict[str, Callable[[MetaModelTaskData], None]]= {}
+meta_model_task_registry: Dict[str, Callable[[MetaModelTaskData], bool]]= {}
+"""
+task functions return whether they are done. If not, the (updated) task data is kept
+and the task is run again in a new transaction, so that long running tasks can commit their progress in steps.
+"""
 
 
 def spawn_meta_model_task(task_data_id: Union[uuid.UUID, str]) -> None:
@@ -24,6 +28,7 @@ def spawn_meta_model_task(task_data_id: Union[uuid.UUID, str]) -> None:
 def run_meta_model_task(
     meta_model_task_data_id: str
 ) -> None:
+    done = True
     with transaction.atomic():
         # this must run outside of any tenant context or we dont get all data in a multitenant environment
         set_current_tenant(None)
@@ -39,6 +44,13 @@ def run_meta_model_task(
                 logger.warn(f'task function {task_data.name} not found.')
                 return
             
-            _func(task_data)
+            done = _func(task_data)
 
-            task_data.delete()
\ No newline at end of file
+            if done:
+                task_data.delete()
+            else:
+                task_data.save()
+
+    if not done:
+        # only continue once the progress of this step is committed
+        spawn_meta_model_task(meta_model_task_data_id)
\ No newline at end of file
@@ -12,9 +12,10 @@ import json
 import csv
 from PIL import Image as PIL_Image  # type: ignore
 from rest_framework import status
-from typing import Any, Dict
+from typing import Any, Dict, List
+from unittest import mock
 
-from skipper import modules
+from skipper import modules, settings
 from skipper.core.tests.base import BaseViewTest, BASE_URL
 from skipper.dataseries.storage.contract import StorageBackendType
 
@@ -45,6 +46,7 @@ class Base(BaseViewTest):
     simulate_other_tenant = True
 
     _async: bool
+    _streaming: bool = False
 
     should_fail: bool = False
     optional_fact: bool = False
@@ -82,7 +84,8 @@ class Base(BaseViewTest):
                 data=f"""external_id{separator}payload.1
                 should_succeed{idx}{separator}{self.gen_data()}""",
                 content_type=csv_encoding,
-                HTTP_X_BULK_DATA_POINT_ASYNC=json.dumps(self._async)
+                HTTP_X_BULK_DATA_POINT_ASYNC=json.dumps(self._async),
+                HTTP_X_BULK_DATA_POINT_STREAMING=json.dumps(self._streaming)
             )
 
             if self.should_fail:
@@ -120,6 +123,14 @@ class AsyncFloatTest(FloatTest):
     _async: bool = True
 
 
+class StreamingFloatTest(FloatTest):
+    _streaming: bool = True
+
+
+class AsyncStreamingFloatTest(StreamingFloatTest):
+    _async: bool = True
+
+
 class StringTest(Base):
     fact_type: str = 'string'
     _async: bool = False
@@ -147,6 +158,10 @@ class AsyncMultiLineStringTest(MultiLineStringTest):
     _async: bool = True
 
 
+class StreamingMultiLineStringTest(MultiLineStringTest):
+    _streaming: bool = True
+
+
 class TextTest(Base):
     fact_type: str = 'text'
     _async: bool = False
@@ -225,6 +240,10 @@ class AsyncImageTest(ImageTest):
     _async: bool = True
 
 
+class StreamingImageTest(ImageTest):
+    _streaming: bool = True
+
+
 class ImageOptionalTest(Base):
     fact_type = 'image'
 
@@ -276,6 +295,57 @@ class AsyncImageOptionalNoneAsStringTest(ImageOptionalNoneAsStringTest):
     _async: bool = True
 
 
+class StreamingChunksTest(BaseViewTest):
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series',
+            'external_id': 'external_id',
+            'backend': StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+        }, simulate_tenant=False)
+        self.create_payload(self.data_series['float_facts'], {
+            'external_id': '1',
+            'optional': False,
+            'name': '1'
+        })
+
+    def post_csv(self, lines: List[str]) -> Any:
+        return self.client.post(
+            path=self.data_series['data_points_bulk'],
+            data='\n'.join(['external_id,payload.1', *lines]),
+            content_type='text/csv-json-formencode',
+            HTTP_X_BULK_DATA_POINT_STREAMING='true'
+        )
+
+    def count(self) -> int:
+        count: int = self.get_payload(self.data_series['data_points'] + '?count')['count']
+        return count
+
+    def test_multiple_chunks(self) -> None:
+        with mock.patch.object(settings, 'SKIPPER_DATA_SERIES_BULK_BATCH_SIZE', 2):
+            response = self.post_csv([f'{idx},{idx}' for idx in range(5)])
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual([str(idx) for idx in range(5)], response.json()['created_external_ids'])
+        self.assertEqual(5, self.count())
+
+    def test_errors_are_reported_by_row(self) -> None:
+        with mock.patch.object(settings, 'SKIPPER_DATA_SERIES_BULK_BATCH_SIZE', 2):
+            response = self.post_csv(['0,0', '1,1', '2,2', '3,not_a_float'])
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(['3'], list(response.json().keys()))
+        # nothing of the earlier chunks is committed
+        self.assertEqual(0, self.count())
+
+    def test_duplicates_across_chunks(self) -> None:
+        with mock.patch.object(settings, 'SKIPPER_DATA_SERIES_BULK_BATCH_SIZE', 2):
+            response = self.post_csv(['0,0', '1,1', '0,2'])
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(0, self.count())
+
+
 # FIXME: add dimension tests
 
 
@@ -0,0 +1,157 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+import datetime
+from typing import Dict, Any, Set
+
+from rest_framework import status
+
+from skipper import modules
+from skipper.core.tests.base import BaseViewTest, BASE_URL
+from skipper.dataseries.models import FileLookup
+from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.storage.contract import StorageBackendType, file_registry
+from skipper.dataseries.storage.contract.file_registry import HistoryDataPointIdentifier
+
+DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
+
+
+class Base(BaseViewTest):
+    # the list endpoint is disabled for datapoints if we do not select for a data series
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    backend: str
+    files_released_on_delete: bool = False
+
+    data_series: Dict[str, Any]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series',
+            'external_id': 'external_id',
+            'backend': self.backend
+        }, simulate_tenant=False)
+        self.create_payload(self.data_series['float_facts'], payload={
+            'name': 'float',
+            'external_id': 'float',
+            'optional': True
+        })
+        response = self.client.post(
+            path=self.data_series['data_points_bulk'],
+            data={
+                'batch': [{
+                    'external_id': str(i),
+                    'payload': {
+                        'float': float(i)
+                    }
+                } for i in range(0, 10)]
+            }, format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+
+    def remaining_external_ids(self) -> Set[str]:
+        page = self.get_payload(self.data_series['data_points'] + '?pagesize=1000')['data']
+        return {data_point['external_id'] for data_point in page}
+
+    def test_delete_by_external_ids(self) -> None:
+        response = self.client.post(
+            path=self.data_series['data_points_bulk_delete'],
+            data={
+                'external_ids': ['1', '2', '2', 'does_not_exist']
+            }, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(['1', '2'], sorted(response.json()['deleted_external_ids']))
+        self.assertEqual({str(i) for i in range(0, 10) if i not in [1, 2]}, self.remaining_external_ids())
+
+    def test_delete_by_ids(self) -> None:
+        page = self.get_payload(self.data_series['data_points'] + '?pagesize=1000')['data']
+        ids = [data_point['id'] for data_point in page]
+        response = self.client.post(
+            path=self.data_series['data_points_bulk_delete'],
+            data={
+                'ids': ids
+            }, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(sorted(ids), sorted(response.json()['deleted_ids']))
+        self.assertEqual(set(), self.remaining_external_ids())
+
+        # deleting again does nothing
+        response = self.client.post(
+            path=self.data_series['data_points_bulk_delete'],
+            data={
+                'ids': ids
+            }, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([], response.json()['deleted_ids'])
+
+    def test_requires_exactly_one_list(self) -> None:
+        for data in [{}, {'ids': [], 'external_ids': []}, {'ids': 'not_a_list'}]:
+            response = self.client.post(
+                path=self.data_series['data_points_bulk_delete'],
+                data=data,
+                format='json')
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_file_registry(self) -> None:
+        file_fact = self.create_payload(self.data_series['file_facts'], payload={
+            'name': 'file',
+            'external_id': 'file',
+            'optional': True
+        })
+        tenant_id = DataSeries.all_objects.get(id=self.data_series['id']).tenant_id
+        page = self.get_payload(self.data_series['data_points'] + '?pagesize=1000')['data']
+        ids_by_external_id = {data_point['external_id']: data_point['id'] for data_point in page}
+        for external_id in ['1', '2']:
+            file_registry.register(
+                tenant_id=tenant_id,
+                data_series_id=self.data_series['id'],
+                fact_id=file_fact['id'],
+                history_data_point_identifier=HistoryDataPointIdentifier(
+                    data_point_id=ids_by_external_id[external_id],
+                    point_in_time=datetime.datetime.now(tz=datetime.timezone.utc),
+                    sub_clock=0
+                ),
+                file_name=f'file_{external_id}'
+            )
+
+        response = self.client.post(
+            path=self.data_series['data_points_bulk_delete'],
+            data={
+                'external_ids': ['1']
+            }, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+        def released(external_id: str) -> bool:
+            return FileLookup.all_objects.get(data_point_id=ids_by_external_id[external_id]).deleted_at is not None
+
+        self.assertEqual(self.files_released_on_delete, released('1'))
+        self.assertFalse(released('2'))
+
+
+class DynamicSQLNoHistoryBulkDeleteTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+    # nothing references the files of a deleted data point anymore
+    files_released_on_delete = True
+
+
+class DynamicSQLMaterializedFlatHistoryBulkDeleteTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
+
+    def test_history_hides_deleted(self) -> None:
+        response = self.client.post(
+            path=self.data_series['data_points_bulk_delete'],
+            data={
+                'external_ids': ['1']
+            }, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        deleted_id = response.json()['deleted_ids'][0]
+
+        history = self.get_payload(self.data_series['history_data_points'] + '?pagesize=1000&include_versions')['data']
+        self.assertNotIn(deleted_id, [data_point['id'] for data_point in history])
+
+
+del Base
@@ -116,6 +116,69 @@ class BasicBehaviourBulkTest(BaseViewTest):
             idx += 1
 
 
+class LargeChunkBulkInsertTest(BaseViewTest):
+    """
+    chunks above SKIPPER_DATA_SERIES_BULK_COPY_THRESHOLD are staged via COPY
+    and upserted in a single statement, this should behave exactly like the row by row upsert
+    """
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    def _test_large_chunk_upsert(self, idx: int, backend: str) -> None:
+        data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': f'my_data_series_{idx}',
+            'external_id': f'external_id{idx}',
+            'backend': backend
+        }, simulate_tenant=False)
+
+        for fact_type in ['float', 'string', 'json', 'boolean']:
+            self.create_payload(data_series[f'{fact_type}_facts'], payload={
+                'name': f'{fact_type}_fact',
+                'external_id': f'{fact_type}_fact',
+                'optional': True
+            }, simulate_tenant=False)
+
+        def batch(version: int) -> List[Dict[str, Any]]:
+            return [{
+                'external_id': str(i),
+                'payload': {
+                    'float_fact': i * version,
+                    'string_fact': f'{i}_{version}',
+                    'json_fact': {'version': version},
+                    'boolean_fact': version % 2 == 0
+                }
+            } for i in range(0, 60)]
+
+        for version in [1, 2]:
+            response = self.client.post(path=data_series['data_points_bulk'], data={
+                'batch': batch(version)
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.json()['created_external_ids'], [str(i) for i in range(0, 60)])
+
+        data_points = self.get_payload(data_series['data_points'] + '?count=true&pagesize=100')
+        self.assertEqual(60, data_points['count'])
+        for data_point in data_points['data']:
+            i = int(data_point['external_id'])
+            self.assertEqual({
+                'float_fact': i * 2,
+                'string_fact': f'{i}_2',
+                'json_fact': {'version': 2},
+                'boolean_fact': True
+            }, data_point['payload'])
+
+        if backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
+            history = self.get_payload(data_series['history_data_points'] + '?external_id=7&include_versions')['data']
+            self.assertEqual(1, len(history))
+            self.assertEqual(2, len(history[0]['versions']['data_point']))
+
+    def test_large_chunk_upsert(self) -> None:
+        idx = 0
+        for backend_key, backend_value in StorageBackendType.choices():
+            self._test_large_chunk_upsert(idx, backend_value)
+            idx += 1
+
+
 class BaseFactRelevantBulkInsertTest(BaseViewTest):
     # the list endpoint is disabled for datapoints if we do not select for a data series
     url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
@@ -0,0 +1,79 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from django.test import modify_settings
+from prometheus_client import REGISTRY
+from rest_framework import status
+from typing import Any, Dict, Optional
+
+from skipper import modules
+from skipper.core.tests.base import BaseViewTest, BASE_URL
+from skipper.dataseries.storage.contract import StorageBackendType
+
+DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
+
+
+def sample_value(name: str, labels: Optional[Dict[str, str]] = None) -> float:
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def sample_sum(name: str) -> float:
+    """
+    sum of a sample over all label values
+    """
+    return sum(
+        sample.value
+        for metric in REGISTRY.collect()
+        for sample in metric.samples
+        if sample.name == name
+    )
+
+
+# only part of the middleware if SKIPPER_METRICS_ENABLED is set
+@modify_settings(MIDDLEWARE={'prepend': 'skipper.core.middleware.QueryCountMetricsMiddleware'})
+class BulkMetricsTest(BaseViewTest):
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series',
+            'external_id': 'external_id',
+            'backend': self.backend
+        }, simulate_tenant=False)
+
+    def post_bulk(self, count: int) -> Any:
+        return self.client.post(path=self.data_series['data_points_bulk'], data={
+            'batch': [{
+                'external_id': str(idx),
+                'payload': {}
+            } for idx in range(count)]
+        }, format='json')
+
+    def test_bulk_insert_is_recorded(self) -> None:
+        persisted_before = sample_value('skipper_dataseries_bulk_data_points_persisted_total', {'backend': self.backend})
+        chunks_before = sample_value('skipper_dataseries_bulk_chunk_persist_seconds_count', {'backend': self.backend})
+        validations_before = sample_value('skipper_dataseries_bulk_validation_seconds_count')
+
+        response = self.post_bulk(3)
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+
+        self.assertEqual(3, sample_value('skipper_dataseries_bulk_data_points_persisted_total', {'backend': self.backend}) - persisted_before)
+        self.assertEqual(1, sample_value('skipper_dataseries_bulk_chunk_persist_seconds_count', {'backend': self.backend}) - chunks_before)
+        self.assertEqual(1, sample_value('skipper_dataseries_bulk_validation_seconds_count') - validations_before)
+
+    def test_query_count_is_recorded_per_request(self) -> None:
+        requests_before = sample_sum('skipper_http_request_db_queries_count')
+        queries_before = sample_sum('skipper_http_request_db_queries_sum')
+
+        response = self.post_bulk(1)
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+
+        self.assertEqual(1, sample_sum('skipper_http_request_db_queries_count') - requests_before)
+        self.assertGreater(sample_sum('skipper_http_request_db_queries_sum') - queries_before, 0)
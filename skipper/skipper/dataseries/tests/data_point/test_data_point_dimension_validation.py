@@ -210,6 +210,56 @@ class Base(BaseViewTest):
         self.assertTrue(self.dim_2['external_id'] in error_json['payload'])
 
 
+    def test_bulk_reports_errors_per_row(self) -> None:
+        response = self.client.post(
+            path=self.data_series['data_points_bulk'],
+            data={
+                "batch": [{
+                    "external_id": '1',
+                    "payload": {
+                        self.dim_1['external_id']: self.dim_entries_1[0]['id'],
+                        self.dim_2['external_id']: self.dim_entries_2[0]['id'],
+                    }
+                }, {
+                    "external_id": '2',
+                    "payload": {
+                        self.dim_1['external_id']: 'NOT_EXISTANT_1',
+                        self.dim_2['external_id']: self.dim_entries_2[1]['id'],
+                    }
+                }, {
+                    "external_id": '3',
+                    "payload": {
+                        self.dim_1['external_id']: self.dim_entries_1[1]['external_id'],
+                        self.dim_2['external_id']: 'NOT_EXISTANT_2',
+                    },
+                    "identify_dimensions_by_external_id": True
+                }]
+            }, format='json')
+
+        self.assertEquals(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+        error_json = response.json()
+        self.assertEqual(3, len(error_json))
+        self.assertEqual({}, error_json[0])
+        self.assertEqual([self.dim_1['external_id']], list(error_json[1]['payload'].keys()))
+        self.assertEqual([self.dim_2['external_id']], list(error_json[2]['payload'].keys()))
+
+    def test_bulk_should_work_identify_by_external_id(self) -> None:
+        response = self.client.post(
+            path=self.data_series['data_points_bulk'],
+            data={
+                "batch": [{
+                    "external_id": str(i),
+                    "payload": {
+                        self.dim_1['external_id']: self.dim_entries_1[i % 2]['external_id'],
+                        self.dim_2['external_id']: self.dim_entries_2[i % 2]['external_id'],
+                    },
+                    "identify_dimensions_by_external_id": True
+                } for i in range(0, 10)]
+            }, format='json')
+        self.assertEquals(status.HTTP_201_CREATED, response.status_code)
+
+
 class DynamicSQLNoHistoryDimensionValidationTest(Base):
     backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
 
@@ -0,0 +1,125 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+import csv
+import io
+import json
+from typing import Dict, Any, List
+from unittest import mock
+
+from rest_framework import status
+
+from skipper import modules
+from skipper.core.tests.base import BaseViewTest, BASE_URL
+from skipper.dataseries.storage.contract import StorageBackendType
+from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
+
+DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
+
+
+class Base(BaseViewTest):
+    # the list endpoint is disabled for datapoints if we do not select for a data series
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    backend: str
+
+    data_series: Dict[str, Any]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series',
+            'external_id': 'external_id',
+            'backend': self.backend
+        }, simulate_tenant=False)
+        self.create_payload(self.data_series['float_facts'], payload={
+            'name': 'float',
+            'external_id': 'float',
+            'optional': True
+        })
+        self.create_payload(self.data_series['boolean_facts'], payload={
+            'name': 'boolean',
+            'external_id': 'boolean',
+            'optional': True
+        })
+        self.create_payload(self.data_series['json_facts'], payload={
+            'name': 'json',
+            'external_id': 'json',
+            'optional': True
+        })
+        for i in range(0, 5):
+            self.create_payload(self.data_series['data_points'], payload={
+                'external_id': str(i),
+                'payload': {
+                    'float': float(i),
+                    'boolean': i % 2 == 0,
+                    'json': {'i': i}
+                }
+            })
+
+    def export(self, query: str) -> List[Any]:
+        response = self.client.get(self.data_series['data_points_export'] + query)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+
+    def test_export_ndjson(self) -> None:
+        exported = self.export('')
+        self.assertEqual(5, len(exported))
+        listed = self.get_payload(self.data_series['data_points'] + '?pagesize=1000')['data']
+        self.assertEqual(
+            {data_point['id']: data_point['payload'] for data_point in listed},
+            {data_point['id']: data_point['payload'] for data_point in exported}
+        )
+        self.assertEqual(['id', 'external_id', 'point_in_time', 'payload'], list(exported[0].keys()))
+
+    def test_export_filter_and_include_in_payload(self) -> None:
+        exported = self.export('?filter=' + json.dumps({'boolean': True}) + '&include_in_payload=float')
+        self.assertEqual(
+            {'0': {'float': 0.0}, '2': {'float': 2.0}, '4': {'float': 4.0}},
+            {data_point['external_id']: data_point['payload'] for data_point in exported}
+        )
+
+    def test_export_csv(self) -> None:
+        response = self.client.get(self.data_series['data_points_export'] + '?export_format=csv')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(5, len(rows))
+        by_external_id = {row['external_id']: row for row in rows}
+        self.assertEqual(1.0, float(by_external_id['1']['float']))
+        self.assertEqual('false', by_external_id['1']['boolean'])
+        self.assertEqual({'i': 1}, json.loads(by_external_id['1']['json']))
+
+    def test_export_read_db(self) -> None:
+        # exports are read only, so they can be served by the read replica just like the list
+        with mock.patch(
+                'skipper.dataseries.storage.dynamic_sql.storage_view_adapter.data_point_read_db',
+                return_value=DATA_SERIES_DYNAMIC_SQL_DB
+        ) as data_point_read_db:
+            self.assertEqual(5, len(self.export('')))
+        data_point_read_db.assert_called()
+
+    def test_export_unknown_format(self) -> None:
+        response = self.client.get(self.data_series['data_points_export'] + '?export_format=xml')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+
+class DynamicSQLNoHistoryExportTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+
+
+class DynamicSQLMaterializedFlatHistoryExportTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
+
+    def test_export_history(self) -> None:
+        response = self.client.get(self.data_series['history_data_points_export'])
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(5, len(lines))
+
+
+del Base
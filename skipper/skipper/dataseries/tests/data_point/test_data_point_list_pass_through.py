@@ -0,0 +1,115 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from typing import Dict, Any
+
+from skipper import modules
+from skipper.core.tests.base import BaseViewTest, BASE_URL
+from skipper.dataseries.storage.contract import StorageBackendType
+
+DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
+
+
+class Base(BaseViewTest):
+    # the list endpoint is disabled for datapoints if we do not select for a data series
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    backend: str
+
+    data_series: Dict[str, Any]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series',
+            'external_id': 'external_id',
+            'backend': self.backend
+        }, simulate_tenant=False)
+        self.create_payload(self.data_series['float_facts'], payload={
+            'name': 'float',
+            'external_id': 'float',
+            'optional': True
+        })
+        self.create_payload(self.data_series['json_facts'], payload={
+            'name': 'json',
+            'external_id': 'json',
+            'optional': True
+        })
+        self.create_payload(self.data_series['data_points'], payload={
+            'external_id': '1',
+            'payload': {
+                'float': 1.5,
+                'json': {'nested': None, 'list': [1, None, 'ä']}
+            }
+        })
+        self.create_payload(self.data_series['data_points'], payload={
+            'external_id': '2',
+            'payload': {
+                'float': None,
+                'json': None
+            }
+        })
+
+    def test_list_same_as_detail(self) -> None:
+        page = self.get_payload(self.data_series['data_points'] + '?pagesize=1000')['data']
+        self.assertEqual(2, len(page))
+        for data_point in page:
+            self.assertEqual(self.get_payload(data_point['url']), data_point)
+
+        by_external_id = {data_point['external_id']: data_point for data_point in page}
+        # nested nulls are kept, top level nulls are stripped
+        self.assertEqual({
+            'float': 1.5,
+            'json': {'nested': None, 'list': [1, None, 'ä']}
+        }, by_external_id['1']['payload'])
+        self.assertEqual({}, by_external_id['2']['payload'])
+
+    def test_list_include_in_payload(self) -> None:
+        page = self.get_payload(self.data_series['data_points'] + '?include_in_payload=float')['data']
+        self.assertEqual(
+            {'1': {'float': 1.5}, '2': {}},
+            {data_point['external_id']: data_point['payload'] for data_point in page}
+        )
+
+    def test_pagination(self) -> None:
+        response = self.get_payload(self.data_series['data_points'] + '?pagesize=1&count')
+        self.assertEqual(2, response['count'])
+        self.assertEqual(1, len(response['data']))
+        second_page = self.get_payload(response['next'])
+        self.assertEqual(1, len(second_page['data']))
+        self.assertNotEqual(response['data'][0]['id'], second_page['data'][0]['id'])
+
+    def test_count_modes(self) -> None:
+        exact = self.get_payload(self.data_series['data_points'] + '?count=exact')
+        self.assertEqual(2, exact['count'])
+        self.assertNotIn('count_is_estimate', exact)
+
+        estimate = self.get_payload(self.data_series['data_points'] + '?count=estimate')
+        self.assertIsInstance(estimate['count'], int)
+        self.assertTrue(estimate['count_is_estimate'])
+
+        self.assertNotIn('count', self.get_payload(self.data_series['data_points']))
+        self.assertNotIn('count', self.get_payload(self.data_series['data_points'] + '?count=false'))
+
+
+class DynamicSQLNoHistoryPassThroughTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+
+
+class DynamicSQLMaterializedFlatHistoryPassThroughTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
+
+    def test_history_list_with_versions(self) -> None:
+        page = self.get_payload(self.data_series['history_data_points'] + '?include_versions')['data']
+        self.assertEqual(2, len(page))
+        for data_point in page:
+            self.assertIn('versions', data_point)
+            self.assertEqual(['url', 'history_url', 'id', 'external_id', 'point_in_time', 'payload', 'versions'],
+                             list(data_point.keys()))
+
+
+del Base
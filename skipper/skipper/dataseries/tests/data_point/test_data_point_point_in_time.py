@@ -0,0 +1,192 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+
+import datetime
+from urllib.parse import quote as urlquote
+from typing import Any, Dict, List, Optional
+
+from skipper import modules
+from skipper.core.tests.base import BaseViewTest, BASE_URL
+
+from rest_framework import status
+
+from skipper.core.lint import sql_cursor
+from skipper.dataseries.raw_sql import dbtime, escape
+from skipper.dataseries.raw_sql.tenant import escaped_tenant_schema
+from skipper.dataseries.storage.contract import StorageBackendType
+from skipper.dataseries.storage.dynamic_sql.materialized import materialized_flat_history_table_name
+from skipper.dataseries.storage.dynamic_sql.tasks.ddl.data_series import ensure_validity_range_materialized_flat_history
+from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
+
+DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
+
+
+class BasePointInTimeTest(BaseViewTest):
+    # the list endpoint is disabled for datapoints if we do not select for a data series
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    data_series: Dict[str, Any]
+
+    backend: str
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series_1',
+            'external_id': 'external_id1',
+            'backend': self.backend
+        }, simulate_tenant=False)
+
+        self.create_payload(self.data_series['float_facts'], payload={
+            'name': 'my_float',
+            'external_id': 'my_float',
+            'optional': True
+        })
+
+    def as_of(self, time: datetime.datetime) -> List[Dict[str, Any]]:
+        data: List[Dict[str, Any]] = self.get_payload(
+            url=f"{self.data_series['history_data_points']}?point_in_time={urlquote(str(time.isoformat()))}"
+        )['data']
+        count = self.get_payload(
+            url=f"{self.data_series['history_data_points']}?point_in_time={urlquote(str(time.isoformat()))}&count"
+        )['count']
+        self.assertEqual(len(data), count)
+        return data
+
+    def value_as_of(self, time: datetime.datetime, external_id: str) -> Optional[float]:
+        for data_point in self.as_of(time):
+            if data_point['external_id'] == external_id:
+                value: float = data_point['payload']['my_float']
+                return value
+        return None
+
+    def test_versions_are_valid_until_superseded(self) -> None:
+        before_create = dbtime.now()
+
+        created = self.create_payload(self.data_series['data_points'], payload={
+            'external_id': '1',
+            'payload': {
+                'my_float': 1
+            }
+        })
+        self.create_payload(self.data_series['data_points'], payload={
+            'external_id': '2',
+            'payload': {
+                'my_float': 10
+            }
+        })
+
+        after_create = dbtime.now()
+
+        response = self.client.put(
+            path=created['url'],
+            data={
+                'external_id': '1',
+                'payload': {
+                    'my_float': 2
+                }
+            }, format='json'
+        )
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+        after_update = dbtime.now()
+
+        response = self.client.delete(path=created['url'])
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+
+        after_delete = dbtime.now()
+
+        self.create_payload(self.data_series['data_points'], payload={
+            'external_id': '1',
+            'payload': {
+                'my_float': 3
+            }
+        })
+
+        after_recreate = dbtime.now()
+
+        self.assertEqual([], self.as_of(before_create))
+
+        self.assertEqual(2, len(self.as_of(after_create)))
+        self.assertEqual(1, self.value_as_of(after_create, '1'))
+        self.assertEqual(10, self.value_as_of(after_create, '2'))
+
+        self.assertEqual(2, len(self.as_of(after_update)))
+        self.assertEqual(2, self.value_as_of(after_update, '1'))
+        self.assertEqual(10, self.value_as_of(after_update, '2'))
+
+        self.assertEqual(1, len(self.as_of(after_delete)))
+        self.assertIsNone(self.value_as_of(after_delete, '1'))
+        self.assertEqual(10, self.value_as_of(after_delete, '2'))
+
+        self.assertEqual(2, len(self.as_of(after_recreate)))
+        self.assertEqual(3, self.value_as_of(after_recreate, '1'))
+        self.assertEqual(10, self.value_as_of(after_recreate, '2'))
+
+
+class MaterializedFlatHistoryPointInTimeTest(BasePointInTimeTest):
+    backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
+
+    def test_backfill_validity_ranges(self) -> None:
+        created = [
+            self.create_payload(self.data_series['data_points'], payload={
+                'external_id': external_id,
+                'payload': {
+                    'my_float': 1
+                }
+            }) for external_id in ['1', '2', '3']
+        ]
+
+        after_create = dbtime.now()
+
+        for data_point in created:
+            response = self.client.put(
+                path=data_point['url'],
+                data={
+                    'external_id': data_point['external_id'],
+                    'payload': {
+                        'my_float': 2
+                    }
+                }, format='json'
+            )
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+        after_update = dbtime.now()
+
+        # flat history tables from before valid_to existed
+        schema_name = escaped_tenant_schema('default_tenant')
+        table_name = escape.escape(materialized_flat_history_table_name(
+            self.data_series['id'], self.data_series['external_id']
+        ))
+        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            cursor.execute(f"ALTER TABLE {schema_name}.{table_name} DROP COLUMN valid_to")
+
+        # one data point per chunk, so every chunk must only see the versions of its own data points
+        ensure_validity_range_materialized_flat_history(
+            self.data_series['id'],
+            self.data_series['external_id'],
+            'default_tenant',
+            chunk_size=1
+        )
+
+        # dropping valid_to dropped the index on the current versions as well
+        current_index_name = escape.escape(f"_mfhist_current_{self.data_series['id']}_{self.data_series['external_id']}")
+        with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+            cursor.execute("SELECT to_regclass(%(index_name)s)", {'index_name': f'{schema_name}.{current_index_name}'})
+            self.assertIsNotNone(cursor.fetchone()[0])
+
+        self.assertEqual(3, len(self.as_of(after_create)))
+        for external_id in ['1', '2', '3']:
+            self.assertEqual(1, self.value_as_of(after_create, external_id))
+        self.assertEqual(3, len(self.as_of(after_update)))
+        for external_id in ['1', '2', '3']:
+            self.assertEqual(2, self.value_as_of(after_update, external_id))
+
+
+del BasePointInTimeTest
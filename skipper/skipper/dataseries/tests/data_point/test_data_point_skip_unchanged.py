@@ -0,0 +1,121 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from typing import Dict, Any, List
+from unittest import mock
+
+from rest_framework import status
+
+from skipper import modules, settings
+from skipper.core.tests.base import BaseViewTest, BASE_URL
+from skipper.dataseries.storage.contract import StorageBackendType
+
+DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
+
+
+class Base(BaseViewTest):
+    # the list endpoint is disabled for datapoints if we do not select for a data series
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    backend: str
+    copy_threshold: int
+
+    data_series: Dict[str, Any]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series',
+            'external_id': 'external_id',
+            'backend': self.backend,
+            'extra_config': {
+                'skip_unchanged_data_points': True
+            }
+        }, simulate_tenant=False)
+        self.create_payload(self.data_series['float_facts'], payload={
+            'name': 'float',
+            'external_id': 'float',
+            'optional': True
+        })
+        self.create_payload(self.data_series['string_facts'], payload={
+            'name': 'string',
+            'external_id': 'string',
+            'optional': True
+        })
+
+    def post_batch(self, batch: List[Dict[str, Any]]) -> List[str]:
+        with mock.patch.object(settings, 'SKIPPER_DATA_SERIES_BULK_COPY_THRESHOLD', self.copy_threshold):
+            response = self.client.post(
+                path=self.data_series['data_points_bulk'],
+                data={
+                    'batch': batch
+                }, format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        created_external_ids: List[str] = response.json()['created_external_ids']
+        return created_external_ids
+
+    def batch(self, changed: List[int]) -> List[Dict[str, Any]]:
+        return [{
+            'external_id': str(i),
+            'payload': {
+                'float': float(i) + (0.5 if i in changed else 0),
+                'string': str(i)
+            }
+        } for i in range(0, 30)]
+
+    def test_unchanged_data_points_are_skipped(self) -> None:
+        self.assertEqual([str(i) for i in range(0, 30)], self.post_batch(self.batch(changed=[])))
+        self.assertEqual([], self.post_batch(self.batch(changed=[])))
+        self.assertEqual(['3', '7'], self.post_batch(self.batch(changed=[3, 7])))
+
+        data_point = self.get_payload(self.data_series['data_points'] + '?external_id=3')['data'][0]
+        self.assertEqual({'float': 3.5, 'string': '3'}, data_point['payload'])
+
+        if self.backend == StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value:
+            for external_id, expected_versions in [('3', 2), ('4', 1)]:
+                history = self.get_payload(
+                    self.data_series['history_data_points'] + f'?external_id={external_id}&include_versions'
+                )['data']
+                self.assertEqual(expected_versions, len(history[0]['versions']['data_point']))
+
+    def test_same_values_in_other_fact_are_a_change(self) -> None:
+        self.post_batch([{'external_id': '1', 'payload': {'float': None, 'string': '1'}}])
+        self.assertEqual(['1'], self.post_batch([{'external_id': '1', 'payload': {'float': 1.0, 'string': None}}]))
+
+    def test_deleted_data_points_are_written_again(self) -> None:
+        self.post_batch(self.batch(changed=[]))
+        response = self.client.post(
+            path=self.data_series['data_points_bulk_delete'],
+            data={
+                'external_ids': ['1']
+            }, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(['1'], self.post_batch(self.batch(changed=[])))
+        self.assertEqual(30, self.get_payload(self.data_series['data_points'] + '?count')['count'])
+
+
+class DynamicSQLNoHistorySkipUnchangedTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+    copy_threshold = 20
+
+
+class DynamicSQLNoHistorySkipUnchangedNoCopyTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+    copy_threshold = 0
+
+
+class DynamicSQLMaterializedFlatHistorySkipUnchangedTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
+    copy_threshold = 20
+
+
+class DynamicSQLMaterializedFlatHistorySkipUnchangedNoCopyTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
+    copy_threshold = 0
+
+
+del Base
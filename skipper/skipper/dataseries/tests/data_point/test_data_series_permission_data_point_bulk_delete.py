@@ -0,0 +1,50 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from typing import Union
+
+from django.http import HttpResponse
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from django.test.client import _MonkeyPatchedWSGIResponse as TestHttpResponse
+else:
+    TestHttpResponse = object
+from rest_framework import status
+
+from skipper.dataseries.models import DATASERIES_PERMISSION_KEY_DATA_POINT_BULK, ds_permission_for_rest_method
+from skipper.dataseries.tests.base.data_series_child_list_permission_test import BaseDataSeriesDetailPermissionTest
+
+
+class POSTDataSeriesChildDataPointBulkDeletePermissionTest(BaseDataSeriesDetailPermissionTest):
+
+    def permission_code_name(self) -> str:
+        # deleting in bulk is done via POST, but requires the DELETE permission
+        return ds_permission_for_rest_method(
+            action=DATASERIES_PERMISSION_KEY_DATA_POINT_BULK,
+            method='DELETE'
+        )
+
+    def method_under_test_malformed(self) -> HttpResponse:
+        return self.user_client.post(
+            path=self.data_series_json['data_points_bulk_delete'],
+            format='json',
+            data={}
+        )
+
+    def malformed_with_permission_status(self) -> int:
+        return status.HTTP_400_BAD_REQUEST
+
+    def proper_with_permission_status(self) -> int:
+        return status.HTTP_200_OK
+
+    def method_under_test_proper(self) -> Union[HttpResponse, TestHttpResponse]:
+        return self.user_client.post(
+            path=self.data_series_json['data_points_bulk_delete'],
+            format='json',
+            data={
+                'external_ids': ['123132']
+            }
+        )
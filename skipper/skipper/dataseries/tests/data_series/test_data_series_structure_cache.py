@@ -0,0 +1,117 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+
+from typing import Any, Dict
+
+from rest_framework import status
+
+from skipper import modules
+from skipper.core.tests.base import BaseViewTest, BASE_URL
+from skipper.dataseries.storage.contract import StorageBackendType
+
+DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
+
+
+class Base(BaseViewTest):
+    """
+    the structure information of data series is cached across requests,
+    make sure changes to the structure are picked up by subsequent requests
+    """
+    url_under_test = DATA_SERIES_BASE_URL + 'dataseries/'
+    simulate_other_tenant = True
+
+    backend: str
+
+    data_series: Dict[str, Any]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series_1',
+            'external_id': 'external_id1',
+            'backend': self.backend
+        }, simulate_tenant=False)
+
+        # populate the cache with the initial structure
+        self.create_payload(self.data_series['data_points'], {
+            'external_id': 'initial',
+            'payload': {}
+        })
+
+    def post_data_point(self, external_id: str, payload: Dict[str, Any]) -> Any:
+        return self.client.post(
+            path=self.data_series['data_points'],
+            data={
+                'external_id': external_id,
+                'payload': payload
+            }, format='json')
+
+    def test_fact_lifecycle_is_picked_up(self) -> None:
+        fact = self.create_payload(self.data_series['float_facts'], {
+            'external_id': 'my_float',
+            'optional': False,
+            'name': 'my_float'
+        })
+
+        response = self.post_data_point('missing_fact', {})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+        response = self.post_data_point('with_fact', {'my_float': 1.5})
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(1.5, response.json()['payload']['my_float'])
+
+        response = self.client.patch(path=fact['url'], data={
+            'external_id': 'my_float',
+            'optional': True,
+            'name': 'my_float'
+        }, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+        response = self.post_data_point('optional_fact', {})
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+
+        response = self.client.delete(path=fact['url'])
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+
+        response = self.post_data_point('deleted_fact', {})
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertFalse('my_float' in response.json()['payload'])
+
+    def test_dimension_is_picked_up(self) -> None:
+        referenced_data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series_2',
+            'external_id': 'external_id2',
+            'backend': self.backend
+        }, simulate_tenant=False)
+        referenced_data_point = self.create_payload(referenced_data_series['data_points'], {
+            'external_id': 'referenced',
+            'payload': {}
+        })
+
+        self.create_payload(self.data_series['dimensions'], payload={
+            'name': 'my_dim',
+            'reference': referenced_data_series['url'],
+            'external_id': 'my_dim',
+            'optional': False
+        })
+
+        response = self.post_data_point('missing_dimension', {})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+        response = self.post_data_point('with_dimension', {'my_dim': referenced_data_point['id']})
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+
+
+class DynamicSQLNoHistoryStructureCacheTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY.value
+
+
+class DynamicSQLMaterializedFlatHistoryStructureCacheTest(Base):
+    backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY.value
+
+
+del Base
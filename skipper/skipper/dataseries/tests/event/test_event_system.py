@@ -13,13 +13,20 @@ import time
 import asyncio
 import requests
 import selectors
+from django.utils import timezone
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from rest_framework import status
 from typing import List, Type, Any, TypeVar, Dict, Optional
+from unittest import mock
 
 from skipper import modules
 from skipper.core.tests.base import BaseViewTest, BASE_URL
 from skipper.dataseries.models.metamodel.consumer import Consumer
-from skipper.dataseries.models.event import ConsumerEvent, ConsumerEventState, try_send_events
+from skipper.dataseries.event_dispatcher import parse_notify_payload
+from skipper.dataseries.models.event import ConsumerEvent, ConsumerEventState, ConsumerEventType, data_point_event, \
+    try_send_events
+from skipper.dataseries.tasks.event import actual_run_heartbeat_consumers, wake_up_heartbeat_consumers
+from skipper.dataseries.storage.uuid import gen_uuid
 
 _ServerSelector: Any
 if hasattr(selectors, 'PollSelector'):
@@ -477,6 +484,179 @@ class EventSystemTest(BaseViewTest):
 
         self.assertEqual(1, len(_events))
 
+    def test_batched_events(self) -> None:
+        _events: List[Dict[str, Any]] = []
+
+        class RequestHandler(SimpleHTTPRequestHandler):
+            def do_POST(self) -> None:
+                payload_len = int(str(self.headers.get('content-length', 0)))
+                payload_bytes = self.rfile.read(payload_len)
+                payload = json.loads(payload_bytes.decode())
+                nonlocal _events
+                if len(_events) == 0:
+                    self.send_response(500)
+                else:
+                    self.send_response(200)
+                _events.append(payload)
+                self.end_headers()
+                self.wfile.write('{"success": "ok"}\n'.encode())
+
+        def call(port: int) -> None:
+            data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+                'name': 'my_data_series_1',
+                'external_id': 'external_id1'
+            }, simulate_tenant=False)
+
+            consumer = self.create_payload(data_series['consumers'], payload={
+                "external_id": "my_consumer",
+                "name": "my_consumer_name",
+                "target": f"http://localhost:{port}/",
+                "headers": {},
+                "timeout": 10,
+                "batch_size": 2,
+                "retry_backoff_every": 0,
+                "retry_backoff_delay": 0,
+                "retry_max": 0
+            })
+
+            for i in range(0, 3):
+                self.create_payload(data_series['data_points'], payload={
+                    'external_id': f'data_point_{i}',
+                    'payload': {}
+                })
+
+            consumer = Consumer.objects.get(id=consumer['id'])
+
+            # the first batch fails as a whole
+            try_send_events(consumer, proxy_url=None, log_errors=False, max_events=self.max_events)
+            states = [event.state for event in ConsumerEvent.objects.filter(consumer=consumer).order_by('id')]
+            self.assertEqual([
+                ConsumerEventState.RETRY.value,
+                ConsumerEventState.RETRY.value,
+                ConsumerEventState.NEW.value
+            ], states)
+
+            try_send_events(consumer, proxy_url=None, log_errors=True, max_events=self.max_events)
+            states = [event.state for event in ConsumerEvent.objects.filter(consumer=consumer).order_by('id')]
+            self.assertEqual([ConsumerEventState.SUCCESS.value] * 3, states)
+
+        run_requests(RequestHandler, call, 10)
+
+        self.assertEqual([2, 2, 1], [len(event['events']) for event in _events])
+        self.assertEqual(
+            [f'data_point_{i}' for i in range(0, 3)],
+            [event['payload']['data_points'][0]['external_id'] for event in _events[1]['events'] + _events[2]['events']]
+        )
+
+
+    def test_events_for_all_consumers(self) -> None:
+        data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series_1',
+            'external_id': 'external_id1'
+        }, simulate_tenant=False)
+
+        consumers = [self.create_payload(data_series['consumers'], payload={
+            "external_id": f"my_consumer_{i}",
+            "name": f"my_consumer_name_{i}",
+            "target": "http://localhost:1/",
+            "headers": {},
+            "timeout": 10,
+            "retry_backoff_every": 0,
+            "retry_backoff_delay": 0,
+            "retry_max": 0
+        }) for i in range(0, 3)]
+        self.delete_payload(consumers[2]['url'])
+
+        response = self.client.post(path=data_series['data_points_bulk'], format='json', data={
+            'batch': [{
+                'external_id': f'data_point_{i}',
+                'payload': {}
+            } for i in range(0, 3)]
+        })
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.delete_payload(data_series['data_points'] + str(gen_uuid(data_series['id'], 'data_point_0')) + '/')
+
+        for consumer in consumers[:2]:
+            events = list(ConsumerEvent.objects.filter(consumer_id=consumer['id']).order_by('id'))
+            # one event for the whole bulk chunk, one for the delete
+            self.assertEqual(2, len(events))
+            self.assertEqual({ConsumerEventState.NEW.value}, {event.state for event in events})
+            self.assertEqual(
+                [['data_point_0', 'data_point_1', 'data_point_2'], ['data_point_0']],
+                [[data_point['external_id'] for data_point in event.payload['data_points']] for event in events]
+            )
+        self.assertEqual(0, ConsumerEvent.objects.filter(consumer_id=consumers[2]['id']).count())
+
+    def test_events_skip_consumers_deleted_after_caching(self) -> None:
+        data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series_1',
+            'external_id': 'external_id1'
+        }, simulate_tenant=False)
+
+        consumers = [self.create_payload(data_series['consumers'], payload={
+            "external_id": f"my_consumer_{i}",
+            "name": f"my_consumer_name_{i}",
+            "target": "http://localhost:1/",
+            "headers": {},
+            "timeout": 10,
+            "retry_backoff_every": 0,
+            "retry_backoff_delay": 0,
+            "retry_max": 0
+        }) for i in range(0, 2)]
+        # the consumer ids as they were cached before the second consumer got deleted
+        cached_consumer_ids = [consumer['id'] for consumer in consumers]
+        self.delete_payload(consumers[1]['url'])
+
+        data_point_event(
+            tenant=Consumer.all_objects.get(id=consumers[0]['id']).tenant,
+            data_series_id=data_series['id'],
+            point_in_time=timezone.now(),
+            sub_clock=1,
+            payload={},
+            event_type=ConsumerEventType.DATA_POINT_CHANGED,
+            consumer_ids=cached_consumer_ids
+        )
+
+        self.assertEqual(1, ConsumerEvent.objects.filter(consumer_id=consumers[0]['id']).count())
+        self.assertEqual(0, ConsumerEvent.objects.filter(consumer_id=consumers[1]['id']).count())
+
+    def test_wake_up_only_consumers_with_pending_events(self) -> None:
+        data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series_1',
+            'external_id': 'external_id1'
+        }, simulate_tenant=False)
+
+        consumers = [self.create_payload(data_series['consumers'], payload={
+            "external_id": f"my_consumer_{i}",
+            "name": f"my_consumer_name_{i}",
+            "target": "http://localhost:1/",
+            "headers": {},
+            "timeout": 10,
+            "retry_backoff_every": 0,
+            "retry_backoff_delay": 0,
+            "retry_max": 0
+        }) for i in range(0, 2)]
+
+        self.create_payload(data_series['data_points'], payload={
+            'external_id': 'data_point_0',
+            'payload': {}
+        })
+        # the second consumer is up to date
+        ConsumerEvent.objects.filter(consumer_id=consumers[1]['id']).update(state=ConsumerEventState.SUCCESS.value)
+
+        with mock.patch.object(actual_run_heartbeat_consumers, 'apply_async') as apply_async:
+            wake_up_heartbeat_consumers()
+
+        self.assertEqual(
+            [str(consumers[0]['id'])],
+            [str(call.kwargs['args'][1]) for call in apply_async.call_args_list]
+        )
+
+    def test_parse_notify_payload(self) -> None:
+        self.assertEqual(('tenant', 'consumer'), parse_notify_payload('tenant:consumer'))
+        self.assertIsNone(parse_notify_payload('tenant'))
+        self.assertIsNone(parse_notify_payload(':consumer'))
+
 
 class EventSystemMaxEventsTest(EventSystemTest):
     max_events = 100
\ No newline at end of file
@@ -0,0 +1,148 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+
+from typing import Any, Dict, List
+from unittest import mock
+
+from django.db import connections
+from rest_framework import status
+
+from skipper.core.tests.base import BaseViewTest
+from skipper.dataseries.models.metamodel.index import IndexByUUID, TargetTableType
+from skipper.dataseries.raw_sql import escape
+from skipper.dataseries.raw_sql.tenant import escaped_tenant_schema
+from skipper.dataseries.storage import actions as storage_actions
+from skipper.dataseries.storage.contract import IndexableDataSeriesChildType, StorageBackendType
+from skipper.dataseries.storage.dynamic_sql.materialized import materialized_table_name
+from skipper.dataseries.storage.dynamic_sql.tasks.ddl import user_defined_index
+from skipper.dataseries.tests.indexes.test_index_contracts import DATA_SERIES_BASE_URL
+from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
+
+
+class BaseIndexBuildStateTest(BaseViewTest):
+    storage_backend_type: StorageBackendType
+    expected_table_types: List[TargetTableType]
+
+    fact_json: Dict[str, Any]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.data_series_json = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_data_series_1',
+            'external_id': 'external_id1',
+            'backend': self.storage_backend_type.value
+        }, simulate_tenant=False)
+        self.fact_json = self.create_payload(self.data_series_json['float_facts'], payload={
+            'name': 'my_fact_name',
+            'external_id': 'my_fact',
+            'optional': True
+        })
+        self.index_json = self.create_payload(self.data_series_json['indexes'], payload={
+            'name': 'my_index_name',
+            'external_id': 'my_index',
+            'targets': [{
+                'target_type': IndexableDataSeriesChildType.FLOAT_FACT.value,
+                'target_id': self.fact_json['id']
+            }]
+        })
+
+    def test_built_index_is_ready(self) -> None:
+        self.assertEqual({'ready': True, 'progress': None}, self.index_json['build'])
+        index_json = self.get_payload(url=self.index_json['url'])
+        self.assertEqual({'ready': True, 'progress': None}, index_json['build'])
+
+    def test_unregistered_index_is_not_ready(self) -> None:
+        IndexByUUID.objects.filter(source_id=self.index_json['id']).delete()
+        index_json = self.get_payload(url=self.index_json['url'])
+        self.assertFalse(index_json['build']['ready'])
+        # no build is running, so there is no progress to report
+        self.assertEqual(
+            {target_table_type.value: None for target_table_type in self.expected_table_types},
+            index_json['build']['progress']
+        )
+
+    def test_list_fetches_build_states_at_once(self) -> None:
+        self.create_payload(self.data_series_json['indexes'], payload={
+            'name': 'my_other_index_name',
+            'external_id': 'my_other_index',
+            'targets': [{
+                'target_type': IndexableDataSeriesChildType.FLOAT_FACT.value,
+                'target_id': self.fact_json['id']
+            }]
+        })
+        IndexByUUID.objects.filter(source_id=self.index_json['id']).delete()
+
+        with mock.patch.object(
+                storage_actions, 'user_defined_index_build_states', wraps=storage_actions.user_defined_index_build_states
+        ) as build_states:
+            response = self.client.get(path=self.data_series_json['indexes'], format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, build_states.call_count)
+        indexes = response.json()
+
+        builds = {index['external_id']: index['build'] for index in indexes}
+        self.assertEqual({'ready': True, 'progress': None}, builds['my_other_index'])
+        self.assertEqual(
+            {'ready': False, 'progress': {target_table_type.value: None for target_table_type in self.expected_table_types}},
+            builds['my_index']
+        )
+
+    def test_invalid_index_is_rebuilt_until_giving_up(self) -> None:
+        with mock.patch.object(user_defined_index, '_index_is_valid', return_value=False), \
+                mock.patch.object(user_defined_index, '_drop_index') as drop_index:
+            with self.assertRaises(AssertionError):
+                user_defined_index._create_index(
+                    escaped_schema_name=escaped_tenant_schema('default_tenant'),
+                    unescaped_table_name=materialized_table_name(
+                        self.data_series_json['id'], self.data_series_json['external_id']
+                    ),
+                    index_rel_name=user_defined_index.index_rel_name(self.index_json['id']),
+                    escaped_target_columns=['"id"']
+                )
+        # the invalid index is dropped before every attempt to build it again
+        self.assertEqual(user_defined_index._MAX_INDEX_BUILD_ATTEMPTS, drop_index.call_count)
+
+
+    def test_invalid_index_is_only_dropped_under_the_build_lock(self) -> None:
+        escaped_schema_name = escaped_tenant_schema('default_tenant')
+        _index_rel_name = user_defined_index.index_rel_name(self.index_json['id'])
+        lock_name = f'user_defined_index:{escaped_schema_name}.{escape.escape(_index_rel_name)}'
+        connection = connections[DATA_SERIES_DYNAMIC_SQL_DB]
+        lock_held_while_dropping: List[bool] = []
+
+        def drop_index(*args: Any, **kwargs: Any) -> None:
+            # another worker must not get the lock while we drop the index
+            with connection.get_new_connection(connection.get_connection_params()) as other:
+                other.autocommit = True
+                acquired = other.execute(
+                    'SELECT pg_try_advisory_lock(hashtextextended(%s, 0))', [lock_name]
+                ).fetchone()[0]
+                lock_held_while_dropping.append(not acquired)
+
+        with mock.patch.object(user_defined_index, '_index_is_valid', side_effect=[False, True]), \
+                mock.patch.object(user_defined_index, '_drop_index', side_effect=drop_index):
+            user_defined_index._create_index(
+                escaped_schema_name=escaped_schema_name,
+                unescaped_table_name=materialized_table_name(
+                    self.data_series_json['id'], self.data_series_json['external_id']
+                ),
+                index_rel_name=_index_rel_name,
+                escaped_target_columns=['"id"']
+            )
+        self.assertEqual([True], lock_held_while_dropping)
+
+class IndexBuildStateTestMaterializedFlatHist(BaseIndexBuildStateTest):
+    storage_backend_type = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY
+    expected_table_types = [TargetTableType.MATERIALIZED, TargetTableType.FLAT_HISTORY]
+
+
+class IndexBuildStateTestNoHist(BaseIndexBuildStateTest):
+    storage_backend_type = StorageBackendType.DYNAMIC_SQL_NO_HISTORY
+    expected_table_types = [TargetTableType.MATERIALIZED]
+
+
+del BaseIndexBuildStateTest
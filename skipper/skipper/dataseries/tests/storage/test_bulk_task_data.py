@@ -0,0 +1,46 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+import datetime
+import uuid
+from unittest import TestCase
+
+from skipper.dataseries.storage.dynamic_sql.bulk_task_data import encode_validated_datas, decode_validated_datas
+
+
+class BulkTaskDataEncodingTest(TestCase):
+
+    def test_roundtrip_in_chunks(self) -> None:
+        validated_datas = [{
+            'external_id': str(idx),
+            'payload': {
+                'float': idx / 2,
+                'text': 'äöü' * idx,
+                'timestamp': datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+                'dimension': uuid.UUID(int=idx),
+                'json': {'nested': [idx, None]}
+            }
+        } for idx in range(7)]
+
+        encoded = encode_validated_datas(validated_datas, chunk_size=3)
+        decoded = list(decode_validated_datas(memoryview(encoded)))
+
+        self.assertEqual([3, 3, 1], [len(chunk) for chunk in decoded])
+        flat = [elem for chunk in decoded for elem in chunk]
+        self.assertEqual([elem['external_id'] for elem in validated_datas], [elem['external_id'] for elem in flat])
+        self.assertEqual('2024-01-01T00:00:00Z', flat[0]['payload']['timestamp'])
+        self.assertEqual(str(uuid.UUID(int=5)), flat[5]['payload']['dimension'])
+        self.assertEqual({'nested': [6, None]}, flat[6]['payload']['json'])
+        self.assertEqual('äöü' * 4, flat[4]['payload']['text'])
+
+    def test_empty(self) -> None:
+        self.assertEqual(b'', encode_validated_datas([], chunk_size=3))
+        self.assertEqual([], list(decode_validated_datas(b'')))
+
+    def test_truncated(self) -> None:
+        encoded = encode_validated_datas([{'external_id': '1', 'payload': {}}], chunk_size=3)
+        with self.assertRaises(ValueError):
+            list(decode_validated_datas(encoded[:-1]))
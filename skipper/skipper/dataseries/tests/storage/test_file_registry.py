@@ -4,10 +4,12 @@
 # This file is part of NF Compose
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
+import threading
 import uuid
 
 import datetime
 import pytz
+from typing import Any, List
 from django.test import TransactionTestCase
 from django.utils import timezone
 
@@ -125,6 +127,67 @@ class FileLookupRegistryTest(TransactionTestCase):
             file_name=file_name_2
         ))
 
+    def test_delete_bulk(self) -> None:
+        tenant = Tenant.objects.create(
+            name='default_tenant'
+        )
+
+        data_series_id = uuid.uuid4()
+        fact_id_1 = uuid.uuid4()
+        fact_id_2 = uuid.uuid4()
+
+        dp_1 = HistoryDataPointIdentifier(
+            data_point_id='dp_1',
+            sub_clock=1,
+            point_in_time=datetime.datetime.now(tz=pytz.utc)
+        )
+        dp_2 = HistoryDataPointIdentifier(
+            data_point_id='dp_2',
+            sub_clock=1,
+            point_in_time=datetime.datetime.now(tz=pytz.utc)
+        )
+        dp_3 = HistoryDataPointIdentifier(
+            data_point_id='dp_3',
+            sub_clock=1,
+            point_in_time=datetime.datetime.now(tz=pytz.utc)
+        )
+
+        for fact_id in [fact_id_1, fact_id_2]:
+            for dp in [dp_1, dp_2, dp_3]:
+                file_registry.register(
+                    tenant_id=tenant.id,
+                    data_series_id=data_series_id,
+                    fact_id=fact_id,
+                    history_data_point_identifier=dp,
+                    file_name=f'{fact_id}_{dp.data_point_id}'
+                )
+
+        file_registry.delete_all_matching_bulk(
+            tenant_id=tenant.id,
+            data_series_id=data_series_id,
+            fact_ids=[fact_id_1, fact_id_2],
+            history_data_point_identifiers=[dp_1]
+        )
+        file_registry.delete_all_for_datapoints(
+            tenant_id=tenant.id,
+            data_series_id=data_series_id,
+            fact_ids=[fact_id_1],
+            data_point_ids=[dp_2.data_point_id]
+        )
+
+        for fact_id, dp, exists in [
+            (fact_id_1, dp_1, False),
+            (fact_id_2, dp_1, False),
+            (fact_id_1, dp_2, False),
+            (fact_id_2, dp_2, True),
+            (fact_id_1, dp_3, True),
+            (fact_id_2, dp_3, True),
+        ]:
+            self.assertEqual(exists, file_registry.file_exists(
+                tenant_id=tenant.id,
+                file_name=f'{fact_id}_{dp.data_point_id}'
+            ))
+
     def test_garbage_collect_only_deletes_actually_deleted(self) -> None:
         tenant = Tenant.objects.create(
             name='default_tenant'
@@ -343,3 +406,175 @@ class FileLookupIntegrationTest(TransactionTestCase):
             data_point_id=history_data_point_identifier.data_point_id
         ).exists())
         self.assertEqual(1, FileLookup.objects.all().count())
+
+    def test_garbage_collect_in_chunks(self) -> None:
+        tenant = Tenant.objects.create(
+            name='default_tenant'
+        )
+
+        data_series_id = uuid.uuid4()
+        fact_id = uuid.uuid4()
+
+        history_data_point_identifiers = [HistoryDataPointIdentifier(
+            data_point_id=f'dp_{i}',
+            sub_clock=1,
+            point_in_time=datetime.datetime.now(tz=pytz.utc)
+        ) for i in range(0, 5)]
+
+        for i, history_data_point_identifier in enumerate(history_data_point_identifiers):
+            file_registry.register(
+                tenant_id=tenant.id,
+                data_series_id=data_series_id,
+                fact_id=fact_id,
+                history_data_point_identifier=history_data_point_identifier,
+                file_name=f'file_name_{i}'
+            )
+        # still referenced by an alive entry
+        file_registry.register(
+            tenant_id=tenant.id,
+            data_series_id=uuid.uuid4(),
+            fact_id=fact_id,
+            history_data_point_identifier=history_data_point_identifiers[0],
+            file_name='file_name_0'
+        )
+
+        file_registry.delete_all_matching(
+            tenant_id=tenant.id,
+            data_series_id=data_series_id,
+            fact_id=fact_id,
+            history_data_point_identifiers=history_data_point_identifiers
+        )
+
+        class BulkDeletingStorage:
+            def __init__(self) -> None:
+                self.deleted: List[str] = []
+
+            def delete(self, name: str) -> None:
+                raise AssertionError('should delete in bulk')
+
+            def delete_many(self, names: List[str]) -> None:
+                self.deleted.extend(names)
+
+        storage = BulkDeletingStorage()
+        file_registry.garbage_collect(
+            storage=storage,
+            older_than=datetime.datetime.now() + timezone.timedelta(days=7),
+            chunk_size=2
+        )
+
+        self.assertEqual([f'file_name_{i}' for i in range(1, 5)], sorted(storage.deleted))
+        self.assertEqual(1, FileLookup.all_objects.all().count())
+
+    def test_garbage_collect_keeps_files_of_not_yet_expired_entries(self) -> None:
+        tenant = Tenant.objects.create(
+            name='default_tenant'
+        )
+
+        data_series_id = uuid.uuid4()
+        fact_id = uuid.uuid4()
+        file_name = 'file_name'
+
+        dp_1 = HistoryDataPointIdentifier(
+            data_point_id='dp_1',
+            sub_clock=1,
+            point_in_time=datetime.datetime.now(tz=pytz.utc)
+        )
+        dp_2 = HistoryDataPointIdentifier(
+            data_point_id='dp_2',
+            sub_clock=1,
+            point_in_time=datetime.datetime.now(tz=pytz.utc)
+        )
+
+        for dp in [dp_1, dp_2]:
+            file_registry.register(
+                tenant_id=tenant.id,
+                data_series_id=data_series_id,
+                fact_id=fact_id,
+                history_data_point_identifier=dp,
+                file_name=file_name
+            )
+
+        file_registry.delete_all_matching(
+            tenant_id=tenant.id,
+            data_series_id=data_series_id,
+            fact_id=fact_id,
+            history_data_point_identifiers=[dp_1, dp_2]
+        )
+        older_than = datetime.datetime.now(tz=pytz.utc)
+        FileLookup.all_objects.filter(data_point_id='dp_1').update(
+            deleted_at=older_than - datetime.timedelta(days=1)
+        )
+        FileLookup.all_objects.filter(data_point_id='dp_2').update(
+            deleted_at=older_than + datetime.timedelta(days=1)
+        )
+
+        class FailingStorage:
+            def delete(self, name: str) -> None:
+                raise AssertionError('still referenced by a not yet expired entry')
+
+        file_registry.garbage_collect(
+            storage=FailingStorage(),
+            older_than=older_than
+        )
+        self.assertEqual(1, FileLookup.all_objects.all().count())
+
+        class RecordingStorage:
+            def __init__(self) -> None:
+                self.deleted: List[str] = []
+
+            def delete(self, name: str) -> None:
+                self.deleted.append(name)
+
+        storage = RecordingStorage()
+        file_registry.garbage_collect(
+            storage=storage,
+            older_than=older_than + datetime.timedelta(days=2)
+        )
+        self.assertEqual([file_name], storage.deleted)
+        self.assertEqual(0, FileLookup.all_objects.all().count())
+
+    def test_save_bulk(self) -> None:
+        tenant = Tenant.objects.create(
+            name='default_tenant'
+        )
+        data_series_id = uuid.uuid4()
+        fact_id = uuid.uuid4()
+
+        class _File:
+            def __init__(self, name: str) -> None:
+                self.name = name
+
+        class RecordingStorage:
+            def __init__(self) -> None:
+                self.saved: List[str] = []
+                self.lock = threading.Lock()
+
+            def save(self, name: str, file: Any) -> None:
+                with self.lock:
+                    self.saved.append(name)
+
+        files = [
+            file_registry.FileToSave(
+                fact_id=fact_id,
+                history_data_point_identifier=HistoryDataPointIdentifier(
+                    data_point_id=f'dp_{i}',
+                    sub_clock=1,
+                    point_in_time=datetime.datetime.now(tz=pytz.utc)
+                ),
+                file=_File(f'file_name_{i}')  # type: ignore
+            ) for i in range(0, 10)
+        ]
+
+        for concurrency in [1, 4]:
+            FileLookup.all_objects.all().hard_delete()  # type: ignore
+            storage = RecordingStorage()
+            file_registry.save_bulk(
+                storage=storage,
+                tenant_id=tenant.id,
+                data_series_id=data_series_id,
+                files=files,
+                concurrency=concurrency
+            )
+            self.assertEqual([f'file_name_{i}' for i in range(0, 10)], sorted(storage.saved))
+            for i in range(0, 10):
+                self.assertTrue(file_registry.file_exists(tenant_id=tenant.id, file_name=f'file_name_{i}'))
@@ -11,10 +11,21 @@ from time import sleep
 from PIL import Image as PIL_Image  # type: ignore
 from rest_framework import status
 from typing import Any, Dict, List, NamedTuple
+from unittest import mock
 
-from skipper import modules
+from django.db import connections
+
+from skipper import modules, settings
 from skipper.core.tests.base import BaseViewTest, BASE_URL
-from skipper.dataseries.storage.contract import StorageBackendType
+from skipper.dataseries.models import FileLookup
+from skipper.dataseries.models.metamodel.data_series import DataSeries
+from skipper.dataseries.models.metamodel.image_fact import DataSeries_ImageFact
+from skipper.dataseries.raw_sql import escape
+from skipper.dataseries.raw_sql.tenant import escaped_tenant_schema
+from skipper.dataseries.storage.contract import StorageBackendType, file_registry
+from skipper.dataseries.storage.contract.file_registry import HistoryDataPointIdentifier
+from skipper.dataseries.storage.dynamic_sql.materialized import materialized_flat_history_table_name
+from skipper.dataseries.storage.dynamic_sql.tasks.migrate import no_history_to_flat_history
 from urllib.parse import urljoin, urlparse
 
 DATA_SERIES_BASE_URL = BASE_URL + modules.url_representation(modules.Module.DATA_SERIES) + '/'
@@ -97,10 +108,11 @@ class BaseMigrationTest(BaseViewTest):
 
     initial_backend: StorageBackendType
     migrate_to_backend: StorageBackendType
+    online: bool = True
 
     counter = 0
 
-    def __setup_fixtures(self) -> Fixtures:
+    def _setup_fixtures(self) -> Fixtures:
         data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
             'name': f'my_data_series',
             'external_id': f'_external_id',
@@ -323,16 +335,22 @@ class BaseMigrationTest(BaseViewTest):
                 )
 
     def migrate(self, fixtures: Fixtures) -> Dict[str, Any]:
-        data_series = self.patch_payload(
-            url=fixtures.data_series['url'],
-            payload={
-                'backend': self.migrate_to_backend.value
-            }
-        )
+        return self.migrate_data_series(fixtures.data_series)
+
+    def migrate_data_series(self, data_series: Dict[str, Any]) -> Dict[str, Any]:
+        # a chunk size of 1 makes the online migration run over multiple chunks
+        with mock.patch.object(settings, 'SKIPPER_DATA_SERIES_ONLINE_BACKEND_MIGRATION', self.online), \
+                mock.patch.object(settings, 'SKIPPER_DATA_SERIES_BACKEND_MIGRATION_CHUNK_SIZE', 1):
+            data_series = self.patch_payload(
+                url=data_series['url'],
+                payload={
+                    'backend': self.migrate_to_backend.value
+                }
+            )
         return self._ensure_unlocked(data_series)
 
     def test_immediately_materialize(self) -> None:
-        fixtures = self.__setup_fixtures()
+        fixtures = self._setup_fixtures()
 
         data_series = self.migrate(fixtures)
 
@@ -347,7 +365,7 @@ class BaseMigrationTest(BaseViewTest):
         )
 
     def test_migrate_after_data(self) -> None:
-        fixtures = self.__setup_fixtures()
+        fixtures = self._setup_fixtures()
 
         initial_data = self.initial_payloads(fixtures)
 
@@ -371,7 +389,7 @@ class BaseMigrationTest(BaseViewTest):
         )
 
     def test_migrate_after_delete_one(self) -> None:
-        fixtures = self.__setup_fixtures()
+        fixtures = self._setup_fixtures()
 
         initial_data = self.initial_payloads(fixtures)
 
@@ -412,5 +430,160 @@ class FlatHistoryToNoHistoryMigrationTest(BaseMigrationTest):
     initial_backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY
     migrate_to_backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY
 
+    def test_migration_releases_files_of_history(self) -> None:
+        # the files are only registered, so that the test does not need any media storage
+        data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_float_data_series',
+            'external_id': 'my_float_data_series',
+            'backend': self.initial_backend.value
+        }, simulate_tenant=False)
+        self.create_payload(data_series['float_facts'], payload={
+            'name': 'my_float_fact',
+            'external_id': 'my_float_fact',
+            'optional': False
+        })
+        self.create_payload(data_series['image_facts'], payload={
+            'name': 'my_image_fact',
+            'external_id': 'my_image_fact',
+            'optional': True
+        })
+        data_points = [
+            self.create_payload(data_series['data_points'], payload={
+                'external_id': f'dp_{idx}',
+                'payload': {'my_float_fact': float(idx)}
+            })
+            for idx in range(2)
+        ]
+        response = self.client.patch(
+            path=data_points[0]['url'],
+            data={'payload': {'my_float_fact': 4.2}},
+            format='json'
+        )
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.delete_payload(url=data_points[1]['url'])
+
+        data_series_obj = DataSeries.objects.get(id=data_series['id'])
+        image_fact_id = DataSeries_ImageFact.objects.get(data_series_id=data_series_obj.id).fact_id
+        with connections[settings.DATA_SERIES_DYNAMIC_SQL_DB].cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT id, point_in_time, sub_clock
+                FROM {escaped_tenant_schema(data_series_obj.tenant.name)}.{escape.escape(
+                    materialized_flat_history_table_name(str(data_series_obj.id), data_series_obj.external_id)
+                )}
+                ORDER BY point_in_time, sub_clock
+                """
+            )
+            versions = cursor.fetchall()
+        # two versions of dp_0, the version and the deletion of dp_1
+        self.assertEqual(4, len(versions))
+        for idx, (data_point_id, point_in_time, sub_clock) in enumerate(versions):
+            file_registry.register(
+                tenant_id=data_series_obj.tenant.id,
+                data_series_id=data_series_obj.id,
+                fact_id=image_fact_id,
+                history_data_point_identifier=HistoryDataPointIdentifier(
+                    data_point_id=data_point_id,
+                    point_in_time=point_in_time,
+                    sub_clock=sub_clock
+                ),
+                file_name=f'version_{idx}.png'
+            )
+        current_version_idx = max(
+            idx for idx, (data_point_id, point_in_time, sub_clock) in enumerate(versions)
+            if data_point_id == data_points[0]['id']
+        )
+
+        self.migrate_data_series(data_series)
+
+        # only the current version of dp_0 still references its file
+        self.assertEqual(
+            [f'version_{current_version_idx}.png'],
+            list(FileLookup.objects.filter(data_series_id=data_series_obj.id).values_list('file_name', flat=True))
+        )
+
+
+class FlatHistoryToNoHistoryOfflineMigrationTest(FlatHistoryToNoHistoryMigrationTest):
+    online = False
+
+
+class NoHistoryToFlatHistoryMigrationTest(BaseMigrationTest):
+    initial_backend = StorageBackendType.DYNAMIC_SQL_NO_HISTORY
+    migrate_to_backend = StorageBackendType.DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY
+
+    def test_migrated_data_has_history(self) -> None:
+        fixtures = self._setup_fixtures()
+        created_payloads = self.insert_data(self.initial_payloads(fixtures), fixtures)
+
+        self.migrate(fixtures)
+
+        for created_payload in created_payloads:
+            history = self.get_payload(
+                fixtures.data_series['history_data_points'] + f'?external_id={created_payload["external_id"]}&include_versions'
+            )['data']
+            self.assertEqual(1, len(history[0]['versions']['data_point']))
+
+    def test_write_during_migration_keeps_previous_version(self) -> None:
+        # no files, so that the test does not need any media storage
+        data_series = self.create_payload(DATA_SERIES_BASE_URL + 'dataseries/', payload={
+            'name': 'my_float_data_series',
+            'external_id': 'my_float_data_series',
+            'backend': self.initial_backend.value
+        }, simulate_tenant=False)
+        self.create_payload(data_series['float_facts'], payload={
+            'name': 'my_float_fact',
+            'external_id': 'my_float_fact',
+            'optional': False
+        })
+        data_points = [
+            self.create_payload(data_series['data_points'], payload={
+                'external_id': f'dp_{idx}',
+                'payload': {'my_float_fact': float(idx)}
+            })
+            for idx in range(2)
+        ]
+
+        copy_chunk = no_history_to_flat_history._copy_chunk_to_flat_history
+        wrote = False
+
+        def write_before_copy_chunk(**kwargs: Any) -> List[str]:
+            nonlocal wrote
+            if not wrote:
+                wrote = True
+                # the data series is already unlocked, but none of the data points are copied yet
+                response = self.client.patch(
+                    path=data_points[1]['url'],
+                    data={'payload': {'my_float_fact': 4.2}},
+                    format='json'
+                )
+                self.assertEqual(status.HTTP_200_OK, response.status_code)
+            return copy_chunk(**kwargs)
+
+        with mock.patch.object(no_history_to_flat_history, '_copy_chunk_to_flat_history', write_before_copy_chunk):
+            self.migrate_data_series(data_series)
+        self.assertEqual(self.online, wrote)
+
+        history = self.get_payload(data_series['history_data_points'] + '?external_id=dp_1&include_versions')['data']
+        # the version from before the migration is kept, followed by the one of the write
+        expected = [no_history_to_flat_history.MIGRATION_RECORD_SOURCE]
+        if self.online:
+            expected.append('REST API PATCH')
+        self.assertEqual(expected, [version['record_source'] for version in history[0]['versions']['data_point']])
+
+        # once migrated, writes do not take part in the migration anymore
+        self.assertFalse(DataSeries.objects.get(id=data_series['id']).backend_migration_in_progress)
+        with mock.patch.object(no_history_to_flat_history, 'copy_on_write') as copy_on_write:
+            response = self.client.patch(
+                path=data_points[0]['url'],
+                data={'payload': {'my_float_fact': 2.4}},
+                format='json'
+            )
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+        copy_on_write.assert_not_called()
+
+
+class NoHistoryToFlatHistoryOfflineMigrationTest(NoHistoryToFlatHistoryMigrationTest):
+    online = False
+
 
 del BaseMigrationTest
@@ -17,15 +17,18 @@ from rest_framework.parsers import JSONParser, BaseParser
 from rest_framework.renderers import JSONRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
-from typing import Any, Optional, List, Dict, IO
+from typing import Any, Optional, List, Dict, IO, Iterable, Iterator, Set, Union
 
+from skipper.core.utils.functions import chunks
 from skipper.core.utils.memoize import Memoize
-from skipper.dataseries.models import DATASERIES_PERMISSION_KEY_DATA_POINT_BULK
+from skipper import settings
+from skipper.dataseries.models import DATASERIES_PERMISSION_KEY_DATA_POINT_BULK, ds_permission_for_rest_method
 from skipper.dataseries.models.metamodel.data_series import DataSeries
 from skipper.dataseries.parsers.multipart import DataPointMultipartFormencodeParser
 from skipper.dataseries.raw_sql import dbtime
 from skipper.dataseries.storage.contract.view import EmptySerializer, \
     StorageViewAdapter
+from skipper.dataseries.storage.uuid import gen_uuid
 from skipper.dataseries.storage.views import storage_view_adapter
 from skipper.dataseries.views.common import get_dataseries_permissions_class
 from skipper.dataseries.views.contract import get_data_series_object
@@ -34,6 +37,21 @@ from skipper.core.renderers import CustomizableBrowsableAPIRendererObjectMixin,
 from skipper.dataseries.views.metamodel.permissions import metamodel_base_line_permissions
 
 
+STREAMING_HEADER = 'HTTP_X_BULK_DATA_POINT_STREAMING'
+
+
+class StreamedBatch:
+    """
+    batch of a CSV upload in streaming mode. The rows are only parsed from the request
+    stream while iterating, so this can be iterated only once.
+    """
+    def __init__(self, rows: Iterator[Dict[str, Any]]) -> None:
+        self.rows = rows
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.rows
+
+
 class BatchCSVParser(BaseParser):
     """
     parser that uses variable_decode to read the csv header
@@ -41,27 +59,31 @@ class BatchCSVParser(BaseParser):
     """
     media_type = 'text/csv-json-formencode'
 
-    def dictreader(self, lines: List[str]) -> csv.DictReader:  # type: ignore
+    def dictreader(self, lines: Iterable[str]) -> csv.DictReader:  # type: ignore
         return csv.DictReader(lines)
 
     def parse(self, stream: IO[Any], media_type: Any = None, parser_context: Any = None) -> parsers.DataAndFiles:  # type: ignore
-        lines = [line.decode('utf-8') for line in stream]
-        result = list(self.dictreader(lines))
+        rows = map(variable_decode, self.dictreader(line.decode('utf-8') for line in stream))
 
-        actual_result = list(map(variable_decode, result))
+        request = parser_context.get('request') if parser_context is not None else None
+        batch: Any
+        if request is not None and request.META.get(STREAMING_HEADER) == 'true':
+            batch = StreamedBatch(rows)
+        else:
+            batch = list(rows)
 
         parser_context['__FILES_SUPPORTED__'] = False
         parser_context['__JSON_AS_STRING__'] = False
 
         return parsers.DataAndFiles({
-            "batch": actual_result
+            "batch": batch
         }, {})
 
 
 class BatchCSVParserSemicolon(BatchCSVParser):
     media_type = 'text/csv-semicolon-json-formencode'
 
-    def dictreader(self, lines: List[str]) -> csv.DictReader:  # type: ignore
+    def dictreader(self, lines: Iterable[str]) -> csv.DictReader:  # type: ignore
         return csv.DictReader(lines, delimiter=';')
 
 
@@ -88,6 +110,13 @@ class DataSeriesBulkCreateView(CustomizableBrowsableAPIRendererObjectMixin,
     respectively)
     Columns in text/csv-form-encode can not be set to null if they are included in the header.
 
+    CSV uploads can be streamed by setting the Header X-BULK-DATA-POINT-STREAMING to 'true'. The rows are then
+    validated and stored in chunks while the upload is still being read, all chunks are still committed
+    together. Validation errors are reported by row number (starting at 0) instead of as a list with an entry per row.
+
+    If the data series has skip_unchanged_data_points set in its extra_config, data points whose payload did not
+    change are not written again and not part of created_external_ids (synchronous mode only).
+
     Async mode does not have the same guarantees as synchronous mode and should only be used either when doing an initial
     sync that is monitored closely or when durability is not 100% needed - e.g. when listening to sensor data or storing
     events.
@@ -147,10 +176,10 @@ class DataSeriesBulkCreateView(CustomizableBrowsableAPIRendererObjectMixin,
             raise ValidationError('batch was not in request data. If you are using CSV,'
                                   'check if it is formatted correctly')
 
-        if not isinstance(data['batch'], list):
+        if not isinstance(data['batch'], (list, StreamedBatch)):
             raise ValidationError('expected batch to be a list')
 
-        batch: List[Dict[str, Any]] = data['batch']
+        batch: Union[List[Dict[str, Any]], StreamedBatch] = data['batch']
 
         _async_in_request: bool = False
 
@@ -165,6 +194,9 @@ class DataSeriesBulkCreateView(CustomizableBrowsableAPIRendererObjectMixin,
         # only allow async if files are empty
         asynchronous: bool = _async_in_request and not had_files
 
+        if isinstance(batch, StreamedBatch):
+            return self.post_streamed(batch, asynchronous)
+
         created_external_ids = self.storage_view_adapter().create_bulk(
             view=self,
             point_in_time_timestamp=dbtime.now().timestamp(),
@@ -178,3 +210,148 @@ class DataSeriesBulkCreateView(CustomizableBrowsableAPIRendererObjectMixin,
         return Response({
             'created_external_ids': created_external_ids
         }, status=status.HTTP_201_CREATED)
+
+    def post_streamed(self, batch: StreamedBatch, asynchronous: bool) -> Response:
+        point_in_time_timestamp = dbtime.now().timestamp()
+        sub_clock = dbtime.dp_sub_clock(tenant=self.access_data_series().tenant)
+
+        created_external_ids: List[str] = []
+        seen_external_ids: Set[str] = set()
+        offset = 0
+        chunk: Iterable[Dict[str, Any]]
+        # everything is still done in a single transaction, but only one chunk is in memory at a time
+        with transaction.atomic(using=settings.DATA_SERIES_DYNAMIC_SQL_DB_BULK):
+            for chunk in chunks(batch, size=settings.SKIPPER_DATA_SERIES_BULK_BATCH_SIZE):  # type: ignore
+                chunk_list: List[Dict[str, Any]] = list(chunk)
+                if offset + len(chunk_list) > settings.SKIPPER_DATA_SERIES_BULK_TASK_SIZE:
+                    raise ValidationError(f'number of datapoints in request exceed limit of {settings.SKIPPER_DATA_SERIES_BULK_TASK_SIZE}')
+
+                try:
+                    chunk_external_ids = self.storage_view_adapter().create_bulk(
+                        view=self,
+                        point_in_time_timestamp=point_in_time_timestamp,
+                        user_id=str(self.request.user.id),
+                        record_source='REST API (bulk)',
+                        batch=chunk_list,
+                        asynchronous=asynchronous,
+                        sub_clock=sub_clock
+                    )
+                except ValidationError as e:
+                    if isinstance(e.detail, list) and len(e.detail) == len(chunk_list):
+                        # per row errors of the chunk
+                        raise ValidationError({
+                            str(offset + idx): row_errors for idx, row_errors in enumerate(e.detail) if row_errors
+                        })
+                    raise
+
+                # the chunk is valid at this point, but unchanged data points (skip_unchanged_data_points)
+                # are not part of chunk_external_ids, so check the rows themselves
+                row_external_ids = [str(row['external_id']) for row in chunk_list]
+                _duplicated_external_ids = [elem for elem in row_external_ids if elem in seen_external_ids]
+                if len(_duplicated_external_ids) > 0:
+                    raise ValidationError('the following external_ids were duplicated in this batch: [' +
+                                          ','.join(_duplicated_external_ids) + ']')
+                seen_external_ids.update(row_external_ids)
+                created_external_ids.extend(chunk_external_ids)
+                offset += len(chunk_list)
+
+        return Response({
+            'created_external_ids': created_external_ids
+        }, status=status.HTTP_201_CREATED)
+
+
+class _BulkDeletePermission(get_dataseries_permissions_class(DATASERIES_PERMISSION_KEY_DATA_POINT_BULK)):  # type: ignore
+    # deleting is done via POST (DELETE with a body is not supported by all clients/proxies)
+    # but requires the DELETE permission
+    perms_map = {
+        **get_dataseries_permissions_class(DATASERIES_PERMISSION_KEY_DATA_POINT_BULK).perms_map,
+        'POST': [f'dataseries.{ds_permission_for_rest_method("DELETE", DATASERIES_PERMISSION_KEY_DATA_POINT_BULK)}'],
+    }
+
+
+class DataSeriesBulkDeleteView(CustomizableBrowsableAPIRendererObjectMixin,
+                               GenericAPIView,  # type: ignore
+    ):
+    """
+    Accepts either a list of data point ids { "ids": [...] } or a list of external ids { "external_ids": [...] }
+    and deletes all of them that exist. Unknown ids are ignored.
+
+    Returns the ids and external ids of all deleted data points.
+    """
+
+    permission_classes = [
+        *metamodel_base_line_permissions,
+        _BulkDeletePermission
+    ]
+
+    renderer_classes = [JSONRenderer, CustomizableBrowsableAPIRenderer]
+    parser_classes = [JSONParser]
+
+    _storage_view_adapter: Optional[StorageViewAdapter] = None
+
+    data_series_memo: Memoize[Any, Optional[DataSeries]]
+
+    def __init__(self, **kwargs: Any):
+        super().__init__()
+
+        def _access_data_series(data: Any) -> Optional[DataSeries]:
+            return get_data_series_object(self.kwargs, DATASERIES_PERMISSION_KEY_DATA_POINT_BULK, self.request, method='DELETE')
+
+        self.data_series_memo = Memoize(_access_data_series)
+
+    def get_name_string(self) -> str:
+        return f'{self.access_data_series().name} - Data Point Bulk Delete'
+
+    def access_data_series(self) -> DataSeries:
+        _data_series = self.data_series_memo(())
+        if _data_series is None:
+            raise NotFound('dataseries not found')
+        else:
+            return _data_series
+
+    def get_queryset(self) -> QuerySet[Any]:
+        # check permission
+        self.access_data_series()
+        return self.storage_view_adapter().get_empty_queryset()
+
+    def storage_view_adapter(self) -> StorageViewAdapter:
+        if self._storage_view_adapter is None:
+            self._storage_view_adapter = storage_view_adapter(self.access_data_series().get_backend_type())
+        return self._storage_view_adapter
+
+    def get_serializer_class(self) -> Any:
+        return EmptySerializer
+
+    def post(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        data = request.data
+
+        if ('ids' in data) == ('external_ids' in data):
+            raise ValidationError('expected exactly one of ids or external_ids in request data')
+
+        key = 'ids' if 'ids' in data else 'external_ids'
+        identifiers = data[key]
+        if not isinstance(identifiers, list) or not all(isinstance(elem, str) for elem in identifiers):
+            raise ValidationError({key: 'expected a list of strings'})
+
+        if len(identifiers) > settings.SKIPPER_DATA_SERIES_BULK_TASK_SIZE:
+            raise ValidationError(f'number of datapoints in request exceed limit of {settings.SKIPPER_DATA_SERIES_BULK_TASK_SIZE}')
+
+        data_series_id = self.access_data_series().id
+        if key == 'external_ids':
+            data_point_ids = [gen_uuid(data_series_id=data_series_id, external_id=elem) for elem in identifiers]
+        else:
+            data_point_ids = identifiers
+
+        deleted = self.storage_view_adapter().delete_bulk(
+            view=self,
+            user_id=str(self.request.user.id),
+            record_source='REST API (bulk delete)',
+            data_point_ids=data_point_ids,
+            point_in_time=dbtime.now(),
+            sub_clock=dbtime.dp_sub_clock(tenant=self.access_data_series().tenant)
+        )
+
+        return Response({
+            'deleted_ids': [elem.id for elem in deleted],
+            'deleted_external_ids': [elem.external_id for elem in deleted]
+        }, status=status.HTTP_200_OK)
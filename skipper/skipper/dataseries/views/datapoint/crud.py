@@ -6,13 +6,12 @@
 
 import json
 
-from django.http import HttpRequest
+from django.http import HttpRequest, StreamingHttpResponse
 from django.utils.safestring import SafeString
 from rest_framework.exceptions import NotFound, APIException, ValidationError
 from rest_framework.mixins import RetrieveModelMixin, UpdateModelMixin, DestroyModelMixin, ListModelMixin
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import BasePermission
-from rest_framework.renderers import JSONRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
@@ -30,15 +29,15 @@ from skipper.dataseries.storage import views
 from skipper.dataseries.storage.contract import StorageBackendType
 from skipper.dataseries.storage.contract.models import DisplayDataPoint
 from skipper.dataseries.storage.contract.view import EmptySerializer, BaseDataSeries_DataPointViewSet, \
-    StorageViewAdapter
+    StorageViewAdapter, EXPORT_FORMATS, EXPORT_FORMAT_NDJSON, EXPORT_FORMAT_CSV
 from skipper.dataseries.storage.uuid import gen_uuid
 from skipper.dataseries.views.common import HasDataSeriesGlobalReadPermission, get_dataseries_permissions_class
 from skipper.dataseries.views.contract import get_data_series_object
 from skipper.dataseries.views.datapoint.external_id import use_external_id_as_dimension_identifier
 from skipper.dataseries.views.datapoint.point_in_time import PointInTimeMixin
 from skipper.core.renderers import CustomizableBrowsableAPIRendererObjectMixin, \
-    CustomizableBrowsableAPIRenderer
-from skipper.pagination import IdBasedPagination
+    CustomizableBrowsableAPIRenderer, PassThroughJSONRenderer
+from skipper.pagination import IdBasedPagination, get_count_mode, COUNT_ESTIMATE
 
 
 def gen_DataSeries_DataPointViewSet(
@@ -63,7 +62,7 @@ def gen_DataSeries_DataPointViewSet(
 
         skipper_base_name = base_name
 
-        renderer_classes = [JSONRenderer, CustomizableBrowsableAPIRenderer]
+        renderer_classes = [PassThroughJSONRenderer, CustomizableBrowsableAPIRenderer]
         parser_classes = [JSONParser, DataPointMultipartFormencodeParser]
 
         pagination_class = IdBasedPagination
@@ -119,6 +118,25 @@ def gen_DataSeries_DataPointViewSet(
 
             return ret
 
+        def export(self, request: Request, *args: Any, **kwargs: Any) -> StreamingHttpResponse:
+            """
+            streams all data points matching the same query parameters as the list view
+            (without pagination) as newline delimited json or csv (export_format=ndjson|csv)
+            """
+            if not StorageBackendType.from_string(self.access_data_series().backend).has_history() and _history:
+                raise ValidationError({"error": f"data_series backend {self.access_data_series().backend} does not support history"})
+
+            export_format = request.GET.get('export_format', EXPORT_FORMAT_NDJSON)
+            if export_format not in EXPORT_FORMATS:
+                raise ValidationError({"export_format": f"must be one of {', '.join(EXPORT_FORMATS)}"})
+
+            response = StreamingHttpResponse(
+                self.storage_view_adapter().export_data_points(self, export_format),
+                content_type='text/csv; charset=utf-8' if export_format == EXPORT_FORMAT_CSV else 'application/x-ndjson'
+            )
+            response['Content-Disposition'] = f'attachment; filename="{self.access_data_series().external_id}.{export_format}"'
+            return response
+
         def storage_view_adapter(self) -> StorageViewAdapter:
             if self._storage_view_adapter is None:
                 self._storage_view_adapter = views.storage_view_adapter(self.access_data_series().get_backend_type())
@@ -235,13 +253,10 @@ def gen_DataSeries_DataPointViewSet(
             return False
 
         def get_total_count_for_pagination(self, request: HttpRequest) -> Optional[int]:
-            if 'count' in request.GET:
-                cnt_query_val = request.GET['count']
-                if cnt_query_val is None or cnt_query_val == '' or cnt_query_val == 'true':
-                    return self.storage_view_adapter().data_point_count(self)
-                return None
-            else:
+            count_mode = get_count_mode(request, default=None)
+            if count_mode is None:
                 return None
+            return self.storage_view_adapter().data_point_count(self, estimate=count_mode == COUNT_ESTIMATE)
 
         def get_serializer_class(self) -> Type[Serializer[DisplayDataPoint]]:
             try:
@@ -283,7 +298,7 @@ def gen_DataSeries_DataPointViewSet(
             - changes_since=&lt;timestamp&gt;<br>
             - filter={{"$or": [{{"&lt;dimension/fact external id&gt;": "&lt;some-value&gt;", ...}}, {{"&lt;dimension/fact external id&gt;": "&lt;some-other-value&gt;", ...}}]}}
                 (supports logical operators $or, $and, $not and primitive operators $eq, $lt, $lte, $ne, $gte, $gt, $in, $nin, $prefix)<br>
-            - count[=true] <br>
+            - count[=true|estimate] (estimate uses the row estimate of the query planner, marked by count_is_estimate in the response) <br>
             - external_id=<str> (repeatable) <br>
             - identify_dimensions_by_external_id[=true] <br>
             - include_in_payload=<str> (comma separated list of dimension/fact external ids to include in the payload) <br>
@@ -26,7 +26,7 @@ from skipper.dataseries.views.common import get_dataseries_permissions_class, Ha
 from skipper.dataseries.views.contract import get_data_series_object
 from skipper.dataseries.views.datapoint.external_id import use_external_id_as_dimension_identifier
 from skipper.dataseries.views.metamodel.permissions import metamodel_base_line_permissions
-from skipper.settings import DATA_SERIES_DYNAMIC_SQL_DB
+from skipper.core.db_routers import data_point_read_db
 from skipper.core.lint import sql_cursor
 from skipper.dataseries.views.datapoint.point_in_time import PointInTimeMixin
 from skipper.dataseries.storage.contract import StorageBackendType
@@ -74,8 +74,9 @@ class DataSeriesCubeSQLView(
         return False
 
     def get(self, request: Request, **kwargs: str) -> HttpResponse:
-        with transaction.atomic():
-            with sql_cursor(DATA_SERIES_DYNAMIC_SQL_DB) as cursor:
+        read_db = data_point_read_db()
+        with transaction.atomic(using=read_db):
+            with sql_cursor(read_db) as cursor:
                 data_series = get_data_series_object(
                     kwargs_object=kwargs,
                     action=DATASERIES_PERMISSION_KEY_CUBE_SQL,
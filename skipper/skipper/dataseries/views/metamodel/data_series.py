@@ -55,6 +55,9 @@ class DataSeriesViewSet(
     These are usually optional parameters such as:
         - auto_clean_history_after_days [int]
         - auto_clean_meta_model_after_days [int]
+        - skip_unchanged_data_points [bool]: data points in bulk uploads whose payload did not change are
+          not written again (no new history entry, no change event). Not used for
+          data series with image or file facts.
 
     Not all dataseries backends support all extra config parameters.
     Backends may also use this to configure special properties that
@@ -22,6 +22,7 @@ from skipper.dataseries.models.metamodel.base_fact import BaseFact
 from skipper.dataseries.models.metamodel.boolean_fact import BooleanFact
 from skipper.dataseries.models.metamodel.consumer import Consumer
 from skipper.dataseries.models.metamodel.index import UserDefinedIndex, get_indexes_by_target_id
+from skipper.dataseries.models.metamodel.data_series import rotate_structure_version
 from skipper.dataseries.models.metamodel.dimension import Dimension
 from skipper.dataseries.models.metamodel.file_fact import FileFact
 from skipper.dataseries.models.metamodel.float_fact import FloatFact
@@ -99,6 +100,12 @@ def relation_dataseries_child_view_set(
                     })
             return super().destroy(request, *args, **kwargs)
 
+        def perform_destroy(self, instance: Any) -> None:
+            data_series = get_data_series_object(self.kwargs, permission_key, self.request)
+            super().perform_destroy(instance)
+            if data_series is not None:
+                rotate_structure_version(data_series.id)
+
         def get_description_string(self) -> str:
             return SafeString(view_description_string)
 
@@ -313,7 +320,9 @@ DataSeries_UserDefinedIndexViewSet = relation_dataseries_child_view_set(
 
     target_type must be one of: <br>
     "FLOAT_FACT", "STRING_FACT", "TIMESTAMP_FACT", "TEXT_FACT", "IMAGE_FACT", "FILE_FACT", "JSON_FACT", "BOOLEAN_FACT", "DIMENSION" <br>
-    At least one of target_id or target_external_id must be specified. If both are specified, they must match the same Fact/Dimension.
+    At least one of target_id or target_external_id must be specified. If both are specified, they must match the same Fact/Dimension.<br>
+    Indexes are built in the background without blocking writes to the data series. Until an index can be used,
+    build.ready is false and build.progress contains the progress of the build per table.
     """,
     permission_key=DATASERIES_PERMISSION_KEY_STRUCTURE_ELEMENT
 
@@ -0,0 +1,44 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+Support code for the psycopg connection pool of the gunicorn workers (see DATABASES in settings_env.py).
+
+All greenlets of a worker share the pool, so whatever session state a request leaves
+on its connection must be gone before the connection is checked out again.
+"""
+
+from typing import Any
+
+from psycopg import sql
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+def reset_pooled_connection(conn: Any) -> None:
+    """
+    reset callback of the pool, called whenever a connection is returned to it.
+    The pool already rolled back any open transaction at this point.
+
+    RESET ALL restores every setting to the value the connection was opened with, this
+    includes the search_path that is passed via the connection options and the default
+    transaction isolation level. It also reverts the time zone (and the role, if one is configured)
+    that django sets only once after the pool opened the connection, so these are applied again here.
+    """
+    # all databases share the connection settings of the default one (see DATABASES)
+    connection = connections[DEFAULT_DB_ALIAS]
+    time_zone = connection.timezone_name
+    role = connection.settings_dict['OPTIONS'].get('assume_role')
+
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        conn.execute('RESET ALL')
+        if time_zone:
+            conn.execute("SELECT set_config('TimeZone', %s, false)", [time_zone])
+        if role:
+            conn.execute(sql.SQL('SET ROLE {}').format(sql.Identifier(role)))
+    finally:
+        conn.autocommit = autocommit
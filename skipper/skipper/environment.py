@@ -32,6 +32,14 @@ whether we are running via run.sh (locally)
 
 SKIPPER_GUNICORN_WORKER_CONCURRENCY = int(os.environ.get('SKIPPER_GUNICORN_WORKER_CONCURRENCY', '2'))
 SKIPPER_GUNICORN_WORKER_DB_POOL_TIMEOUT = int(os.environ.get('SKIPPER_GUNICORN_WORKER_DB_POOL_TIMEOUT', '10'))
+SKIPPER_GUNICORN_WORKER_DB_POOL_MIN_SIZE = int(os.environ.get('SKIPPER_GUNICORN_WORKER_DB_POOL_MIN_SIZE', str(max(2, SKIPPER_GUNICORN_WORKER_CONCURRENCY))))
+SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_SIZE = int(os.environ.get('SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_SIZE', str(max(SKIPPER_GUNICORN_WORKER_DB_POOL_MIN_SIZE, SKIPPER_GUNICORN_WORKER_CONCURRENCY))))
+"""
+connections are shared between all greenlets of a worker, requests wait for up to
+SKIPPER_GUNICORN_WORKER_DB_POOL_TIMEOUT seconds if all of them are in use
+"""
+SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_IDLE = float(os.environ.get('SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_IDLE', '600'))
+SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_LIFETIME = float(os.environ.get('SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_LIFETIME', '3600'))
 
 SKIPPER_CELERY_WORKER_CONCURRENCY = int(os.environ.get('SKIPPER_CELERY_WORKER_CONCURRENCY', '20'))
 SKIPPER_CELERY_WORKER_DB_POOL_TIMEOUT = int(os.environ.get('SKIPPER_CELERY_WORKER_DB_POOL_TIMEOUT', '60'))
@@ -45,6 +53,75 @@ SKIPPER_TESTING = os.environ.get('SKIPPER_TESTING', 'false') == 'true'
 
 SKIPPER_DATA_SERIES_BULK_TASK_SIZE = int(os.environ.get('SKIPPER_DATA_SERIES_BULK_TASK_SIZE', '5000'))
 SKIPPER_DATA_SERIES_BULK_BATCH_SIZE = int(os.environ.get('SKIPPER_DATA_SERIES_BULK_BATCH_SIZE', '250'))
+SKIPPER_DATA_SERIES_BULK_COPY_THRESHOLD = int(os.environ.get('SKIPPER_DATA_SERIES_BULK_COPY_THRESHOLD', '20'))
+"""
+minimum number of data points in a chunk for which we stage the data via COPY
+and upsert it in a single statement instead of one statement per data point. 0 disables this.
+"""
+SKIPPER_DATA_SERIES_BULK_FILE_UPLOAD_CONCURRENCY = int(os.environ.get('SKIPPER_DATA_SERIES_BULK_FILE_UPLOAD_CONCURRENCY', '8'))
+"""
+maximum number of files of a chunk that are uploaded to S3 at the same time. 1 uploads them one after another.
+"""
+SKIPPER_DATA_SERIES_ONLINE_BACKEND_MIGRATION = os.environ.get('SKIPPER_DATA_SERIES_ONLINE_BACKEND_MIGRATION', 'true') == 'true'
+"""
+whether changing the backend of a data series between DYNAMIC_SQL_NO_HISTORY and DYNAMIC_SQL_MATERIALIZED_FLAT_HISTORY
+copies/prunes the data in chunks while the data series stays writable. If disabled, the data series is locked
+until the whole migration is done.
+"""
+SKIPPER_DATA_SERIES_BACKEND_MIGRATION_CHUNK_SIZE = int(os.environ.get('SKIPPER_DATA_SERIES_BACKEND_MIGRATION_CHUNK_SIZE', '10000'))
+"""
+number of data points handled per transaction by an online backend migration
+"""
+SKIPPER_S3_MULTIPART_THRESHOLD = int(os.environ.get('SKIPPER_S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+SKIPPER_S3_MULTIPART_CHUNKSIZE = int(os.environ.get('SKIPPER_S3_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+"""
+files of at least SKIPPER_S3_MULTIPART_THRESHOLD bytes are uploaded via S3 multipart upload in parts of this size
+"""
+SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_TIMEOUT = int(os.environ.get('SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_TIMEOUT', '3600'))
+"""
+seconds the structure information of a data series is shared between processes via redis. 0 disables the shared cache.
+"""
+SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_LOCAL_SIZE = int(os.environ.get('SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_LOCAL_SIZE', '256'))
+"""
+number of data series structures kept in memory per process. 0 disables the process local cache.
+"""
+SKIPPER_AUTH_CREDENTIAL_CACHE_TIMEOUT = int(os.environ.get('SKIPPER_AUTH_CREDENTIAL_CACHE_TIMEOUT', '30'))
+"""
+seconds a successfully verified Basic/PreSharedToken credential (and the tenant of its user)
+is remembered per process, so that the password hash does not have to be recomputed on every request.
+Changing the password or deactivating the user invalidates the entry immediately. 0 disables the cache.
+"""
+SKIPPER_AUTH_CREDENTIAL_CACHE_SIZE = int(os.environ.get('SKIPPER_AUTH_CREDENTIAL_CACHE_SIZE', '1024'))
+"""
+maximum number of verified credentials kept in memory per process.
+"""
+SKIPPER_DB_READ_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('SKIPPER_DB_READ_REPLICA_MAX_LAG_SECONDS', '5'))
+"""
+reads fall back to the primary while the replica (SKIPPER_DB_READ_REPLICA_HOSTS) lags behind more than this
+"""
+SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL', '1'))
+"""
+seconds the measured replica lag is reused per process before it is checked again
+"""
+SKIPPER_FLOW_ROUTING_CACHE_TIMEOUT = int(os.environ.get('SKIPPER_FLOW_ROUTING_CACHE_TIMEOUT', '30'))
+"""
+seconds the routing table of the flow auth_request endpoints (active endpoints and the endpoints a user may use)
+is cached per process. Changes to endpoints, engines or permissions invalidate the tables of all processes
+immediately (via redis), the timeout only bounds changes made without signals. 0 disables the cache.
+"""
+SKIPPER_FLOW_ROUTING_CACHE_SIZE = int(os.environ.get('SKIPPER_FLOW_ROUTING_CACHE_SIZE', '1024'))
+"""
+maximum number of routing tables/per user endpoint sets kept in memory per process.
+"""
+SKIPPER_S3_PRESIGNED_URL_CACHE_TIMEOUT = int(os.environ.get('SKIPPER_S3_PRESIGNED_URL_CACHE_TIMEOUT', '900'))
+"""
+seconds a presigned url of a media file is reused per process. Capped at half of the expiry of the
+signature so that handed out urls always stay valid for a while. 0 disables the cache.
+"""
+SKIPPER_S3_PRESIGNED_URL_CACHE_SIZE = int(os.environ.get('SKIPPER_S3_PRESIGNED_URL_CACHE_SIZE', '10000'))
+"""
+maximum number of presigned urls kept in memory per process.
+"""
 SKIPPER_SELF_UPSTREAM = os.environ.get('SKIPPER_SELF_UPSTREAM', 'http://skipper.local:8000')
 
 
@@ -27,13 +27,29 @@ SKIPPER_TASK_DASHBOARD_UPSTREAM = os.environ.get('SKIPPER_TASK_DASHBOARD_UPSTREA
 # dataseries consumers
 
 SKIPPER_CELERY_EVENT_QUEUE_MAX_EVENTS_PER_CONSUMER_HEARTBEAT = int(os.environ.get('SKIPPER_CELERY_EVENT_QUEUE_MAX_EVENTS_PER_CONSUMER_HEARTBEAT', 200))
+# batched consumers need a lot less requests for the same amount of events, so towards the limits of a heartbeat
+# this many events of a batched consumer count as a single event (but never more than one batch)
+SKIPPER_CELERY_EVENT_QUEUE_BATCHED_EVENTS_PER_HEARTBEAT_UNIT = int(os.environ.get('SKIPPER_CELERY_EVENT_QUEUE_BATCHED_EVENTS_PER_HEARTBEAT_UNIT', 10))
+if SKIPPER_CELERY_EVENT_QUEUE_BATCHED_EVENTS_PER_HEARTBEAT_UNIT <= 0:
+    raise ValueError('SKIPPER_CELERY_EVENT_QUEUE_BATCHED_EVENTS_PER_HEARTBEAT_UNIT must be a positive integer')
 
+# consumers are woken up via NOTIFY as soon as events are committed (see run_consumer_event_dispatcher),
+# the heartbeat schedule is the safety net for notifications that were missed. It also is the only wake up
+# if no dispatcher runs, so only deployments that run one should relax it
+SKIPPER_CONSUMER_EVENT_NOTIFY_ENABLED = os.environ.get('SKIPPER_CONSUMER_EVENT_NOTIFY_ENABLED', 'true') == 'true'
+SKIPPER_CONSUMER_EVENT_DISPATCHER_COLLECT_SECONDS = float(os.environ.get('SKIPPER_CONSUMER_EVENT_DISPATCHER_COLLECT_SECONDS', 1))
 SKIPPER_CELERY_EVENT_QUEUE_HEARTBEAT_SCHEDULE = int(os.environ.get('SKIPPER_CELERY_EVENT_QUEUE_HEARTBEAT_SCHEDULE', 10))
 SKIPPER_CELERY_EVENT_QUEUE_CLEANUP_SCHEDULE = os.environ.get('SKIPPER_CELERY_EVENT_QUEUE_CLEANUP_SCHEDULE', '0 1 * * *')
 SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_SCHEDULE = os.environ.get('SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_SCHEDULE', '0 1 * * *')
 SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS = int(os.environ.get('SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS', 24))
 if SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS <= 0:
     raise ValueError('SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_MAX_AGE_HOURS must be a positive integer')
+# the cleanup removes registry entries in chunks of this size, each chunk is committed separately
+SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CHUNK_SIZE = int(os.environ.get('SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CHUNK_SIZE', 10000))
+if SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CHUNK_SIZE <= 0:
+    raise ValueError('SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CHUNK_SIZE must be a positive integer')
+# parallel delete requests against the file storage
+SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CONCURRENCY = int(os.environ.get('SKIPPER_CELERY_FILE_REGISTRY_CLEANUP_CONCURRENCY', 8))
 SKIPPER_CELERY_DATA_SERIES_HISTORY_CLEANUP_SCHEDULE = os.environ.get('SKIPPER_CELERY_DATA_SERIES_HISTORY_CLEANUP_SCHEDULE', '0 1 * * *')
 SKIPPER_CELERY_DATA_SERIES_META_MODEL_CLEANUP_SCHEDULE = os.environ.get('SKIPPER_CELERY_DATA_SERIES_META_MODEL_CLEANUP_SCHEDULE', '0 1 * * *')
 
@@ -56,4 +72,12 @@ SKIPPER_CELERY_DATA_SERIES_BULK_ASYNC_CONCURRENCY_MAX_RETRY_DELAY= int(os.enviro
 SKIPPER_CELERY_HEALTH_CHECK_HEARTBEAT_SCHEDULE = int(os.environ.get('SKIPPER_CELERY_HEALTH_CHECK_HEARTBEAT_SCHEDULE', 30))
 SKIPPER_CELERY_OUTSTANDING_TOKENS_CLEANUP_SCHEDULE = int(os.environ.get('SKIPPER_CELERY_OUTSTANDING_TOKENS_CLEANUP_SCHEDULE', 60 * 60))
 
-SKIPPER_CONSUMER_PROXY_URL = os.environ.get('SKIPPER_CONSUMER_PROXY_URL', None)
\ No newline at end of file
+SKIPPER_CONSUMER_PROXY_URL = os.environ.get('SKIPPER_CONSUMER_PROXY_URL', None)
+
+# prometheus metrics of the hot paths (see skipper/metrics.py). The gunicorn master and the celery worker
+# each serve the aggregated metrics of all their processes on a separate port, PROMETHEUS_MULTIPROC_DIR
+# has to point to an empty directory shared by these processes (runProduction.sh takes care of that)
+SKIPPER_METRICS_ENABLED = os.environ.get('SKIPPER_METRICS_ENABLED', 'false') == 'true'
+SKIPPER_METRICS_BIND_IP = os.environ.get('SKIPPER_METRICS_BIND_IP', '0.0.0.0')
+SKIPPER_METRICS_GUNICORN_PORT = int(os.environ.get('SKIPPER_METRICS_GUNICORN_PORT', 8001))
+SKIPPER_METRICS_CELERY_PORT = int(os.environ.get('SKIPPER_METRICS_CELERY_PORT', 8002))
@@ -36,6 +36,9 @@ SKIPPER_DB_USER = os.environ['SKIPPER_DB_USER']
 SKIPPER_DB_PASSWD = os.environ['SKIPPER_DB_PASSWD']
 SKIPPER_DB_HOSTS = os.environ['SKIPPER_DB_HOSTS']
 SKIPPER_DB_PORTS = os.environ['SKIPPER_DB_PORTS']
+# optional streaming replica for read only data point queries, empty disables read routing
+SKIPPER_DB_READ_REPLICA_HOSTS = os.environ.get('SKIPPER_DB_READ_REPLICA_HOSTS', '')
+SKIPPER_DB_READ_REPLICA_PORTS = os.environ.get('SKIPPER_DB_READ_REPLICA_PORTS', SKIPPER_DB_PORTS)
 SKIPPER_DB_SCHEMA = os.environ.get('SKIPPER_DB_SCHEMA', 'nf_compose')
 SKIPPER_DB_SSL_ENABLE = os.environ.get('SKIPPER_DB_SSL_ENABLE', 'false') == 'true'
 SKIPPER_DB_SSL_CERT = os.environ.get('SKIPPER_DB_SSL_CERT', '/certs/server.crt')
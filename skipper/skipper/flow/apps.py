@@ -13,6 +13,7 @@ class FlowConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
 
     def ready(self) -> None:
-        from skipper.flow import healthcheck
+        from skipper.flow import healthcheck, routing
         
         healthcheck.register_health_checks()
+        routing.connect_invalidation_signals()
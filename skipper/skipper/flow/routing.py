@@ -0,0 +1,216 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+
+"""
+Cached routing tables for the flow auth_request endpoints.
+
+Per tenant, method and visibility the active endpoints are kept in their default order together
+with their compiled patterns, and per user the ids of the endpoints the user may use.
+Entries are only valid for the generation they were built in. The generation is bumped
+whenever endpoints, engines or permissions change (see connect_invalidation_signals), locally
+and in redis so that other processes drop their entries as well. The timeout is a backstop
+for changes that do not send signals (e.g. QuerySet.update).
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, List, Pattern, FrozenSet, Optional, Tuple, Any, Union, Callable, TypeVar
+
+from django.contrib.auth.models import User, AnonymousUser, Group
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from skipper import settings
+from skipper.core.models.guardian import get_objects_for_user_custom
+from skipper.core.models.tenant import Tenant, Tenant_User
+from skipper.flow.models import HttpEndpoint, Engine
+
+logger = logging.getLogger(__name__)
+
+_GENERATION_REDIS_KEY = 'flow:routing:generation'
+
+_REGEX_META = set('.^$*+?{}[]\\|()')
+
+
+class RouteTable(NamedTuple):
+    endpoints: List[HttpEndpoint]
+    # literal prefix every matching path must start with, checked before the pattern
+    prefixes: List[str]
+    patterns: List[Pattern[str]]
+
+
+_Generation = Tuple[int, int]
+
+_local_generation = 0
+_cache: 'OrderedDict[Tuple[Any, ...], Tuple[_Generation, float, Any]]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+_T = TypeVar('_T')
+
+
+def literal_prefix(path: str) -> str:
+    """
+    the literal start of the path regex (empty if the path contains an alternation)
+    """
+    if '|' in path:
+        # ^a|b$ is not anchored on both sides
+        return ''
+    prefix: List[str] = []
+    for char in path:
+        if char in _REGEX_META:
+            if char in '*?{' and len(prefix) > 0:
+                # the last literal is optional
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+def _shared_generation() -> Optional[int]:
+    from skipper.celery import app as celery_app
+    try:
+        with celery_app.pool.acquire(block=True) as conn:
+            raw = conn.default_channel.client.get(_GENERATION_REDIS_KEY)
+        return int(raw) if raw is not None else 0
+    except Exception:
+        logger.warning('failed to read the flow routing generation from redis', exc_info=True)
+        return None
+
+
+def _bump_shared_generation() -> None:
+    from skipper.celery import app as celery_app
+    try:
+        with celery_app.pool.acquire(block=True) as conn:
+            conn.default_channel.client.incr(_GENERATION_REDIS_KEY)
+    except Exception:
+        logger.warning('failed to bump the flow routing generation in redis', exc_info=True)
+
+
+def invalidate_routing() -> None:
+    global _local_generation
+    with _cache_lock:
+        _local_generation += 1
+        _cache.clear()
+    _bump_shared_generation()
+
+
+def _has_uncommitted_change() -> bool:
+    # _on_change leaves invalidate_routing pending until the transaction commits.
+    # Rolled back transactions drop it without invalidating, so nothing they saw may be cached
+    return any(func is invalidate_routing for _, func, _ in transaction.get_connection().run_on_commit)
+
+
+def _cached(key: Tuple[Any, ...], compute: Callable[[], _T]) -> _T:
+    if settings.SKIPPER_FLOW_ROUTING_CACHE_TIMEOUT <= 0 or settings.SKIPPER_FLOW_ROUTING_CACHE_SIZE <= 0:
+        return compute()
+    if _has_uncommitted_change():
+        return compute()
+    shared_generation = _shared_generation()
+    if shared_generation is None:
+        # without redis we can not know whether other processes changed something
+        return compute()
+    generation = (_local_generation, shared_generation)
+
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            if entry[0] == generation and entry[1] > time.monotonic():
+                _cache.move_to_end(key)
+                return entry[2]  # type: ignore
+            del _cache[key]
+
+    value = compute()
+
+    with _cache_lock:
+        if generation[0] == _local_generation:
+            _cache[key] = (generation, time.monotonic() + settings.SKIPPER_FLOW_ROUTING_CACHE_TIMEOUT, value)
+            _cache.move_to_end(key)
+            while len(_cache) > settings.SKIPPER_FLOW_ROUTING_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return value
+
+
+def route_table(tenant: Tenant, method: str, public: bool) -> RouteTable:
+    def compute() -> RouteTable:
+        endpoints = list(HttpEndpoint.active_endpoints(
+            tenant=tenant,
+            method=method,
+            public=public
+        ).select_related('engine'))
+        return RouteTable(
+            endpoints=endpoints,
+            prefixes=[literal_prefix(endpoint.path) for endpoint in endpoints],
+            patterns=[re.compile(f'^{endpoint.path}$') for endpoint in endpoints]
+        )
+    return _cached(('routes', tenant.id, method, public), compute)
+
+
+def usable_endpoint_ids(tenant: Tenant, user: Union[User, AnonymousUser], method: str) -> FrozenSet[Any]:
+    """
+    ids of all active non public endpoints the user may use for the method
+    """
+    def compute() -> FrozenSet[Any]:
+        # globally, flow.impl is equivalent to flow.use (legacy reasons)
+        if not (user.has_perm('flow.use') or user.has_perm('flow.impl')):
+            return frozenset()
+        return frozenset(get_objects_for_user_custom(
+            user=user,
+            perms=['flow.use'],  # locally flow.use is required
+            queryset=HttpEndpoint.active_endpoints(
+                tenant=tenant,
+                method=method,
+                public=False
+            ),
+            with_staff=False,
+            use_groups=True,
+            app_label='flow'
+        ).values_list('id', flat=True))
+    return _cached(('user', tenant.id, user.pk, method), compute)
+
+
+def match_endpoint(table: RouteTable, path: str, allowed_ids: Optional[FrozenSet[Any]] = None) -> Optional[HttpEndpoint]:
+    """
+    the first endpoint (in default order) whose pattern matches the path
+    """
+    for endpoint, prefix, pattern in zip(table.endpoints, table.prefixes, table.patterns):
+        if allowed_ids is not None and endpoint.id not in allowed_ids:
+            continue
+        if path.startswith(prefix) and pattern.match(path):
+            return endpoint
+    return None
+
+
+def _on_change(**kwargs: Any) -> None:
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        # logins do not change anything we cache
+        return
+    invalidate_routing()
+    # entries built from data seen before the commit must be dropped once the change is visible
+    transaction.on_commit(invalidate_routing)
+
+
+def _on_object_permission_change(instance: Any, **kwargs: Any) -> None:
+    if instance.content_type_id == ContentType.objects.get_for_model(HttpEndpoint).id:
+        _on_change()
+
+
+def connect_invalidation_signals() -> None:
+    from guardian.utils import get_user_obj_perms_model, get_group_obj_perms_model  # type: ignore
+
+    for model in [HttpEndpoint, Engine, User, Group, Tenant_User]:
+        post_save.connect(_on_change, sender=model, dispatch_uid=f'flow_routing_{model.__name__}_save')
+        post_delete.connect(_on_change, sender=model, dispatch_uid=f'flow_routing_{model.__name__}_delete')
+    for model in [get_user_obj_perms_model(), get_group_obj_perms_model()]:
+        post_save.connect(_on_object_permission_change, sender=model, dispatch_uid=f'flow_routing_{model.__name__}_save')
+        post_delete.connect(_on_object_permission_change, sender=model, dispatch_uid=f'flow_routing_{model.__name__}_delete')
+    for through in [User.groups.through, User.user_permissions.through, Group.permissions.through]:
+        m2m_changed.connect(_on_change, sender=through, dispatch_uid=f'flow_routing_{through.__name__}_m2m')
@@ -0,0 +1,63 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+from django.db import transaction
+from django.test import TestCase
+from typing import cast
+
+from skipper.flow.models import HttpEndpoint, Tenant
+from skipper.flow.routing import literal_prefix, route_table, match_endpoint
+
+
+class FlowRoutingTest(TestCase):
+
+    tenant: Tenant
+
+    def setUp(self) -> None:
+        self.tenant = Tenant.objects.create(
+            name='tenant'
+        )
+
+    def _endpoint(self, external_id: str, path: str) -> HttpEndpoint:
+        return cast(HttpEndpoint, HttpEndpoint.objects.create(
+            external_id=external_id,
+            tenant=self.tenant,
+            path=path,
+            method='GET',
+            public=True,
+            system=True
+        ))
+
+    def test_literal_prefix(self) -> None:
+        self.assertEqual('/api/flow/impl/', literal_prefix('/api/flow/impl/.*'))
+        self.assertEqual('/api/flow/impl', literal_prefix('/api/flow/impl/?'))
+        self.assertEqual('/api/flow/impl/', literal_prefix('/api/flow/impl/+'))
+        self.assertEqual('', literal_prefix('/a|/b'))
+        self.assertEqual('', literal_prefix('(?i)/a'))
+
+    def test_first_match_wins(self) -> None:
+        self._endpoint('a', '/api/flow/impl/a/.*')
+        self._endpoint('b', '/api/flow/impl/.*')
+
+        table = route_table(self.tenant, 'GET', public=True)
+        self.assertEqual('a', match_endpoint(table, '/api/flow/impl/a/x').external_id)  # type: ignore
+        self.assertEqual('b', match_endpoint(table, '/api/flow/impl/b/x').external_id)  # type: ignore
+        self.assertIsNone(match_endpoint(table, '/api/flow/other'))
+
+    def test_invalidated_on_change(self) -> None:
+        self.assertIsNone(match_endpoint(route_table(self.tenant, 'GET', public=True), '/api/flow/impl/a'))
+        endpoint = self._endpoint('a', '/api/flow/impl/a')
+        self.assertEqual(endpoint.id, match_endpoint(route_table(self.tenant, 'GET', public=True), '/api/flow/impl/a').id)  # type: ignore
+        endpoint.path = '/api/flow/impl/b'
+        endpoint.save()
+        self.assertIsNone(match_endpoint(route_table(self.tenant, 'GET', public=True), '/api/flow/impl/a'))
+
+    def test_rolled_back_change_is_not_cached(self) -> None:
+        with transaction.atomic():
+            self._endpoint('a', '/api/flow/impl/a')
+            self.assertIsNotNone(match_endpoint(route_table(self.tenant, 'GET', public=True), '/api/flow/impl/a'))
+            transaction.set_rollback(True)
+        self.assertIsNone(match_endpoint(route_table(self.tenant, 'GET', public=True), '/api/flow/impl/a'))
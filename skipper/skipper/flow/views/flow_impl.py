@@ -6,7 +6,7 @@
 
 import logging
 import re
-from typing import Optional, Union, cast
+from typing import Optional, Union
 
 from django.conf import settings
 from django.contrib.auth.models import User, AnonymousUser
@@ -18,9 +18,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from urllib.parse import urlparse
 
-from skipper.core.models.guardian import get_objects_for_user_custom
 from skipper.core.models.tenant import Tenant
 from skipper.flow.models import HttpEndpoint
+from skipper.flow.routing import usable_endpoint_ids, match_endpoint, route_table
 from skipper.flow.views.common import sanitize_cookies
 from skipper.flow.views.flow_common import flow_base_path, path_from_uri
 from skipper.settings import flow_upstream_impl
@@ -38,24 +38,11 @@ def can_use_endpoint_impl(tenant: Tenant, user: Optional[Union[User, AnonymousUs
         return None
     if user.is_anonymous:
         return None
-    if user.has_perm('flow.use') or user.has_perm('flow.impl'):  # globally, flow.impl is equivalent to flow.use (legacy reasons)
-        endpoints = get_objects_for_user_custom(
-            user=user,
-            perms=['flow.use'],  # locally flow.use is required
-            queryset=HttpEndpoint.active_endpoints(
-                tenant=tenant,
-                method=method,
-                public=False
-            ),
-            with_staff=False,
-            use_groups=True,
-            app_label='flow'
-        )
-        for endpoint in endpoints:
-            if re.match(f'^{endpoint.path}$', path_from_uri(uri)):
-                # if any of the urls matches, give the go ahead
-                return cast(HttpEndpoint, endpoint)
-    return None
+    allowed_ids = usable_endpoint_ids(tenant, user, method)
+    if len(allowed_ids) == 0:
+        return None
+    # if any of the urls matches, give the go ahead
+    return match_endpoint(route_table(tenant, method, public=False), path_from_uri(uri), allowed_ids)
 
 
 @csrf_exempt
@@ -18,6 +18,7 @@ from urllib.parse import urlparse
 
 from skipper.core.models.tenant import Tenant
 from skipper.flow.models import HttpEndpoint
+from skipper.flow.routing import match_endpoint, route_table
 from skipper.flow.views.flow_common import flow_base_path, outside_base_path, path_from_uri
 from skipper.settings import flow_upstream_impl
 from .content_negotiation import no_content_negotiation_api_view
@@ -30,16 +31,8 @@ base_path_public = '/api/flow/public/impl/'
 
 
 def can_use_endpoint_public_impl(tenant: Tenant, uri: str, method: str) -> Optional[HttpEndpoint]:
-    endpoints = HttpEndpoint.active_endpoints(
-        tenant=tenant,
-        method=method,
-        public=True
-    ).all()
-    for endpoint in endpoints:
-        if re.match(f'^{endpoint.path}$', path_from_uri(uri)):
-            # if any of the urls matches, give the go ahead
-            return endpoint
-    return None
+    # if any of the urls matches, give the go ahead
+    return match_endpoint(route_table(tenant, method, public=True), path_from_uri(uri))
 
 
 @csrf_exempt
@@ -23,4 +23,17 @@ def post_fork(server: Any, worker: Any) -> None:
     server.log.info('gunicorn post_fork: successfully used gevent patch call')
     from skipper import telemetry
 
-    telemetry.setup_telemetry_django()
\ No newline at end of file
+    telemetry.setup_telemetry_django()
+
+
+def when_ready(server: Any) -> None:
+    from skipper import metrics
+
+    # the master serves the metrics of all workers
+    metrics.start_gunicorn_exporter()
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    from skipper import metrics
+
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,108 @@
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0. 
+# If a copy of the MPL was not distributed with this file, 
+# You can obtain one at https://mozilla.org/MPL/2.0/.
+# This file is part of NF Compose
+# [2019] - [2024] © NeuroForge GmbH & Co. KG
+
+"""
+prometheus metrics of the hot paths. Every gunicorn/celery process records into its own files below
+PROMETHEUS_MULTIPROC_DIR, the gunicorn master and the main celery process serve the aggregated values
+(see gunicorn.py and core/tasks/signals.py). This module must not import django, it is loaded by the
+gunicorn master before any app is set up.
+"""
+
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, multiprocess, start_http_server
+
+
+_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_AGE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0)
+_QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+BULK_CHUNK_PERSIST_SECONDS = Histogram(
+    'skipper_dataseries_bulk_chunk_persist_seconds',
+    'time it takes to write one chunk (SKIPPER_DATA_SERIES_BULK_BATCH_SIZE) of a bulk insert',
+    ['backend'],
+    buckets=_SECONDS_BUCKETS
+)
+BULK_DATA_POINTS_PERSISTED = Counter(
+    'skipper_dataseries_bulk_data_points_persisted',
+    'data points handled by bulk inserts (including unchanged ones that were skipped), rate() gives rows per second',
+    ['backend']
+)
+BULK_VALIDATION_SECONDS = Histogram(
+    'skipper_dataseries_bulk_validation_seconds',
+    'time it takes to validate the data points of a bulk request',
+    buckets=_SECONDS_BUCKETS
+)
+BULK_INSERT_TASK_QUEUE_AGE_SECONDS = Histogram(
+    'skipper_dataseries_bulk_insert_task_queue_age_seconds',
+    'age of an asynchronous bulk insert (BulkInsertTaskData) when it is picked up by a worker',
+    buckets=_AGE_BUCKETS
+)
+CONSUMER_DELIVERY_SECONDS = Histogram(
+    'skipper_dataseries_consumer_delivery_seconds',
+    'duration of a request that delivers an event (or a batch of events) to a consumer',
+    ['consumer', 'outcome'],
+    buckets=_SECONDS_BUCKETS
+)
+CONSUMER_EVENT_LAG_SECONDS = Histogram(
+    'skipper_dataseries_consumer_event_lag_seconds',
+    'time between the change of a data point and the successful delivery of its event',
+    ['consumer'],
+    buckets=_AGE_BUCKETS
+)
+CONSUMER_EVENT_LAST_LAG_SECONDS = Gauge(
+    'skipper_dataseries_consumer_event_last_lag_seconds',
+    'lag of the most recently delivered event of a consumer',
+    ['consumer'],
+    multiprocess_mode='mostrecent'
+)
+REQUEST_DB_QUERIES = Histogram(
+    'skipper_http_request_db_queries',
+    'number of database queries executed while handling a request',
+    ['view', 'method'],
+    buckets=_QUERY_COUNT_BUCKETS
+)
+
+
+def multiprocess_enabled() -> bool:
+    return 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+
+def registry() -> CollectorRegistry:
+    """
+    the registry to expose, in multiprocess mode this aggregates the values of all processes
+    """
+    if not multiprocess_enabled():
+        return REGISTRY
+    _registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(_registry)  # type: ignore
+    return _registry
+
+
+def _start_exporter(port: int) -> None:
+    from skipper.environment_common import SKIPPER_METRICS_ENABLED, SKIPPER_METRICS_BIND_IP
+
+    if SKIPPER_METRICS_ENABLED:
+        start_http_server(port, addr=SKIPPER_METRICS_BIND_IP, registry=registry())
+
+
+def start_gunicorn_exporter() -> None:
+    from skipper.environment_common import SKIPPER_METRICS_GUNICORN_PORT
+    _start_exporter(SKIPPER_METRICS_GUNICORN_PORT)
+
+
+def start_celery_exporter() -> None:
+    from skipper.environment_common import SKIPPER_METRICS_CELERY_PORT
+    _start_exporter(SKIPPER_METRICS_CELERY_PORT)
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    cleans up the live gauges of a worker process that exited
+    """
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)  # type: ignore
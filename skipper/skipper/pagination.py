@@ -5,9 +5,12 @@
 # [2019] - [2024] © NeuroForge GmbH & Co. KG
 
 
+import re
 from collections import OrderedDict
-from typing import Optional, Any, List, Callable
+from typing import Optional, Any, List, Callable, Sequence
 
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 from rest_framework.exceptions import ValidationError
@@ -22,6 +25,50 @@ from skipper import settings
 from rest_framework.utils.urls import remove_query_param, replace_query_param  # type: ignore
 
 
+COUNT_QUERY_PARAM = 'count'
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+
+_explain_rows_pattern = re.compile(r'rows=(\d+)')
+
+
+def get_count_mode(request: HttpRequest, default: Optional[str]) -> Optional[str]:
+    """
+    count[=true|exact] -> COUNT_EXACT, count=estimate -> COUNT_ESTIMATE,
+    any other value -> no count, parameter missing -> default
+    """
+    if COUNT_QUERY_PARAM not in request.GET:
+        return default
+    cnt_query_val = request.GET[COUNT_QUERY_PARAM]
+    if cnt_query_val is None or cnt_query_val == '' or cnt_query_val == 'true' or cnt_query_val == COUNT_EXACT:
+        return COUNT_EXACT
+    if cnt_query_val == COUNT_ESTIMATE:
+        return COUNT_ESTIMATE
+    return None
+
+
+def estimate_row_count(cursor: Any, sql: str, params: Any) -> int:
+    """
+    row estimate of the query planner for the given query (based on the table statistics),
+    the query itself is not executed
+    """
+    cursor.execute('EXPLAIN ' + sql, params)
+    plan: Sequence[Any] = cursor.fetchone()
+    match = _explain_rows_pattern.search(plan[0]) if plan is not None else None
+    if match is None:
+        return 0
+    return int(match.group(1))
+
+
+def estimate_queryset_count(queryset: QuerySet[Any]) -> int:
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connections[queryset.db].cursor() as cursor:
+        return estimate_row_count(cursor, sql, params)
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = settings.DEFAULT_PAGE_SIZE
     page_size_query_param = 'pagesize'
@@ -62,6 +109,9 @@ class IdBasedPagination(BasePagination):
 
     display_prev_page = True
 
+    total_count: Optional[int]
+    total_count_is_estimate = False
+
     def get_page_size(self, request: Any) -> int:
         if self.page_size_query_param:
             try:
@@ -141,9 +191,18 @@ class IdBasedPagination(BasePagination):
         self.queryset = queryset
 
         if hasattr(view, 'get_total_count_for_pagination'):
+            # views that count themselves only count if asked to
+            count_mode = get_count_mode(request, default=None)
             self.total_count = view.get_total_count_for_pagination(request)
         else:
-            self.total_count = queryset.count()
+            count_mode = get_count_mode(request, default=COUNT_EXACT)
+            if count_mode == COUNT_EXACT:
+                self.total_count = queryset.count()
+            elif count_mode == COUNT_ESTIMATE:
+                self.total_count = estimate_queryset_count(queryset)
+            else:
+                self.total_count = None
+        self.total_count_is_estimate = self.total_count is not None and count_mode == COUNT_ESTIMATE
 
         # we have to actually query the next page_size + 2 elements (if possible)
         # this way, we actually make sure to not generate a next page link if it
@@ -193,6 +252,8 @@ class IdBasedPagination(BasePagination):
             response_dict['previous'] = self.get_prev_link()
         if self.total_count is not None:
             response_dict['count'] = self.total_count
+            if self.total_count_is_estimate:
+                response_dict['count_is_estimate'] = True
         response_dict['data'] = data
         return Response(response_dict)
 
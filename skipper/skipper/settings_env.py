@@ -19,6 +19,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 import os
 from typing import TYPE_CHECKING, Optional, Dict, Any, List, Union
 from skipper import environment
+from skipper.db_pool import reset_pooled_connection
 
 # rest of config
 
@@ -73,7 +74,7 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (        
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'skipper.core.authentication.CachingBasicAuthentication',
         'skipper.core.authentication.PossiblyJWTTokenAuthentication',
         'skipper.core.authentication.PreSharedTokenAuthentication'
     ),
@@ -189,6 +190,22 @@ SKIPPER_SUB_MODULES = [
 
 SKIPPER_DATA_SERIES_BULK_TASK_SIZE = environment.SKIPPER_DATA_SERIES_BULK_TASK_SIZE
 SKIPPER_DATA_SERIES_BULK_BATCH_SIZE = environment.SKIPPER_DATA_SERIES_BULK_BATCH_SIZE
+SKIPPER_DATA_SERIES_BULK_COPY_THRESHOLD = environment.SKIPPER_DATA_SERIES_BULK_COPY_THRESHOLD
+SKIPPER_DATA_SERIES_BULK_FILE_UPLOAD_CONCURRENCY = environment.SKIPPER_DATA_SERIES_BULK_FILE_UPLOAD_CONCURRENCY
+SKIPPER_DATA_SERIES_ONLINE_BACKEND_MIGRATION = environment.SKIPPER_DATA_SERIES_ONLINE_BACKEND_MIGRATION
+SKIPPER_DATA_SERIES_BACKEND_MIGRATION_CHUNK_SIZE = environment.SKIPPER_DATA_SERIES_BACKEND_MIGRATION_CHUNK_SIZE
+SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_TIMEOUT = environment.SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_TIMEOUT
+SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_LOCAL_SIZE = environment.SKIPPER_DATA_SERIES_QUERY_INFO_CACHE_LOCAL_SIZE
+SKIPPER_AUTH_CREDENTIAL_CACHE_TIMEOUT = environment.SKIPPER_AUTH_CREDENTIAL_CACHE_TIMEOUT
+SKIPPER_AUTH_CREDENTIAL_CACHE_SIZE = environment.SKIPPER_AUTH_CREDENTIAL_CACHE_SIZE
+SKIPPER_DB_READ_REPLICA_MAX_LAG_SECONDS = environment.SKIPPER_DB_READ_REPLICA_MAX_LAG_SECONDS
+SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL = environment.SKIPPER_DB_READ_REPLICA_LAG_CHECK_INTERVAL
+SKIPPER_FLOW_ROUTING_CACHE_TIMEOUT = environment.SKIPPER_FLOW_ROUTING_CACHE_TIMEOUT
+SKIPPER_FLOW_ROUTING_CACHE_SIZE = environment.SKIPPER_FLOW_ROUTING_CACHE_SIZE
+SKIPPER_S3_PRESIGNED_URL_CACHE_TIMEOUT = environment.SKIPPER_S3_PRESIGNED_URL_CACHE_TIMEOUT
+SKIPPER_S3_PRESIGNED_URL_CACHE_SIZE = environment.SKIPPER_S3_PRESIGNED_URL_CACHE_SIZE
+SKIPPER_S3_MULTIPART_THRESHOLD = environment.SKIPPER_S3_MULTIPART_THRESHOLD
+SKIPPER_S3_MULTIPART_CHUNKSIZE = environment.SKIPPER_S3_MULTIPART_CHUNKSIZE
 
 SKIPPER_CONTAINER_UPSTREAM = environment.SKIPPER_SELF_UPSTREAM
 
@@ -249,8 +266,13 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'skipper.core.middleware.TenantFromUserMiddleware',
+    'skipper.core.middleware.ReadReplicaWriteTokenMiddleware',
 ]
 
+if environment.SKIPPER_METRICS_ENABLED:
+    # counting the queries wraps every connection, only do it if the metrics are exported at all
+    MIDDLEWARE.insert(1, 'skipper.core.middleware.QueryCountMetricsMiddleware')
+
 X_FRAME_OPTIONS = 'SAMEORIGIN'
 CSP_FRAME_ANCESTORS = [
     "'self'",
@@ -315,11 +337,16 @@ _db_engine = 'django.db.backends.postgresql'
 
 _db_options = {}
 if skipper_container_type in ['DJANGO', 'DJANGO_INTERNAL'] and not environment.SKIPPER_TESTING and not TYPE_CHECKING and not (os.environ.get('MYPY_RUN', 'false') == 'true'):
+    # the pool is only created on the first connect, i.e. after gunicorn forked and gevent patched the worker.
+    # Connections are health checked on checkout (CONN_HEALTH_CHECKS) and reset when they are returned.
     _db_options = {
         'pool': {
-            'min_size': max(2, environment.SKIPPER_GUNICORN_WORKER_CONCURRENCY),
-            'max_size': max(2, environment.SKIPPER_GUNICORN_WORKER_CONCURRENCY),
-            'timeout': environment.SKIPPER_GUNICORN_WORKER_DB_POOL_TIMEOUT
+            'min_size': environment.SKIPPER_GUNICORN_WORKER_DB_POOL_MIN_SIZE,
+            'max_size': max(environment.SKIPPER_GUNICORN_WORKER_DB_POOL_MIN_SIZE, environment.SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_SIZE),
+            'timeout': environment.SKIPPER_GUNICORN_WORKER_DB_POOL_TIMEOUT,
+            'max_idle': environment.SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_IDLE,
+            'max_lifetime': environment.SKIPPER_GUNICORN_WORKER_DB_POOL_MAX_LIFETIME,
+            'reset': reset_pooled_connection
         }
     }
 elif skipper_container_type in ['CELERY_BEAT']:
@@ -359,7 +386,26 @@ else:
         }
     }
 
+# read only data point queries can be served by a streaming replica of the default database,
+# see skipper.core.db_routers.data_point_read_db for when they actually are
 DATA_SERIES_DYNAMIC_SQL_DB_READ = 'default'
+if environment.SKIPPER_DB_READ_REPLICA_HOSTS != '' and 'default' in DATABASES:
+    DATA_SERIES_DYNAMIC_SQL_DB_READ = 'read_replica'
+    DATABASES[DATA_SERIES_DYNAMIC_SQL_DB_READ] = {
+        **DATABASES['default'],
+        'HOST': environment.SKIPPER_DB_READ_REPLICA_HOSTS,
+        'PORT': environment.SKIPPER_DB_READ_REPLICA_PORTS,
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'target_session_attrs': 'any',
+        },
+        # nothing is ever written here, there is no point in wrapping requests in transactions
+        'ATOMIC_REQUESTS': False,
+        'TEST': {
+            'MIRROR': 'default'
+        }
+    }
+
 DATA_SERIES_DYNAMIC_SQL_DB = 'default'
 DATA_SERIES_DYNAMIC_SQL_DB_BULK = 'default'
 CELERY_DATABASES = DATABASES